@@ -0,0 +1,61 @@
+"""
+Compare the runtime of the small-alphabet fast path of the vendored pyitlib
+with its general implementation. The general implementation is used when the
+alphabets are passed explicitly, which does not change the result.
+"""
+
+import timeit
+
+import numpy as np
+
+from hfs.lib.pyitlib import entropy_joint, information_mutual_conditional
+
+
+def benchmark(n_samples, n_classes, repeat=5, number=20):
+    rng = np.random.default_rng(0)
+    X = rng.integers(0, 2, size=n_samples)
+    Y = rng.integers(0, 2, size=n_samples)
+    Z = rng.integers(0, n_classes, size=n_samples)
+    alphabets = {
+        "Alphabet_X": np.unique(X),
+        "Alphabet_Y": np.unique(Y),
+        "Alphabet_Z": np.unique(Z),
+    }
+    # the alphabets of X and Z as rows, padded with the fill value -1
+    joint_alphabet = np.full((2, n_classes), -1)
+    joint_alphabet[0, :2] = alphabets["Alphabet_X"]
+    joint_alphabet[1] = alphabets["Alphabet_Z"]
+    assert information_mutual_conditional(X, Y, Z) == information_mutual_conditional(
+        X, Y, Z, **alphabets
+    )
+
+    assert entropy_joint(np.vstack((X, Z))) == entropy_joint(
+        np.vstack((X, Z)), Alphabet_X=joint_alphabet
+    )
+
+    def measure(function):
+        return min(timeit.repeat(function, repeat=repeat, number=number)) / number
+
+    runs = {
+        "information_mutual_conditional": (
+            lambda: information_mutual_conditional(X, Y, Z),
+            lambda: information_mutual_conditional(X, Y, Z, **alphabets),
+        ),
+        "entropy_joint": (
+            lambda: entropy_joint(np.vstack((X, Z))),
+            lambda: entropy_joint(np.vstack((X, Z)), Alphabet_X=joint_alphabet),
+        ),
+    }
+    for name, (fast, general) in runs.items():
+        fast_time, general_time = measure(fast), measure(general)
+        print(
+            f"{name:32} n={n_samples:7} classes={n_classes:2} "
+            f"general={general_time * 1e3:8.3f}ms fast={fast_time * 1e3:8.3f}ms "
+            f"speedup={general_time / fast_time:5.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    for n_samples in (100, 1000, 10000, 100000):
+        for n_classes in (2, 5):
+            benchmark(n_samples, n_classes)
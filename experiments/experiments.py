@@ -31,8 +31,7 @@ def data():
     columns = create_mapping_columns_to_nodes(train, graph)
     train = train[go_terms].to_numpy()
     test = test[go_terms].to_numpy()
-    hierarchy = nx.to_numpy_array(graph)
-    return (hierarchy, train, y_train, test, y_test, columns)
+    return (graph, train, y_train, test, y_test, columns)
 
 
 def hnb(hierarchy, train, y_train, test, y_test, k, columns, path):
@@ -113,8 +112,8 @@ def evaluate(data, k):
     train = preprocessor.transform(train)
     test = preprocessor.transform(test)
 
-    hierarchy = preprocessor.get_hierarchy()
-    graph = nx.DiGraph(hierarchy)
+    hierarchy = preprocessor.get_hierarchy(format="sparse")
+    graph = preprocessor.get_hierarchy(format="graph")
     columns = create_mapping_columns_to_nodes(pd.DataFrame(train), graph)
 
     dir = pathlib.Path(__file__).parent.parent.absolute()
@@ -1,6 +1,5 @@
 import time
 
-import networkx as nx
 import wandb
 from sklearn.model_selection import train_test_split
 from sklearn.naive_bayes import BernoulliNB
@@ -23,7 +22,7 @@ def preprocess_data(hierarchy, X_train, X_test, columns):
     preprocessor.fit(X_train, columns=columns)
     X_train_transformed = preprocessor.transform(X_train)
     X_test_transformed = preprocessor.transform(X_test)
-    hierarchy_updated = preprocessor.get_hierarchy()
+    hierarchy_updated = preprocessor.get_hierarchy(format="sparse")
     columns_updated = preprocessor.get_columns()
     return X_train_transformed, X_test_transformed, hierarchy_updated, columns_updated
 
@@ -36,7 +35,6 @@ def get_tweet_data():
     X, y, hierarchy = load_data()
     columns = create_mapping_columns_to_nodes(X, hierarchy)
     X = X.to_numpy()
-    hierarchy = nx.to_numpy_array(hierarchy)
     X_train, X_test, y_train, y_test = train_test_split(
         X, y, test_size=0.3, random_state=0
     )
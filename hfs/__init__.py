@@ -5,6 +5,7 @@ Estimators for feature selection on hierarchical data.
 from hfs._version import __version__
 from hfs.data_utils import create_mapping_columns_to_nodes
 from hfs.helpers import get_columns_for_numpy_hierarchy
+from hfs.packed import PackedBinaryMatrix
 from hfs.preprocessing import HierarchicalPreprocessor
 from hfs.selectors import (
     HIP,
@@ -27,6 +28,7 @@ from hfs.selectors.hill_climbing import (
     TopDownSelector,
 )
 from hfs.selectors.lazyHierarchicalFeatureSelector import LazyHierarchicalFeatureSelector
+from hfs.sufficient_statistics import SufficientStatistics
 
 __all__ = [
     "TSELSelector",
@@ -45,6 +47,8 @@ __all__ = [
     "MR",
     "RNB",
     "TAN",
+    "SufficientStatistics",
+    "PackedBinaryMatrix",
     "get_columns_for_numpy_hierarchy",
     "create_mapping_columns_to_nodes",
     "__version__",
@@ -8,7 +8,11 @@ from fractions import Fraction
 
 import networkx as nx
 import numpy as np
-from networkx.algorithms.simple_paths import all_simple_paths
+from scipy import sparse
+
+from hfs.hierarchy import HierarchyIndex
+from hfs.packed import PackedBinaryMatrix
+from hfs.sufficient_statistics import SufficientStatistics
 
 
 def get_relevance(xdata, ydata, node):
@@ -47,18 +51,105 @@ def get_relevance(xdata, ydata, node):
     return rel
 
 
+def get_relevances(xdata, ydata=None, exact=False):
+    """
+    Gather the relevance of all nodes at once.
+
+    Computes the same values as get_relevance for every column of xdata.
+    The samples with value 1 and value 0 and their positive labels are
+    counted for all columns in one pass over the data.
+
+    Parameters
+    ----------
+    xdata : {array-like, sparse matrix, PackedBinaryMatrix, SufficientStatistics}
+            The training input samples, shape (n_samples, n_features), or
+            their statistics.
+    ydata : array-like, shape (n_samples,)
+            The target values. An array of int. Not needed if xdata are
+            statistics.
+    exact : bool
+            If True the relevance is computed with fractions.Fraction like
+            get_relevance. Default is False.
+
+    Returns
+    ----------
+    relevances : numpy.ndarray of shape (n_features,)
+            The relevance of each column. A float64 array, or an object
+            array of fractions.Fraction if exact is True.
+    """
+    if isinstance(xdata, PackedBinaryMatrix):
+        xdata = SufficientStatistics(xdata, ydata)
+    if isinstance(xdata, SufficientStatistics):
+        ones = xdata.value_class_counts(1)
+        zeros = xdata.value_class_counts(0)
+        positive = xdata.classes == 1
+        num_ones, num_ones_positive = ones.sum(axis=1), ones[:, positive].sum(axis=1)
+        num_zeros, num_zeros_positive = zeros.sum(axis=1), zeros[:, positive].sum(axis=1)
+    elif sparse.issparse(xdata):
+        positive = np.asarray(ydata).ravel() == 1
+        num_samples = xdata.shape[0]
+        num_positive = np.count_nonzero(positive)
+        xdata = sparse.csr_matrix(xdata)
+        ones = xdata == 1
+        nonzeros = xdata != 0
+        num_ones = np.asarray(ones.sum(axis=0)).ravel()
+        num_ones_positive = np.asarray(ones[positive].sum(axis=0)).ravel()
+        num_zeros = num_samples - np.asarray(nonzeros.sum(axis=0)).ravel()
+        num_zeros_positive = (
+            num_positive - np.asarray(nonzeros[positive].sum(axis=0)).ravel()
+        )
+    else:
+        positive = np.asarray(ydata).ravel() == 1
+        xdata = np.asarray(xdata)
+        num_ones = np.count_nonzero(xdata == 1, axis=0)
+        num_ones_positive = np.count_nonzero(xdata[positive] == 1, axis=0)
+        num_zeros = np.count_nonzero(xdata == 0, axis=0)
+        num_zeros_positive = np.count_nonzero(xdata[positive] == 0, axis=0)
+
+    if exact:
+        relevances = np.empty(xdata.shape[1], dtype=object)
+        for column in range(xdata.shape[1]):
+            p1 = (
+                Fraction(int(num_ones_positive[column]), int(num_ones[column]))
+                if num_ones[column] != 0
+                else 0
+            )
+            p2 = (
+                Fraction(int(num_zeros_positive[column]), int(num_zeros[column]))
+                if num_zeros[column] != 0
+                else 0
+            )
+            relevances[column] = (p1 - p2) ** 2 + ((1 - p1) - (1 - p2)) ** 2
+        return relevances
+
+    p1 = np.divide(
+        num_ones_positive,
+        num_ones,
+        out=np.zeros(xdata.shape[1]),
+        where=num_ones != 0,
+    )
+    p2 = np.divide(
+        num_zeros_positive,
+        num_zeros,
+        out=np.zeros(xdata.shape[1]),
+        where=num_zeros != 0,
+    )
+    # (1 - p1) - (1 - p2) = p2 - p1, so both terms of the sum are the same.
+    return 2 * (p1 - p2) ** 2
+
+
 def check_data(dag, x_data, y_data):
     """Checks whether the given dataset satisfies the 0-1-propagation on the DAG.
 
     The 0-1-propagation property states that if there is a directed edge (u, v)
-    in the DAG, then whenever node u has a value of 1 in the dataset, node v
-    must have a value of 1 for the same instance.
+    in the DAG, then whenever node v has a value of 1 in the dataset, node u
+    must not have a value of 0 for the same instance.
 
     Parameters
     ----------
     dag : networkx.DiGraph
         The Directed Acyclic Graph representing the hierarchy structure.
-    x_data : numpy.ndarray
+    x_data : {numpy.ndarray, sparse matrix}
             An array containing the input features of the dataset.
     y_data : numpy.ndarray
             An array containing the corresponding output labels of the dataset.
@@ -69,19 +160,109 @@ def check_data(dag, x_data, y_data):
     on any of the edges in the DAG.
 
     """
-    data = np.column_stack((x_data, y_data))
-    edges = list(nx.edge_dfs(dag, source=0, orientation="original"))
-    for edge in edges:
-        for idx in range(len(data)):
-            if data[idx, edge[0]] == 0 and data[idx, edge[1]] == 1:
-                raise ValueError(
-                    f"Test instance {idx} violates 0-1-propagation \
-                    on edge ({edge[0]}, {edge[1]})"
-                    f"{data[idx]}"
-                )
-
-
-def get_leaves(graph: nx.DiGraph):
+    violations = find_violations(dag, x_data, fail_fast=True)
+    if violations.shape[0]:
+        row, parent, child = violations[0]
+        raise ValueError(
+            f"Test instance {row} violates 0-1-propagation "
+            f"on edge ({parent}, {child})"
+        )
+
+
+_VIOLATION_DTYPE = np.dtype([("row", np.intp), ("parent", np.intp), ("child", np.intp)])
+
+
+def find_violations(dag, x_data, fail_fast=False, count=False, block_size=None):
+    """Find all violations of the 0-1-propagation in a dataset.
+
+    A violation is a sample with value 1 for a node and value 0 for one of
+    its parents. All edges of the DAG are checked. The parent and child
+    columns of a block of edges are gathered and compared at once, and
+    sparse input is compared without densifying it.
+
+    Parameters
+    ----------
+    dag : networkx.DiGraph or HierarchyIndex
+        The Directed Acyclic Graph representing the hierarchy structure.
+        Nodes are named after their column in x_data. Edges to and from a
+        virtual "ROOT" node are ignored.
+    x_data : {numpy.ndarray, sparse matrix}, shape (n_samples, n_features)
+            An array containing the input features of the dataset.
+    fail_fast : bool
+            If True stop after the first block of edges with violations.
+            Default is False.
+    count : bool
+            If True only return the number of violations. Default is False.
+    block_size : int or None
+            The number of edges to check at once. If None it is chosen so
+            that a block has about 2^24 entries.
+
+    Returns
+    ----------
+    violations : numpy.ndarray or int
+            A structured array with the fields "row", "parent" and "child"
+            for every violation, ordered by edge and row, or the number of
+            violations if count is True.
+    """
+    index = _as_hierarchy_index(dag)
+    keep = (index.edge_parents != index.root) & (index.edge_children != index.root)
+    nodes = np.array(index.nodes, dtype=object)
+    parents = nodes[index.edge_parents[keep]].astype(np.intp)
+    children = nodes[index.edge_children[keep]].astype(np.intp)
+
+    if sparse.issparse(x_data):
+        x_data = sparse.csc_matrix(x_data)
+    else:
+        x_data = np.asarray(x_data)
+    if block_size is None:
+        block_size = max(1, 2**24 // max(1, x_data.shape[0]))
+
+    num_violations = 0
+    reports = []
+    for start in range(0, parents.shape[0], block_size):
+        end = start + block_size
+        rows, edges = _find_block_violations(
+            x_data[:, parents[start:end]], x_data[:, children[start:end]]
+        )
+        num_violations += rows.shape[0]
+        if not count:
+            report = np.empty(rows.shape[0], dtype=_VIOLATION_DTYPE)
+            report["row"] = rows
+            report["parent"] = parents[start:end][edges]
+            report["child"] = children[start:end][edges]
+            reports.append(report)
+        if fail_fast and rows.shape[0]:
+            break
+
+    if count:
+        return num_violations
+    if not reports:
+        return np.empty(0, dtype=_VIOLATION_DTYPE)
+    return np.concatenate(reports)
+
+
+def _find_block_violations(parent_columns, child_columns):
+    """Find the samples with parent value 0 and child value 1.
+
+    Returns the rows and the edge positions in the block of the
+    violations, ordered by edge and row.
+    """
+    if sparse.issparse(child_columns):
+        child_ones = sparse.csc_matrix(child_columns == 1, dtype=np.int8)
+        parent_nonzeros = sparse.csc_matrix(parent_columns != 0, dtype=np.int8)
+        violations = sparse.csc_matrix(child_ones - child_ones.multiply(parent_nonzeros))
+        violations.eliminate_zeros()
+        violations.sort_indices()
+        edges = np.repeat(
+            np.arange(violations.shape[1]), np.diff(violations.indptr)
+        ).astype(np.intp)
+        return violations.indices.astype(np.intp), edges
+    violations = (parent_columns == 0) & (child_columns == 1)
+    edges, rows = np.nonzero(violations.T)
+    return rows, edges
+
+
+def get_leaves(graph):
     """Get the leaf nodes from the given directed acyclic graph (DAG).
 
     A leaf node is a node in the graph that meets the following criteria:
@@ -91,7 +272,7 @@ def get_leaves(graph: nx.DiGraph):
 
     Parameters
     ----------
-    graph : networkx.DiGraph
+    graph : networkx.DiGraph or HierarchyIndex
             The Directed Acyclic Graph (DAG) from which the leaf nodes
             will be identified.
 
@@ -100,12 +281,8 @@ def get_leaves(graph: nx.DiGraph):
     leaves : list
             A list of leaf nodes found in the DAG.
     """
-    leaves = [
-        node
-        for node in graph
-        if graph.in_degree(node) > 0 and graph.out_degree(node) == 0
-    ]
-    return leaves
+    index = _as_hierarchy_index(graph)
+    return index.names(index.leaves())
 
 
 def shrink_dag(node_identifiers: list, digraph: nx.DiGraph):
@@ -241,12 +418,92 @@ def add_virtual_root_node(hierarchy: nx.DiGraph):
     return hierarchy
 
 
-def get_paths(graph: nx.DiGraph, reverse=False):
-    """Get all the paths from the "ROOT" node to the leaf nodes in the input graph.
+def hierarchy_to_graph(hierarchy):
+    """Convert the hierarchy parameter of the estimators to a graph.
+
+    The nodes of the resulting graph are named 0 to N-1. For adjacency
+    matrices the name of a node is its row in the matrix, for a prebuilt
+    graph it is the node's position in graph.nodes, which is the same as
+    converting the graph to an adjacency matrix with
+    networkx.to_numpy_array first.
+
+    Parameters
+    ----------
+    hierarchy : {numpy.ndarray, sparse matrix, networkx.DiGraph}
+            The hierarchy graph as a dense or sparse adjacency matrix of
+            shape (N, N), an array of (parent, child) edges of shape (E, 2),
+            or a networkx.DiGraph. A square array is always interpreted as
+            an adjacency matrix.
+
+    Returns
+    ----------
+    graph : networkx.DiGraph
+            A new graph with integer node names. The input is not modified.
+    """
+    if isinstance(hierarchy, nx.Graph):
+        return nx.convert_node_labels_to_integers(nx.DiGraph(hierarchy))
+    if sparse.issparse(hierarchy):
+        return nx.from_scipy_sparse_array(
+            sparse.csr_matrix(hierarchy), create_using=nx.DiGraph
+        )
+    hierarchy = np.asarray(hierarchy)
+    if hierarchy.ndim == 2 and hierarchy.shape[0] == hierarchy.shape[1]:
+        return nx.from_numpy_array(hierarchy, create_using=nx.DiGraph)
+    if hierarchy.ndim == 2 and hierarchy.shape[1] == 2:
+        edges = hierarchy.astype(np.intp)
+        graph = nx.DiGraph()
+        graph.add_nodes_from(range(edges.max(initial=-1) + 1))
+        graph.add_edges_from(edges.tolist())
+        return graph
+    raise ValueError(
+        "The hierarchy must be an adjacency matrix of shape (N, N), an array "
+        f"of edges of shape (E, 2) or a networkx.DiGraph, got shape {hierarchy.shape}."
+    )
+
+
+def graph_to_hierarchy(graph: nx.DiGraph, format="dense"):
+    """Convert a graph with nodes named 0 to N-1 to a compact hierarchy.
 
     Parameters
     ----------
     graph : networkx.DiGraph
+            The hierarchy graph. Node i is expected to be the i'th node of
+            graph.nodes.
+    format : str
+            "dense" for a numpy.ndarray adjacency matrix, "sparse" for a
+            scipy.sparse.csr_matrix adjacency matrix, "edges" for an array
+            of (parent, child) edges or "graph" for a copy of the graph.
+            Default is "dense".
+
+    Returns
+    ----------
+    hierarchy : {numpy.ndarray, sparse matrix, networkx.DiGraph}
+            The hierarchy in the requested format.
+    """
+    if format == "dense":
+        return nx.to_numpy_array(graph)
+    if format == "sparse":
+        return sparse.csr_matrix(nx.to_scipy_sparse_array(graph))
+    if format == "edges":
+        return np.array(list(graph.edges), dtype=np.intp).reshape(-1, 2)
+    if format == "graph":
+        return graph.copy()
+    raise ValueError(
+        f'Unknown format "{format}". Use "dense", "sparse", "edges" or "graph".'
+    )
+
+
+def get_paths(graph, reverse=False):
+    """Get all the paths from the "ROOT" node to the leaf nodes in the input graph.
+
+    The number of paths can grow exponentially with the depth of the
+    graph. Use count_paths to check the number first, iter_paths to
+    process the paths one at a time or a dynamic programming formulation
+    on the HierarchyIndex where possible.
+
+    Parameters
+    ----------
+    graph : networkx.DiGraph or HierarchyIndex
             The Directed Acyclic Graph (DAG) for which paths need to be found.
     reverse : bool
             If True, the order of nodes in each path will be reversed,
@@ -257,12 +514,86 @@ def get_paths(graph: nx.DiGraph, reverse=False):
     paths : list
             A list node lists which represent paths.
     """
-    leaves = get_leaves(graph)
-    paths = list(all_simple_paths(graph, "ROOT", leaves))
-    if reverse:
-        for path in paths:
+    return list(iter_paths(graph, reverse=reverse))
+
+
+def iter_paths(graph, reverse=False, max_paths=None):
+    """Iterate over the paths from the "ROOT" node to the leaf nodes.
+
+    The paths are generated one at a time in the same order as get_paths
+    returns them.
+
+    Parameters
+    ----------
+    graph : networkx.DiGraph or HierarchyIndex
+            The Directed Acyclic Graph (DAG) for which paths need to be found.
+    reverse : bool
+            If True, the order of nodes in each path will be reversed,
+            effectively giving the paths from leaf nodes to the "ROOT" node.
+    max_paths : int or None
+            The maximum number of paths to generate. If None all paths are
+            generated. Default is None.
+
+    Yields
+    ----------
+    path : list
+            A list of node names.
+    """
+    index = _as_hierarchy_index(graph)
+    if index.root == -1:
+        raise nx.NodeNotFound('source node "ROOT" not in graph')
+    for count, path in enumerate(_iter_id_paths(index, index.root)):
+        if max_paths is not None and count >= max_paths:
+            return
+        path = index.names(path)
+        if reverse:
             path.reverse()
-    return paths
+        yield path
+
+
+def count_paths(graph):
+    """Count the paths from the "ROOT" node to the leaf nodes.
+
+    The paths are counted with dynamic programming, so this takes time
+    linear in the number of edges even if there are exponentially many
+    paths.
+
+    Parameters
+    ----------
+    graph : networkx.DiGraph or HierarchyIndex
+            The Directed Acyclic Graph (DAG) for which paths need to be counted.
+
+    Returns
+    ----------
+    count : int
+            The number of paths get_paths would return.
+    """
+    index = _as_hierarchy_index(graph)
+    if index.root == -1:
+        raise nx.NodeNotFound('source node "ROOT" not in graph')
+    return index.count_paths(index.root)
+
+
+def _iter_id_paths(index: HierarchyIndex, source: int):
+    """Depth-first enumeration of all paths from source to the leaves.
+
+    The paths are yielded as lists of node ids in the same order as
+    networkx.all_simple_paths would return them.
+    """
+    if index.out_degree[source] == 0:
+        return
+    path = [source]
+    stack = [iter(index.children(source))]
+    while stack:
+        child = next(stack[-1], None)
+        if child is None:
+            stack.pop()
+            path.pop()
+        elif index.out_degree[child] == 0:
+            yield path + [child]
+        else:
+            path.append(child)
+            stack.append(iter(index.children(child)))
 
 
 def get_columns_for_numpy_hierarchy(hierarchy: nx.DiGraph, num_columns: int):
@@ -312,19 +643,21 @@ def normalize_score(score, max_value):
     return score
 
 
-def compute_aggregated_values(X, hierarchy: nx.DiGraph, columns: list[int], node="ROOT"):
-    """Recursively aggregate features in X by summing up their children's values.
+def compute_aggregated_values(X, hierarchy, columns: list[int], node="ROOT"):
+    """Aggregate features in X by summing up their descendants' values.
 
-    The method traverses the given Directed Acyclic Graph (DAG) hierarchy
-    starting from the specified node, and recursively aggregates the values
-    from its children nodes up to the specified root node. To caculate all
-    values start form "ROOT".
+    The aggregated value of a node is its own value plus the values of all
+    of its descendants in the Directed Acyclic Graph (DAG). A descendant
+    that can be reached on several paths is counted once. All values are
+    computed with a single product of X and the descendant closure of the
+    hierarchy. Only the nodes below the specified node are aggregated, to
+    caculate all values start form "ROOT".
 
     Parameters
     ----------
     X : {array-like, sparse matrix}
         The input array with the original data.
-    hierarchy : networkx.DiGraph
+    hierarchy : networkx.DiGraph or HierarchyIndex
             The Directed Acyclic Graph (DAG) representing the hierarchical
             structure.
     columns : list
@@ -337,20 +670,109 @@ def compute_aggregated_values(X, hierarchy: nx.DiGraph, columns: list[int], node
 
     Returns
     ----------
-    X : numpy.ndarray
-        The input array `X` with the aggregated values based on the provided
-        hierarchy.
+    X : {numpy.ndarray, sparse matrix}
+        A new array with the aggregated values based on the provided
+        hierarchy. Sparse input results in a sparse matrix of the same
+        format. Float input keeps its dtype. Bool and integer input is
+        summed in the smallest signed integer dtype that holds X and
+        cannot overflow, or in float64 if there is none.
+    """
+    index = _as_hierarchy_index(hierarchy)
+    if columns is None:
+        columns = list(range(X.shape[1]))
+    column_indices = {}
+    for column_index, column in enumerate(columns):
+        column_indices.setdefault(column, column_index)
+    node_columns = np.array(
+        [column_indices.get(name, -1) for name in index.nodes], dtype=np.intp
+    )
+
+    # Only nodes in the subgraph below node are aggregated.
+    node_id = index.node_ids[node]
+    aggregated_nodes = index.closure.descendant_mask(node_id)
+    if node_id != index.root:
+        aggregated_nodes[node_id] = True
+    node_columns_to = np.where(aggregated_nodes, node_columns, -1)
+
+    if not sparse.issparse(X):
+        X = np.asarray(X)
+    num_columns = X.shape[1]
+    dtype = _aggregation_dtype(X, num_columns)
+    descendants = column_ancestor_matrix(
+        index, node_columns, num_columns, dtype=dtype, ancestor_columns=node_columns_to
+    ) + sparse.identity(num_columns, dtype=dtype, format="csr")
+
+    aggregated = X @ descendants
+    if sparse.issparse(X):
+        return aggregated.asformat(X.format)
+    return np.asarray(aggregated)
+
+
+def _aggregation_dtype(X, num_terms):
+    """Get a dtype for sums of up to num_terms values of X.
+
+    Floats keep their dtype. For bools and integers the dtype is the
+    smallest signed integer dtype that holds the values of X, their sums
+    and the differences of two sums, so that small input dtypes cannot
+    overflow. float64 is used if there is no such dtype.
+    """
+    if X.dtype.kind == "f":
+        return X.dtype
+    if X.dtype.kind not in "biu":
+        return np.dtype(np.float64)
+    values = X.data if sparse.issparse(X) else X
+    bound = 0
+    if values.size > 0:
+        bound = max(abs(int(values.min())), abs(int(values.max())))
+    # a negative bound gives a signed dtype, the factor 2 covers differences
+    dtype = np.min_scalar_type(-2 * bound * max(1, num_terms) - 1)
+    if dtype.kind != "i":
+        return np.dtype(np.float64)
+    dtype = np.promote_types(dtype, X.dtype)
+    return dtype if dtype.kind == "i" else np.dtype(np.float64)
+
+
+def column_ancestor_matrix(
+    hierarchy, node_columns, num_columns, dtype=np.int32, ancestor_columns=None
+):
+    """Get the ancestor closure of a hierarchy between columns of a dataset.
+
+    Parameters
+    ----------
+    hierarchy : networkx.DiGraph or HierarchyIndex
+            The Directed Acyclic Graph (DAG) representing the hierarchical
+            structure.
+    node_columns : numpy.ndarray of int
+            The column of each node id of the HierarchyIndex, -1 for nodes
+            without a column.
+    num_columns : int
+            The number of columns in the dataset.
+    dtype : numpy.dtype
+            The dtype of the matrix. Default is int32.
+    ancestor_columns : numpy.ndarray of int or None
+            The column of each node id when it is used as an ancestor. -1
+            excludes a node. If None node_columns is used.
+
+    Returns
+    ----------
+    matrix : scipy.sparse.csr_matrix, shape (num_columns, num_columns)
+            Entry (i, j) is 1 if the node of column j is a proper ancestor of
+            the node of column i.
     """
-    if hierarchy.out_degree(node) == 0:
-        return X
-    children = hierarchy.successors(node)
-    aggregated = np.zeros((X.shape[0]))
-    for child in list(children):
-        X = compute_aggregated_values(X, hierarchy, columns, node=child)
-        aggregated = np.add(aggregated, X[:, columns.index(child)])
-
-    if node != "ROOT":
-        aggregated = np.add(aggregated, X[:, columns.index(node)])
-        column_index = columns.index(node)
-        X[:, column_index] = aggregated
-    return X
+    index = _as_hierarchy_index(hierarchy)
+    if ancestor_columns is None:
+        ancestor_columns = node_columns
+    closure = index.closure.ancestor_matrix().tocoo()
+    rows, columns = node_columns[closure.row], ancestor_columns[closure.col]
+    keep = (rows >= 0) & (columns >= 0)
+    return sparse.csr_matrix(
+        (np.ones(np.count_nonzero(keep), dtype=dtype), (rows[keep], columns[keep])),
+        shape=(num_columns, num_columns),
+    )
+
+
+def _as_hierarchy_index(hierarchy):
+    """Get a HierarchyIndex for a graph or return the given index."""
+    if isinstance(hierarchy, HierarchyIndex):
+        return hierarchy
+    return HierarchyIndex(hierarchy)
@@ -0,0 +1,491 @@
+"""
+Compiled integer representation of hierarchy graphs.
+"""
+
+import time
+
+import networkx as nx
+import numpy as np
+from scipy import sparse
+
+
+class HierarchyIndex:
+    """Integer index of a hierarchy graph for fast traversal.
+
+    The nodes of the hierarchy graph are mapped to contiguous integer ids
+    in the order of graph.nodes. Parents and children are stored as
+    compressed sparse row (CSR) arrays, so that the hierarchy can be
+    traversed with numpy operations instead of networkx lookups. The
+    topological order and the longest and shortest distance of every node
+    from a node without parents are computed once when the index is built.
+
+    The index is a snapshot of the graph. If the graph is modified
+    afterwards the index needs to be rebuilt.
+    """
+
+    def __init__(self, graph: nx.DiGraph):
+        """Builds the index for a hierarchy graph.
+
+        Parameters
+        ----------
+        graph : networkx.DiGraph
+                The Directed Acyclic Graph (DAG) representing the hierarchy.
+                If the graph contains the virtual "ROOT" node its id is
+                stored in self.root.
+        """
+        self.graph = graph
+        self.nodes = list(graph.nodes)
+        self.node_ids = {node: node_id for node_id, node in enumerate(self.nodes)}
+        self.n_nodes = len(self.nodes)
+        self.root = self.node_ids.get("ROOT", -1)
+
+        # The neighbors are stored in the same order networkx returns them.
+        self.child_ptr, self.child_ind = self._build_csr(graph.successors)
+        self.parent_ptr, self.parent_ind = self._build_csr(graph.predecessors)
+        self.out_degree = np.diff(self.child_ptr)
+        self.in_degree = np.diff(self.parent_ptr)
+
+        # One entry per edge (parent, child) in the order of the child CSR.
+        self.edge_parents = np.repeat(np.arange(self.n_nodes), self.out_degree)
+        self.edge_children = self.child_ind
+
+        self.topological_order = np.fromiter(
+            (self.node_ids[node] for node in nx.topological_sort(graph)),
+            dtype=np.intp,
+            count=self.n_nodes,
+        )
+        self.depth, self.min_depth = self._distances_from_sources()
+        self._closure = None
+        self._edge_levels = None
+
+    def _build_csr(self, neighbors):
+        """Build CSR arrays for the neighbors of all nodes."""
+        indptr = np.zeros(self.n_nodes + 1, dtype=np.intp)
+        indices = []
+        for node_id, node in enumerate(self.nodes):
+            node_neighbors = [self.node_ids[neighbor] for neighbor in neighbors(node)]
+            indptr[node_id + 1] = indptr[node_id] + len(node_neighbors)
+            indices.extend(node_neighbors)
+        return indptr, np.asarray(indices, dtype=np.intp)
+
+    def _distances_from_sources(self):
+        """Lengths of the longest and shortest paths from a node without
+        parents to each node."""
+        depth = np.zeros(self.n_nodes, dtype=np.intp)
+        min_depth = np.where(self.in_degree == 0, 0, self.n_nodes).astype(np.intp)
+        for node_id in self.topological_order:
+            children = self.children(node_id)
+            if children.size:
+                depth[children] = np.maximum(depth[children], depth[node_id] + 1)
+                min_depth[children] = np.minimum(
+                    min_depth[children], min_depth[node_id] + 1
+                )
+        return depth, min_depth
+
+    def ids(self, nodes):
+        """Get the integer ids of the given node names.
+
+        Parameters
+        ----------
+        nodes : iterable
+                Node names from the hierarchy graph.
+
+        Returns
+        ----------
+        ids : numpy.ndarray
+                The ids of the nodes.
+        """
+        return np.fromiter((self.node_ids[node] for node in nodes), dtype=np.intp)
+
+    def names(self, ids):
+        """Get the node names for the given integer ids.
+
+        Parameters
+        ----------
+        ids : iterable
+                Node ids from the index.
+
+        Returns
+        ----------
+        names : list
+                The names of the nodes in the hierarchy graph.
+        """
+        return [self.nodes[node_id] for node_id in ids]
+
+    def children(self, node_id):
+        """Get the ids of the children of a node."""
+        start, end = self.child_ptr[node_id], self.child_ptr[node_id + 1]
+        return self.child_ind[start:end]
+
+    def parents(self, node_id):
+        """Get the ids of the parents of a node."""
+        start, end = self.parent_ptr[node_id], self.parent_ptr[node_id + 1]
+        return self.parent_ind[start:end]
+
+    def leaves(self):
+        """Get the ids of all leaf nodes.
+
+        A leaf node has no children but at least one parent.
+        """
+        return np.flatnonzero((self.in_degree > 0) & (self.out_degree == 0))
+
+    def ancestors(self, node_id):
+        """Get the sorted ids of all ancestors of a node."""
+        return np.flatnonzero(self._reachable(node_id, self.parent_ptr, self.parent_ind))
+
+    def descendants(self, node_id):
+        """Get the sorted ids of all descendants of a node."""
+        return np.flatnonzero(self._reachable(node_id, self.child_ptr, self.child_ind))
+
+    def count_paths(self, source):
+        """Count the paths from a node to the leaves without enumerating them.
+
+        The number of paths of each node is the sum over its children, which
+        is computed once per node in reverse topological order. The counts
+        are python ints, so they do not overflow on deep hierarchies.
+
+        Parameters
+        ----------
+        source : int
+                The id of the node the paths start from.
+
+        Returns
+        ----------
+        count : int
+                The number of paths from source to a node without children.
+                0 if source has no children itself.
+        """
+        if self.out_degree[source] == 0:
+            return 0
+        counts = [0] * self.n_nodes
+        for node_id in self.topological_order[::-1]:
+            children = self.children(node_id)
+            if children.size:
+                counts[node_id] = sum(counts[child] for child in children)
+            else:
+                counts[node_id] = 1
+        return counts[source]
+
+    def edge_levels(self, downwards=True):
+        """Group the edges into levels that can be processed in bulk.
+
+        Downwards, the edges are grouped by the depth of their child in
+        ascending order. When the levels are processed in this order, all
+        edges into a node's parents have been processed before the edges
+        into the node. Upwards, the edges are grouped by the depth of their
+        parent in descending order.
+
+        Parameters
+        ----------
+        downwards : bool
+                The direction of the traversal. Default is True.
+
+        Returns
+        ----------
+        levels : list of numpy.ndarray
+                Indices into edge_parents and edge_children for each level.
+        """
+        if self._edge_levels is None:
+            self._edge_levels = (
+                _split_by_level(self.depth[self.edge_children]),
+                _split_by_level(self.depth[self.edge_parents])[::-1],
+            )
+        return self._edge_levels[0] if downwards else self._edge_levels[1]
+
+    @property
+    def closure(self):
+        """The HierarchyClosure of the index.
+
+        The closure is built on first access and cached afterwards.
+        """
+        if self._closure is None:
+            self._closure = HierarchyClosure(self)
+        return self._closure
+
+    def ancestor_maximum(self, values):
+        """Get the maximum of values over the proper ancestors of each node.
+
+        The maximum is propagated along the edges level by level, so this
+        takes one vectorized pass over the edges instead of one traversal
+        per node.
+
+        Parameters
+        ----------
+        values : numpy.ndarray, shape (n_nodes,)
+                A value for every node id.
+
+        Returns
+        ----------
+        maximum : numpy.ndarray, shape (n_nodes,)
+                The maximum value among the ancestors of each node. -inf for
+                nodes without ancestors.
+        """
+        return self._propagate(values, downwards=True, minimax=False)
+
+    def descendant_maximum(self, values):
+        """Get the maximum of values over the proper descendants of each node.
+
+        Parameters
+        ----------
+        values : numpy.ndarray, shape (n_nodes,)
+                A value for every node id.
+
+        Returns
+        ----------
+        maximum : numpy.ndarray, shape (n_nodes,)
+                The maximum value among the descendants of each node. -inf
+                for nodes without descendants.
+        """
+        return self._propagate(values, downwards=False, minimax=False)
+
+    def path_ancestor_minimax(self, values):
+        """Get the smallest path maximum of values above each node.
+
+        For every path from a node without parents to a node, take the
+        maximum of values over the nodes on the path before the node. The
+        result is the minimum of these maxima over all such paths.
+
+        Parameters
+        ----------
+        values : numpy.ndarray, shape (n_nodes,)
+                A value for every node id.
+
+        Returns
+        ----------
+        minimax : numpy.ndarray, shape (n_nodes,)
+                The smallest maximum over the paths to each node. -inf for
+                nodes without parents.
+        """
+        return self._propagate(values, downwards=True, minimax=True)
+
+    def path_descendant_minimax(self, values):
+        """Get the smallest path maximum of values below each node.
+
+        For every path from a node to a leaf, take the maximum of values
+        over the nodes on the path after the node. The result is the
+        minimum of these maxima over all such paths.
+
+        Parameters
+        ----------
+        values : numpy.ndarray, shape (n_nodes,)
+                A value for every node id.
+
+        Returns
+        ----------
+        minimax : numpy.ndarray, shape (n_nodes,)
+                The smallest maximum over the paths from each node. -inf
+                for nodes without children.
+        """
+        return self._propagate(values, downwards=False, minimax=True)
+
+    def _propagate(self, values, downwards, minimax):
+        """Propagate path maxima along the edges level by level.
+
+        The result of a node is reduced from max(result, value) of its
+        parents (downwards) or children (upwards). With minimax=False the
+        reduction is the maximum, which yields the maximum over all
+        ancestors or descendants. With minimax=True it is the minimum,
+        which yields the smallest maximum over the paths.
+        """
+        values = np.asarray(values, dtype=float)
+        if downwards:
+            sources, targets = self.edge_parents, self.edge_children
+            degree = self.in_degree
+        else:
+            sources, targets = self.edge_children, self.edge_parents
+            degree = self.out_degree
+        if minimax:
+            result = np.where(degree > 0, np.inf, -np.inf)
+            reduce = np.minimum
+        else:
+            result = np.full(self.n_nodes, -np.inf)
+            reduce = np.maximum
+        for edges in self.edge_levels(downwards):
+            source_ids = sources[edges]
+            reduce.at(
+                result,
+                targets[edges],
+                np.maximum(result[source_ids], values[source_ids]),
+            )
+        return result
+
+    def _reachable(self, node_id, indptr, indices):
+        """Mask of the nodes reachable from node_id, excluding node_id itself.
+
+        The graph is traversed level by level. Each level is gathered from
+        the CSR arrays with a single vectorized operation.
+        """
+        visited = np.zeros(self.n_nodes, dtype=bool)
+        frontier = np.atleast_1d(np.asarray(node_id, dtype=np.intp))
+        while frontier.size:
+            neighbors = _gather_csr_rows(indptr, indices, frontier)
+            frontier = np.unique(neighbors[~visited[neighbors]])
+            visited[frontier] = True
+        return visited
+
+
+def _gather_csr_rows(indptr, indices, rows):
+    """Concatenate the CSR rows with the given row indices."""
+    starts = indptr[rows]
+    lengths = indptr[rows + 1] - starts
+    total = lengths.sum()
+    if total == 0:
+        return np.empty(0, dtype=indices.dtype)
+    offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+    return indices[offsets + np.arange(total)]
+
+
+def _split_by_level(levels):
+    """Group the positions of an array of levels by ascending level."""
+    order = np.argsort(levels, kind="stable")
+    boundaries = np.flatnonzero(np.diff(levels[order])) + 1
+    return np.split(order, boundaries)
+
+
+class HierarchyClosure:
+    """Bit-packed transitive closure of a hierarchy.
+
+    For every node the closure stores its ancestors and its descendants as
+    rows of bits. Bit j of row i in ancestor_bits is set if node j is a
+    proper ancestor of node i, and likewise for descendant_bits. Node ids
+    are the ids of the HierarchyIndex the closure was built from.
+
+    Reachability tests are single bit lookups and set operations on
+    ancestors and descendants are vectorized bit operations on the rows.
+    The closure needs n_nodes^2 / 4 bytes. The time it took to build and
+    its size are stored in build_time and nbytes, so the cost can be
+    compared to the savings on large hierarchies.
+    """
+
+    def __init__(self, index: HierarchyIndex):
+        """Builds the closure for a HierarchyIndex.
+
+        Parameters
+        ----------
+        index : HierarchyIndex
+                The index of the hierarchy graph.
+        """
+        start = time.perf_counter()
+        self.n_nodes = index.n_nodes
+        self.ancestor_bits = self._build(index.topological_order, index.parents)
+        self.descendant_bits = self._build(index.topological_order[::-1], index.children)
+        self.build_time = time.perf_counter() - start
+        self.nbytes = self.ancestor_bits.nbytes + self.descendant_bits.nbytes
+        self._ancestor_matrix = None
+
+    def _build(self, order, neighbors):
+        """Build the closure rows visiting the nodes in the given order.
+
+        The row of a node is the union of the rows of its neighbors plus the
+        neighbors themselves. The neighbors are visited before the node, so
+        their rows are already complete.
+        """
+        bits = np.zeros((self.n_nodes, (self.n_nodes + 7) // 8), dtype=np.uint8)
+        for node_id in order:
+            node_neighbors = neighbors(node_id)
+            if node_neighbors.size:
+                row = np.bitwise_or.reduce(bits[node_neighbors], axis=0)
+                bits[node_id] = row | self.pack(node_neighbors)
+        return bits
+
+    def ancestor_matrix(self):
+        """Get the closure as a sparse matrix.
+
+        The matrix is built on first use and cached afterwards.
+
+        Returns
+        ----------
+        matrix : scipy.sparse.csr_matrix of bool, shape (n_nodes, n_nodes)
+                Entry (i, j) is True if node j is a proper ancestor of
+                node i.
+        """
+        if self._ancestor_matrix is None:
+            block_size = max(1, 2**24 // max(1, self.n_nodes))
+            rows, columns = [], []
+            for start in range(0, self.n_nodes, block_size):
+                end = start + block_size
+                block_rows, block_columns = np.nonzero(
+                    self.unpack(self.ancestor_bits[start:end])
+                )
+                rows.append(block_rows + start)
+                columns.append(block_columns)
+            rows, columns = np.concatenate(rows), np.concatenate(columns)
+            self._ancestor_matrix = sparse.csr_matrix(
+                (np.ones(rows.shape[0], dtype=bool), (rows, columns)),
+                shape=(self.n_nodes, self.n_nodes),
+            )
+        return self._ancestor_matrix
+
+    def pack(self, node_ids):
+        """Pack a set of node ids into one row of bits.
+
+        Parameters
+        ----------
+        node_ids : array-like of int or numpy.ndarray of bool
+                The node ids or a boolean mask over all node ids.
+
+        Returns
+        ----------
+        bits : numpy.ndarray of uint8
+                The packed set.
+        """
+        node_ids = np.asarray(node_ids)
+        if node_ids.dtype == bool:
+            return np.packbits(node_ids, bitorder="little")
+        mask = np.zeros(self.n_nodes, dtype=bool)
+        mask[node_ids] = True
+        return np.packbits(mask, bitorder="little")
+
+    def contains(self, bits, node_id):
+        """Check if a node is in a packed set."""
+        return bool((bits[node_id >> 3] >> (node_id & 7)) & 1)
+
+    def unpack(self, bits):
+        """Unpack rows of bits into boolean masks over all node ids."""
+        return np.unpackbits(bits, axis=-1, count=self.n_nodes, bitorder="little").view(
+            bool
+        )
+
+    def ancestor_mask(self, node_id):
+        """Boolean mask of the proper ancestors of a node."""
+        return self.unpack(self.ancestor_bits[node_id])
+
+    def descendant_mask(self, node_id):
+        """Boolean mask of the proper descendants of a node."""
+        return self.unpack(self.descendant_bits[node_id])
+
+    def ancestors(self, node_id):
+        """Get the sorted ids of the proper ancestors of a node."""
+        return np.flatnonzero(self.ancestor_mask(node_id))
+
+    def descendants(self, node_id):
+        """Get the sorted ids of the proper descendants of a node."""
+        return np.flatnonzero(self.descendant_mask(node_id))
+
+    def is_ancestor(self, ancestor, node_id):
+        """Check if ancestor is a proper ancestor of node_id.
+
+        Both arguments can be arrays of node ids of the same shape.
+        """
+        return _test_bit(self.ancestor_bits, node_id, ancestor)
+
+    def is_descendant(self, descendant, node_id):
+        """Check if descendant is a proper descendant of node_id.
+
+        Both arguments can be arrays of node ids of the same shape.
+        """
+        return _test_bit(self.descendant_bits, node_id, descendant)
+
+    def has_ancestor_in(self, node_ids, bits):
+        """Check for each node if one of its ancestors is in a packed set."""
+        return (self.ancestor_bits[node_ids] & bits).any(axis=-1)
+
+    def has_descendant_in(self, node_ids, bits):
+        """Check for each node if one of its descendants is in a packed set."""
+        return (self.descendant_bits[node_ids] & bits).any(axis=-1)
+
+
+def _test_bit(bits, rows, positions):
+    """Test the bits at the given positions of the given rows."""
+    positions = np.asarray(positions)
+    return ((bits[rows, positions >> 3] >> (positions & 7)) & 1).astype(bool)
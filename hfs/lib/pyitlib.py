@@ -118,6 +118,10 @@ import pandas as pd
 import sklearn.preprocessing
 
 NONE_REPLACEMENT = -32768
+# Joint entropies of integer data are counted with np.bincount as long as the
+# joint alphabet has at most this many codes (or not more than there are
+# observations)
+SMALL_ALPHABET_MAX_CODES = 2**16
 
 # Aims of project: Comprehensive, Simple-to-use (avoid lots of function calls,
 # prefer flags, convenient defaults for possible interactive use). Focus on
@@ -1306,6 +1310,17 @@ def information_mutual_conditional(
     internal conversion step, supply integer data and use the default fill
     value -1.
     """
+    S = _small_alphabet_input(
+        (X, Y, Z), (Alphabet_X, Alphabet_Y, Alphabet_Z), fill_value, estimator, base
+    )
+    if S is not None and not cartesian_product and X.shape == Y.shape == Z.shape:
+        I = _information_mutual_conditional_small_alphabet(*S, base)
+        if I is not None:
+            I = np.reshape(I, X.shape[:-1])
+            if keep_dims:
+                I = I[..., np.newaxis]
+            return I
+
     X, fill_value_X = _sanitise_array_input(X, fill_value)
     Y, fill_value_Y = _sanitise_array_input(Y, fill_value)
     Z, fill_value_Z = _sanitise_array_input(Z, fill_value)
@@ -3702,6 +3717,15 @@ def entropy_joint(
     # in this function.
     # TODO NB: The joint observation function must honour missing data fill
     # values.
+    S = _small_alphabet_input((X,), (Alphabet_X,), fill_value, estimator, base)
+    if S is not None:
+        Codes, Lengths = _small_alphabet_codes(S[0])
+        if Codes is not None:
+            H = _entropy_joint_small_alphabet(Codes, Lengths, base)
+            if keep_dims and not np.isnan(H):
+                H = H[..., np.newaxis]
+            return H
+
     X, fill_value_X = _sanitise_array_input(X, fill_value)
     if Alphabet_X is not None:
         Alphabet_X, fill_value_Alphabet_X = _sanitise_array_input(Alphabet_X, fill_value)
@@ -4539,6 +4563,25 @@ def _determine_number_additional_empty_bins(Counts, Alphabet, Full_Alphabet, fil
     )
 
 
+def _entropy_joint_small_alphabet(Codes, Lengths, base):
+    """
+    Returns the joint entropy of the rows of Codes like entropy_joint() with
+    the ML estimator, given codes of the observations as returned by
+    _small_alphabet_codes().
+
+    Observations missing in any row are ignored. The joint symbols are counted
+    in the order entropy_joint() sorts them, which uses the last row as the
+    primary key, so that the result is identical.
+    """
+    Codes = Codes[:, np.all(Codes != -1, axis=0)]
+    if Codes.shape[1] == 0:
+        return np.float64(np.nan)
+    L = np.bincount(np.ravel_multi_index(tuple(Codes), tuple(Lengths), order="F"))
+    L = L[L > 0]
+    P, _ = _estimate_probabilities(L, "ML")
+    return entropy_pmf(P, base, require_valid_pmf=False)
+
+
 def _estimate_probabilities(Counts, estimator, n_additional_empty_bins=0):
     # TODO Documentation should present the following guidelines:
     # 1) Good-Turing may be used if slope requirement satisfied and if
@@ -4723,6 +4766,26 @@ def _increment_binary_vector(X):
     return X
 
 
+def _information_mutual_conditional_small_alphabet(X, Y, Z, base):
+    """
+    Returns the conditional mutual information between the rows of the
+    integer arrays X and Y given the rows of Z like
+    information_mutual_conditional() with the ML estimator, or None if the
+    joint alphabet is too large for _small_alphabet_codes().
+    """
+    I = np.empty(X.shape[0])
+    for i in range(X.shape[0]):
+        Codes, Lengths = _small_alphabet_codes(np.vstack((X[i], Y[i], Z[i])))
+        if Codes is None:
+            return None
+        H = [
+            _entropy_joint_small_alphabet(Codes[Rows], Lengths[Rows], base)
+            for Rows in ([0, 2], [1, 2], [0, 1, 2], [2])
+        ]
+        I[i] = H[0] + H[1] - H[2] - H[3]
+    return I
+
+
 def _isnan(X):
     X = np.array(X, copy=False)
     if X.dtype in ("int", "float"):
@@ -4823,6 +4886,55 @@ def _sanitise_array_input(X, fill_value=-1):
     return X, np.array(fill_value)
 
 
+def _small_alphabet_codes(X):
+    """
+    Maps the observations in each row of the integer array X to the codes
+    0, ..., length - 1 in ascending order, where the fill value -1 stays -1.
+    Returns the codes and the length of each row, or (None, None) if the
+    joint alphabet of all rows has more than SMALL_ALPHABET_MAX_CODES codes
+    and more codes than there are observations.
+    """
+    X = X.astype(np.int64)
+    Valid = X != -1
+    Observed = np.any(Valid, axis=1)
+    Minimum = np.where(Valid, X, np.iinfo(np.int64).max).min(axis=1)
+    Maximum = np.where(Valid, X, np.iinfo(np.int64).min).max(axis=1)
+    Minimum = np.where(Observed, Minimum, 0)
+    Lengths = np.where(Observed, Maximum - Minimum + 1, 1)
+    n_codes = 1
+    for length in Lengths:
+        n_codes *= int(length)
+    if n_codes > max(SMALL_ALPHABET_MAX_CODES, X.shape[1]):
+        return None, None
+    return np.where(Valid, X - Minimum[:, np.newaxis], -1), Lengths
+
+
+def _small_alphabet_input(Arrays, Alphabets, fill_value, estimator, base):
+    """
+    Returns the arrays reshaped to 2-D if their joint entropies may be
+    counted by _entropy_joint_small_alphabet(), i.e. if they are non-empty
+    numpy arrays of integers with the default fill value and neither
+    alphabets nor an estimator other than ML are given. Returns None
+    otherwise, in which case the general implementation is used.
+    """
+    if not (isinstance(estimator, str) and estimator.upper().replace(" ", "") == "ML"):
+        return None
+    if any(Alphabet is not None for Alphabet in Alphabets):
+        return None
+    if not (isinstance(fill_value, (int, np.integer)) and fill_value == -1):
+        return None
+    if not (np.isscalar(base) and np.isreal(base) and base > 0):
+        return None
+    Reshaped = []
+    for A in Arrays:
+        if type(A) is not np.ndarray or A.dtype.kind not in "biu" or A.ndim == 0:
+            return None
+        if A.size == 0:
+            return None
+        Reshaped.append(np.reshape(A, (-1, A.shape[-1])))
+    return Reshaped
+
+
 def _verify_alphabet_sufficiently_large(X, Alphabet, fill_value):
     assert not np.any(X == np.array(None))
     assert not np.any(Alphabet == np.array(None))
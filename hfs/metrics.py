@@ -2,89 +2,105 @@
 Different metric functions.
 """
 
+import math
+
 import numpy as np
-from info_gain.info_gain import info_gain, info_gain_ratio
 from numpy.linalg import norm
 from scipy import sparse
+from scipy.special import entr
 
 from hfs.lib.pyitlib import information_mutual_conditional as imc
+from hfs.packed import PackedBinaryMatrix
+from hfs.sufficient_statistics import SufficientStatistics, get_statistics
 
 
-def lift(data, labels):
+def lift(data, labels=None, pos_label=None):
     """Calculates the lift value for each feature in the data.
 
+    The values of all features are computed at once from the number of
+    non-zero values of each feature and the number of those that belong
+    to a positive sample.
+
     Parameters
     ----------
-    data : {array-like, sparse matrix}, shape (n_samples, n_features)
-            The training input samples.
+    data : {array-like, sparse matrix, PackedBinaryMatrix, SufficientStatistics}
+            The training input samples, shape (n_samples, n_features), or
+            their statistics.
     labels : array-like, shape (n_samples,)
-        The target values. An array of int. Not needed for all estimators.
+        The target values. An array of int. Not needed for all estimators
+        and not if data are statistics.
+    pos_label : {int, array-like} or None
+        The label or labels of the positive class. If None every label
+        other than 0 is positive. Default is None.
 
     Returns
     ----------
-    lift_values : list, length n_features
-                The lift values for all features. List of floats.
+    lift_values : numpy.ndarray, shape (n_features,)
+                The lift values for all features. 0 for features without
+                non-zero values.
     """
-    lift_values = []
-    num_samples, num_features = data.shape
-
-    if sparse.issparse(data):
-        # Ensure CSC format for subscriptability and efficient column access
-        data = data.tocsc()
-
-    for index in range(num_features):
+    num_samples = data.shape[0]
+    if isinstance(data, PackedBinaryMatrix):
+        data = SufficientStatistics(data, labels)
+    if isinstance(data, SufficientStatistics):
+        positive = _is_positive(data.classes, pos_label)
+        non_zeros = data.class_counts - data.value_class_counts(0)
+        non_zero_values = non_zeros.sum(axis=1)
+        positive_non_zero_values = non_zeros[:, positive].sum(axis=1)
+    else:
+        positive = _is_positive(np.asarray(labels).ravel(), pos_label)
         if sparse.issparse(data):
-            column = data[:, [index]]
-            non_zero_values = column.nnz
+            non_zeros = sparse.csc_matrix(data != 0, dtype=np.intp)
+            non_zero_values = np.asarray(non_zeros.sum(axis=0)).ravel()
+            positive_non_zero_values = non_zeros.T @ positive.astype(np.intp)
         else:
-            column = data[:, index]
-            non_zero_values = np.count_nonzero(column)
+            non_zeros = np.asarray(data) != 0
+            non_zero_values = np.count_nonzero(non_zeros, axis=0)
+            positive_non_zero_values = np.count_nonzero(non_zeros[positive], axis=0)
 
-        prob_feature = non_zero_values / num_samples
+    lift_values = np.zeros(data.shape[1])
+    has_values = non_zero_values > 0
+    prob_feature = non_zero_values[has_values] / num_samples
+    prob_event_conditional = (
+        positive_non_zero_values[has_values] / non_zero_values[has_values]
+    )
+    lift_values[has_values] = prob_event_conditional / prob_feature
+    return lift_values
 
-        if non_zero_values > 0:
-            prob_event_conditional = (
-                len(
-                    [
-                        value
-                        for index, value in enumerate(column)
-                        if value != 0 and labels[index] != 0
-                    ]
-                )
-                / non_zero_values
-            )
 
-            lift_values.append(prob_event_conditional / prob_feature)
-        else:
-            lift_values.append(0)
-    return lift_values
+def _is_positive(labels, pos_label):
+    """Whether the labels belong to the positive class, see ``lift``."""
+    if pos_label is None:
+        return labels != 0
+    return np.isin(labels, pos_label)
 
 
-def information_gain(data, labels):
+def information_gain(data, labels=None):
     """Calculates the information gain for each feature in the data.
 
     Parameters
     ----------
-    data : {array-like, sparse matrix}, shape (n_samples, n_features)
-            The training input samples.
+    data : {array-like, sparse matrix, PackedBinaryMatrix, SufficientStatistics}
+            The training input samples, shape (n_samples, n_features), or
+            their statistics.
     labels : array-like, shape (n_samples,)
-        The target values. An array of int. Not needed for all estimators.
+        The target values. An array of int. Not needed if data are
+        statistics.
 
     Returns
     ----------
     ig_values : list, length n_features
                 The information gain values for all features.
                 List of floats.
+
+    Notes
+    ----------
+    The values match those of ``info_gain.info_gain.info_gain`` called with
+    each feature column and the labels, but the counts of all features are
+    taken in one pass over the data.
     """
-    ig_values = []
-    for column_index in range(data.shape[1]):
-        if sparse.issparse(data):
-            column = data[:, [column_index]]
-        else:
-            column = data[:, column_index]
-        ig = info_gain(column, labels)
-        ig_values.append(ig)
-    return ig_values
+    ig_values, _ = _information_gains(get_statistics(data, labels))
+    return list(ig_values)
 
 
 def conditional_mutual_information(node1, node2, y):
@@ -106,6 +122,310 @@ def conditional_mutual_information(node1, node2, y):
     return imc(node1, node2, y)
 
 
+def conditional_mutual_information_matrix(data, labels=None, block_size=None):
+    """Calculates the conditional mutual information of all pairs of features.
+
+    For binary features the joint counts of two features within a class
+    follow from the number of samples of the class, the number of ones of
+    each feature and the number of samples where both are one. The last
+    comes from the product ``X_c.T @ X_c`` of the samples of the class,
+    so all pairs of a block of features are counted at once.
+
+    Parameters
+    ----------
+    data : {array-like, sparse matrix, PackedBinaryMatrix, SufficientStatistics}
+            The training input samples, shape (n_samples, n_features), or
+            their statistics with pairwise co-occurrences. Only 0 and 1 are
+            allowed as values.
+    labels : array-like, shape (n_samples,)
+        The target values. Not needed if data are statistics.
+    block_size : int or None
+        The number of features per block of pairs. If None it is chosen so
+        that the joint counts of a block have about 2^22 entries.
+
+    Returns
+    ----------
+    cmi : numpy.ndarray, shape (n_features, n_features)
+          The symmetric matrix of the conditional mutual information.
+          The entries of two features are the value pyitlib calculates
+          with the feature of lower index first.
+    """
+    num_features = data.shape[1]
+    cmi = np.empty((num_features, num_features))
+    for rows, columns, values in _iter_conditional_mutual_information(
+        data, labels, block_size
+    ):
+        cmi[rows, columns] = values
+        cmi[columns, rows] = values.T
+    return cmi
+
+
+def conditional_mutual_information_edges(
+    data, labels=None, max_partners=None, block_size=None
+):
+    """Lists the pairs of features ordered by conditional mutual information.
+
+    The pairs are computed in blocks like
+    ``conditional_mutual_information_matrix`` without keeping the matrix.
+    With ``max_partners`` each feature only keeps the partners of its
+    pairs that come first in the order, so the list has at most
+    ``n_features * max_partners`` pairs.
+
+    Parameters
+    ----------
+    data : {array-like, sparse matrix, PackedBinaryMatrix, SufficientStatistics}
+            The training input samples, shape (n_samples, n_features), or
+            their statistics with pairwise co-occurrences. Only 0 and 1 are
+            allowed as values.
+    labels : array-like, shape (n_samples,)
+        The target values. Not needed if data are statistics.
+    max_partners : int or None
+        The number of partners kept per feature. If None all pairs are
+        listed.
+    block_size : int or None
+        The number of features per block, see
+        ``conditional_mutual_information_matrix``.
+
+    Returns
+    ----------
+    edges : numpy.ndarray, shape (n_pairs, 2)
+            The pairs of features, the feature of lower index first. They
+            are sorted by ascending conditional mutual information and ties
+            by the features.
+    cmi : numpy.ndarray, shape (n_pairs,)
+          The conditional mutual information of the pairs.
+    """
+    num_features = data.shape[1]
+    blocks = _iter_conditional_mutual_information(data, labels, block_size)
+    if max_partners is None:
+        firsts, seconds, values = [], [], []
+        for rows, columns, block in blocks:
+            first, second = np.meshgrid(
+                np.arange(rows.start, rows.stop),
+                np.arange(columns.start, columns.stop),
+                indexing="ij",
+            )
+            upper = first < second
+            firsts.append(first[upper])
+            seconds.append(second[upper])
+            values.append(block[upper])
+        first = np.concatenate(firsts).astype(np.intp)
+        second = np.concatenate(seconds).astype(np.intp)
+        values = np.concatenate(values)
+    else:
+        partners = np.full((num_features, max_partners), -1, dtype=np.intp)
+        partner_values = np.full((num_features, max_partners), np.inf)
+        for rows, columns, block in blocks:
+            row_nodes = np.arange(rows.start, rows.stop)
+            column_nodes = np.arange(columns.start, columns.stop)
+            block = np.where(row_nodes[:, np.newaxis] == column_nodes, np.inf, block)
+            _keep_first_partners(partners, partner_values, rows, column_nodes, block)
+            if rows != columns:
+                _keep_first_partners(
+                    partners, partner_values, columns, row_nodes, block.T
+                )
+        first = np.repeat(np.arange(num_features), max_partners)
+        second = partners.ravel()
+        values = partner_values.ravel()
+        valid = (second >= 0) & (second != first)
+        first, second = np.minimum(first, second)[valid], np.maximum(first, second)[valid]
+        _, unique = np.unique(first * num_features + second, return_index=True)
+        first, second, values = first[unique], second[unique], values[valid][unique]
+
+    order = np.lexsort((second, first, values))
+    return np.column_stack([first[order], second[order]]), values[order]
+
+
+def _keep_first_partners(partners, partner_values, nodes, candidates, values):
+    """Keeps the partners with the lowest values of each node in place.
+
+    The stable sort keeps the earlier partner of a tie, and the candidates
+    of later blocks have higher indices, so ties keep the lower index.
+    """
+    num_partners = partners.shape[1]
+    merged_values = np.concatenate([partner_values[nodes], values], axis=1)
+    merged_partners = np.concatenate(
+        [partners[nodes], np.broadcast_to(candidates, values.shape)], axis=1
+    )
+    keep = np.argsort(merged_values, axis=1, kind="stable")[:, :num_partners]
+    partner_values[nodes] = np.take_along_axis(merged_values, keep, axis=1)
+    partners[nodes] = np.take_along_axis(merged_partners, keep, axis=1)
+
+
+def _iter_conditional_mutual_information(data, labels=None, block_size=None):
+    """Yields the conditional mutual information of blocks of feature pairs.
+
+    The blocks cover the pairs of the upper triangle including the
+    diagonal. The values equal those of ``conditional_mutual_information``
+    with the feature of lower index as first argument.
+
+    Parameters
+    ----------
+    data : {array-like, sparse matrix, PackedBinaryMatrix, SufficientStatistics}
+            The training input samples, shape (n_samples, n_features), or
+            their statistics with pairwise co-occurrences. Only 0 and 1 are
+            allowed as values.
+    labels : array-like, shape (n_samples,)
+        The target values. Not needed if data are statistics.
+    block_size : int or None
+        The number of features per block, see
+        ``conditional_mutual_information_matrix``.
+
+    Yields
+    ----------
+    rows : slice
+        The features of the first argument.
+    columns : slice
+        The features of the second argument.
+    values : numpy.ndarray, shape (rows, columns)
+        The conditional mutual information of the pairs. In blocks on the
+        diagonal the lower triangle mirrors the upper one.
+    """
+    if isinstance(data, PackedBinaryMatrix):
+        data = SufficientStatistics(data, labels, pairwise=True)
+    if isinstance(data, SufficientStatistics):
+        statistics = get_statistics(data, pairwise=True)
+        num_features = statistics.num_features
+        classes = statistics.classes
+        # pyitlib treats -1 as a missing value and ignores these samples
+        observed = np.ones(len(classes), dtype=bool)
+        if classes.dtype.kind in "biuf":
+            observed = classes != -1
+        class_sizes = statistics.class_counts[observed]
+        ones = statistics.value_class_counts(1)[:, observed]
+        co_occurrences = statistics.co_occurrences[observed]
+    else:
+        labels = np.asarray(labels).ravel()
+        if sparse.issparse(data):
+            data = sparse.csr_matrix(data)
+            values = data.data
+        else:
+            data = np.asarray(data)
+            values = data
+        if np.any((values != 0) & (values != 1)):
+            raise ValueError("Conditional mutual information needs binary features.")
+        if labels.dtype.kind in "biuf":
+            observed = labels != -1
+            data = data[observed]
+            labels = labels[observed]
+
+        num_features = data.shape[1]
+        class_data = []
+        for label in np.unique(labels):
+            samples = data[labels == label]
+            if sparse.issparse(samples):
+                class_data.append(sparse.csc_matrix(samples, dtype=np.float64))
+            else:
+                class_data.append(np.asarray(samples, dtype=np.float64))
+        class_sizes = np.array([samples.shape[0] for samples in class_data])
+        ones = np.array(
+            [np.asarray(samples.sum(axis=0)).ravel() for samples in class_data],
+            dtype=np.int64,
+        ).T
+        co_occurrences = None
+    num_samples = class_sizes.sum()
+
+    class_entropy = _joint_entropies(class_sizes[np.newaxis], num_samples)[0]
+    # the joint counts are ordered by class first, as pyitlib sorts them
+    feature_counts = np.stack([class_sizes - ones, ones], axis=2)
+    feature_entropies = _joint_entropies(
+        feature_counts.reshape(num_features, -1), num_samples
+    )
+
+    if block_size is None:
+        block_size = max(1, math.isqrt(2**22 // (4 * max(1, len(class_sizes)))))
+    for row_start in range(0, num_features, block_size):
+        rows = slice(row_start, min(row_start + block_size, num_features))
+        for column_start in range(row_start, num_features, block_size):
+            columns = slice(column_start, min(column_start + block_size, num_features))
+            if co_occurrences is None:
+                both = np.stack(
+                    [
+                        _as_dense(samples[:, rows].T @ samples[:, columns])
+                        for samples in class_data
+                    ],
+                    axis=2,
+                ).astype(np.int64)
+            else:
+                both = np.moveaxis(co_occurrences[:, rows, columns], 0, 2)
+            counts = _pair_counts(both, class_sizes, ones, rows, columns)
+            pair_entropies = _joint_entropies(
+                counts.reshape(-1, counts.shape[2] * counts.shape[3]), num_samples
+            ).reshape(counts.shape[:2])
+            values = (
+                feature_entropies[rows, np.newaxis]
+                + feature_entropies[np.newaxis, columns]
+                - pair_entropies
+                - class_entropy
+            )
+            if row_start == column_start:
+                upper = np.triu(np.ones(values.shape, dtype=bool))
+                values = np.where(upper, values, values.T)
+            yield rows, columns, values
+
+
+def _pair_counts(both, class_sizes, ones, rows, columns):
+    """Counts the joint values of pairs of binary features per class.
+
+    Parameters
+    ----------
+    both : numpy.ndarray, shape (rows, columns, n_classes)
+             The number of samples of each class where both features are 1.
+
+    Returns
+    ----------
+    counts : numpy.ndarray, shape (rows, columns, n_classes, 4)
+             The number of samples of each class where the pair of features
+             has the values (0, 0), (1, 0), (0, 1) and (1, 1).
+    """
+    first = ones[rows, np.newaxis, :]
+    second = ones[np.newaxis, columns, :]
+    return np.stack(
+        [class_sizes - first - second + both, first - both, second - both, both],
+        axis=3,
+    )
+
+
+def _as_dense(matrix):
+    """Returns a dense array of a dense or sparse product."""
+    if sparse.issparse(matrix):
+        return matrix.toarray()
+    return np.asarray(matrix)
+
+
+def _joint_entropies(counts, num_samples):
+    """Calculates the entropy of each row of joint counts like pyitlib.
+
+    pyitlib only sums up the probabilities of observed joint values, so the
+    rows are grouped by their number of observed values to sum up the same
+    terms in the same order.
+
+    Parameters
+    ----------
+    counts : numpy.ndarray, shape (n_rows, n_values)
+            The joint counts, ordered like pyitlib sorts the joint values.
+    num_samples : int
+            The number of samples.
+
+    Returns
+    ----------
+    entropies : numpy.ndarray, shape (n_rows,)
+            The entropy of each row in bits.
+    """
+    entropies = np.empty(counts.shape[0])
+    observed = counts > 0
+    num_observed = observed.sum(axis=1)
+    for num_values in np.unique(num_observed):
+        group = np.flatnonzero(num_observed == num_values)
+        probabilities = counts[group][observed[group]].reshape(-1, num_values) / (
+            1.0 * num_samples
+        )
+        entropies[group] = -np.sum(
+            probabilities * np.log2(probabilities + np.spacing(0)), axis=-1
+        )
+    return entropies
+
+
 def cosine_similarity(i: np.ndarray, j: np.ndarray):
     """Calculates the cosine similarity for two rows from the dataset.
 
@@ -123,15 +443,17 @@ def cosine_similarity(i: np.ndarray, j: np.ndarray):
     return np.dot(i, j) / (norm(i) * norm(j))
 
 
-def gain_ratio(data, labels):
+def gain_ratio(data, labels=None):
     """Calculates the information gain ratio for each feature.
 
     Parameters
     ----------
-    X : {array-like, sparse matrix}, shape (n_samples, n_features)
-        The data samples.
-    y : array-like, shape (n_samples,)
-        The target values. An array of int.
+    data : {array-like, sparse matrix, PackedBinaryMatrix, SufficientStatistics}
+        The data samples, shape (n_samples, n_features), or their
+        statistics.
+    labels : array-like, shape (n_samples,)
+        The target values. An array of int. Not needed if data are
+        statistics.
 
     Returns
     ----------
@@ -139,15 +461,8 @@ def gain_ratio(data, labels):
                 A list of floats containing the information gain
                 values for each feature in the dataset.
     """
-    gr_values = []
-    for column_index in range(data.shape[1]):
-        if sparse.issparse(data):
-            column = data[:, [column_index]]
-        else:
-            column = data[:, column_index]
-        gr = info_gain_ratio(column, labels)
-        gr_values.append(gr)
-    return gr_values
+    ig_values, intrinsic_value = _information_gains(get_statistics(data, labels))
+    return list(ig_values / intrinsic_value)
 
 
 def pearson_correlation(i: np.ndarray, j: np.ndarray):
@@ -165,3 +480,111 @@ def pearson_correlation(i: np.ndarray, j: np.ndarray):
     float : The pearson correlation between the input vectors.
     """
     return np.corrcoef(i, j)[0, 1]
+
+
+def _information_gains(statistics):
+    """Calculates the information gain of all features and the intrinsic value.
+
+    The information gain of a feature is the entropy of its values minus
+    the entropy of its values within each class, weighted by the share of
+    the class. The intrinsic value only depends on the class shares.
+
+    Parameters
+    ----------
+    statistics : SufficientStatistics
+            The counts of the samples.
+
+    Returns
+    ----------
+    ig_values : numpy.ndarray, shape (n_features,)
+                The information gain values for all features.
+    intrinsic_value : float
+                The intrinsic value of the labels.
+    """
+    num_samples = statistics.num_samples
+    class_counts = statistics.class_counts
+
+    intrinsic_value = 0
+    for position in statistics.set_order:
+        share = class_counts[position] / num_samples
+        intrinsic_value += share * math.log(share, 2)
+    intrinsic_value = -intrinsic_value
+
+    counts, starts = statistics.counts, statistics.starts
+    if statistics.num_features == 0:
+        return np.zeros(0), intrinsic_value
+    entropy = np.add.reduceat(entr(counts.sum(axis=1) / num_samples), starts)
+    class_entropies = np.add.reduceat(entr(counts / class_counts), starts, axis=0)
+    conditional_entropy = 0
+    for position in statistics.set_order:
+        share = class_counts[position] / num_samples
+        conditional_entropy = conditional_entropy + share * class_entropies[:, position]
+    return entropy - conditional_entropy, intrinsic_value
+
+
+def pearson_correlations(data, first_columns, second_columns, block_size=None):
+    """Calculates the correlation between pairs of columns.
+
+    The columns are centred by their means, so every pair only needs the
+    sum of the products of its centred values. For sparse data the sum is
+    taken from the products of the stored values.
+
+    Parameters
+    ----------
+    data : {array-like, sparse matrix}, shape (n_samples, n_features)
+            The input samples.
+    first_columns : array-like of int, shape (n_pairs,)
+            The first column of each pair.
+    second_columns : array-like of int, shape (n_pairs,)
+            The second column of each pair.
+    block_size : int or None
+            The number of pairs computed at once. If None it is chosen so
+            that a block has about 2^22 entries.
+
+    Returns
+    ----------
+    correlations : numpy.ndarray, shape (n_pairs,)
+            The pearson correlation of each pair. NaN if a column is
+            constant.
+    """
+    first_columns = np.asarray(first_columns, dtype=np.intp)
+    second_columns = np.asarray(second_columns, dtype=np.intp)
+    num_samples = data.shape[0]
+    if sparse.issparse(data):
+        data = sparse.csc_matrix(data, dtype=np.float64)
+        means = np.asarray(data.sum(axis=0)).ravel() / num_samples
+        num_stored = np.diff(data.indptr)
+        entry_columns = np.repeat(np.arange(data.shape[1]), num_stored)
+        variances = (
+            np.bincount(
+                entry_columns,
+                weights=(data.data - means[entry_columns]) ** 2,
+                minlength=data.shape[1],
+            )
+            + (num_samples - num_stored) * means**2
+        )
+    else:
+        data = np.asarray(data, dtype=np.float64)
+        means = data.mean(axis=0)
+        data = data - means
+        variances = np.einsum("ij,ij->j", data, data)
+    if block_size is None:
+        block_size = max(1, 2**22 // max(1, num_samples))
+
+    covariances = np.empty(first_columns.shape[0])
+    for start in range(0, first_columns.shape[0], block_size):
+        end = start + block_size
+        first, second = first_columns[start:end], second_columns[start:end]
+        if sparse.issparse(data):
+            products = np.asarray(data[:, first].multiply(data[:, second]).sum(axis=0))
+            covariances[start:end] = (
+                products.ravel() - num_samples * means[first] * means[second]
+            )
+        else:
+            covariances[start:end] = np.einsum(
+                "ij,ij->j", data[:, first], data[:, second]
+            )
+    deviations = np.sqrt(variances[first_columns] * variances[second_columns])
+    correlations = np.full(first_columns.shape[0], np.nan)
+    np.divide(covariances, deviations, out=correlations, where=deviations > 0)
+    return np.clip(correlations, -1, 1)
@@ -0,0 +1,228 @@
+"""
+Bit-packed storage of binary data.
+"""
+
+import numpy as np
+from scipy import sparse
+
+# number of set bits of every byte, used if numpy has no bitwise_count
+_POPCOUNT_TABLE = np.array([bin(byte).count("1") for byte in range(256)], dtype=np.uint8)
+
+
+class PackedBinaryMatrix:
+    """Binary matrix with each column packed into uint64 words.
+
+    Hierarchical data is binary by construction, but is usually stored as
+    float64. Packed, every entry needs one bit instead of 64. Counts of
+    ones, co-occurrences of two columns and Hamming distances are computed
+    with AND or XOR of the words and a popcount.
+
+    Bit i of column j is sample i of feature j. Bit i is stored in word
+    ``i // 64`` of the column, the unused bits of the last word are 0.
+
+    Parameters
+    ----------
+    X : {array-like, sparse matrix}, shape (n_samples, n_features)
+        The binary input samples.
+
+    Attributes
+    ----------
+    shape : tuple
+        The shape (n_samples, n_features) of the unpacked matrix.
+    bits : numpy.ndarray of uint64, shape (n_features, n_words)
+        The packed columns.
+    """
+
+    def __init__(self, X):
+        if not is_binary(X):
+            raise ValueError("Only binary data can be packed.")
+        self.shape = tuple(X.shape)
+        num_samples, num_features = self.shape
+        num_words = (num_samples + 63) // 64
+        if sparse.issparse(X):
+            X = sparse.csc_matrix(X)
+            X.eliminate_zeros()
+            columns = np.repeat(np.arange(num_features), np.diff(X.indptr))
+            rows = X.indices.astype(np.uint64)
+            self.bits = np.zeros((num_features, num_words), dtype=np.uint64)
+            np.bitwise_or.at(
+                self.bits,
+                (columns, (rows >> np.uint64(6)).astype(np.intp)),
+                np.left_shift(np.uint64(1), rows & np.uint64(63)),
+            )
+        else:
+            self.bits = _pack_rows(np.asarray(X).T != 0, num_words)
+
+    @property
+    def nbytes(self):
+        """The number of bytes of the packed columns."""
+        return self.bits.nbytes
+
+    def pack_samples(self, mask):
+        """Pack a boolean mask over the samples into words.
+
+        Parameters
+        ----------
+        mask : array-like of bool, shape (n_samples,)
+            The selected samples.
+
+        Returns
+        ----------
+        words : numpy.ndarray of uint64, shape (n_words,)
+            The packed mask, which can be passed as samples to the
+            counting methods.
+        """
+        mask = np.asarray(mask, dtype=bool).reshape(1, -1)
+        return _pack_rows(mask, self.bits.shape[1])[0]
+
+    def count_ones(self, samples=None):
+        """Count the ones of each column.
+
+        Parameters
+        ----------
+        samples : numpy.ndarray of uint64 or None
+            The packed mask of the samples to count, see pack_samples. If
+            None all samples are counted.
+
+        Returns
+        ----------
+        counts : numpy.ndarray of int64, shape (n_features,)
+            The number of ones in each column.
+        """
+        if samples is None:
+            return count_bits(self.bits)
+        return count_bits(self.bits & samples)
+
+    def class_counts(self, class_codes, num_classes):
+        """Count the ones of each column per class.
+
+        Parameters
+        ----------
+        class_codes : numpy.ndarray, shape (n_samples,)
+            The class of each sample as an int in ``range(num_classes)``.
+        num_classes : int
+            The number of classes.
+
+        Returns
+        ----------
+        counts : numpy.ndarray of int64, shape (n_features, num_classes)
+            The number of ones of each column in the samples of each class.
+        """
+        counts = np.zeros((self.shape[1], num_classes), dtype=np.int64)
+        for code in range(num_classes):
+            counts[:, code] = self.count_ones(self.pack_samples(class_codes == code))
+        return counts
+
+    def co_occurrences(self, samples=None, block_size=None):
+        """Count the samples in which both columns of a pair are 1.
+
+        Parameters
+        ----------
+        samples : numpy.ndarray of uint64 or None
+            The packed mask of the samples to count, see pack_samples. If
+            None all samples are counted.
+        block_size : int or None
+            The number of columns compared to all others at once. If None
+            it is chosen so that a block has about 2^22 words.
+
+        Returns
+        ----------
+        counts : numpy.ndarray of int64, shape (n_features, n_features)
+            The number of samples in which both columns are 1.
+        """
+        bits = self.bits if samples is None else self.bits & samples
+        return _pairwise_bit_counts(bits, np.bitwise_and, block_size)
+
+    def hamming_distances(self, block_size=None):
+        """Count the samples in which the columns of a pair differ.
+
+        Parameters
+        ----------
+        block_size : int or None
+            The number of columns compared to all others at once. If None
+            it is chosen so that a block has about 2^22 words.
+
+        Returns
+        ----------
+        distances : numpy.ndarray of int64, shape (n_features, n_features)
+            The Hamming distances of all pairs of columns.
+        """
+        return _pairwise_bit_counts(self.bits, np.bitwise_xor, block_size)
+
+    def toarray(self):
+        """Unpack the matrix into a dense array of uint8."""
+        return _unpack_rows(self.bits, self.shape[0]).T.astype(np.uint8)
+
+
+def binary_columns(X):
+    """Check for each column of X if all its values are 0 or 1.
+
+    Parameters
+    ----------
+    X : {array-like, sparse matrix}, shape (n_samples, n_features)
+        The input samples.
+
+    Returns
+    ----------
+    binary : numpy.ndarray of bool, shape (n_features,)
+        Whether each column is binary.
+    """
+    if sparse.issparse(X):
+        X = sparse.csc_matrix(X)
+        non_binary = (X.data != 0) & (X.data != 1)
+        columns = np.repeat(np.arange(X.shape[1]), np.diff(X.indptr))
+        return np.bincount(columns[non_binary], minlength=X.shape[1]) == 0
+    X = np.asarray(X)
+    return np.all((X == 0) | (X == 1), axis=0)
+
+
+def is_binary(X):
+    """Check if all values of X are 0 or 1."""
+    return bool(np.all(binary_columns(X)))
+
+
+def count_bits(words):
+    """Count the set bits of words along the last axis.
+
+    Parameters
+    ----------
+    words : numpy.ndarray of uint64
+        The words.
+
+    Returns
+    ----------
+    counts : numpy.ndarray of int64, shape words.shape[:-1]
+        The number of set bits.
+    """
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(words).sum(axis=-1, dtype=np.int64)
+    words = np.ascontiguousarray(words)
+    table = _POPCOUNT_TABLE[words.view(np.uint8)]
+    return table.sum(axis=-1, dtype=np.int64)
+
+
+def _pack_rows(mask, num_words):
+    """Pack the rows of a boolean matrix into uint64 words."""
+    packed = np.zeros((mask.shape[0], num_words * 8), dtype=np.uint8)
+    num_bytes = (mask.shape[1] + 7) // 8
+    packed[:, :num_bytes] = np.packbits(mask, axis=1, bitorder="little")
+    # bit i of a row is bit i % 64 of word i // 64 on every platform
+    return packed.view("<u8").astype(np.uint64)
+
+
+def _unpack_rows(bits, count):
+    """Unpack rows of uint64 words into a boolean matrix."""
+    packed = bits.astype("<u8").view(np.uint8)
+    return np.unpackbits(packed, axis=1, count=count, bitorder="little").view(bool)
+
+
+def _pairwise_bit_counts(bits, operation, block_size):
+    """Count the set bits of an operation on all pairs of rows."""
+    num_rows, num_words = bits.shape
+    if block_size is None:
+        block_size = max(1, 2**22 // max(1, num_rows * num_words))
+    counts = np.empty((num_rows, num_rows), dtype=np.int64)
+    for start in range(0, num_rows, block_size):
+        end = min(start + block_size, num_rows)
+        counts[start:end] = count_bits(operation(bits[start:end, np.newaxis], bits))
+    return counts
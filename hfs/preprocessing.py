@@ -8,10 +8,11 @@ import warnings
 
 import networkx as nx
 import numpy as np
-from networkx.algorithms.dag import ancestors
+from scipy import sparse
 from sklearn.utils.validation import check_array, check_is_fitted
 
-from hfs.helpers import shrink_dag
+from hfs.helpers import column_ancestor_matrix, graph_to_hierarchy, shrink_dag
+from hfs.hierarchy import HierarchyIndex
 from hfs.selectors import HierarchicalEstimator
 
 
@@ -21,7 +22,9 @@ class HierarchicalPreprocessor(HierarchicalEstimator):
     The hierarchical feature selectors expect the input data and the
     hierarchy graph to conform to certain pre-conditions.
     This preprocessor prepares the data and graph for the feature
-    selection.
+    selection. transform returns data in the dtype and sparse format of
+    the input, the added columns and the propagated ones are written in
+    that dtype.
     """
 
     def __init__(self, hierarchy: np.ndarray = None):
@@ -29,8 +32,9 @@ class HierarchicalPreprocessor(HierarchicalEstimator):
 
         Parameters
         ----------
-        hierarchy : np.ndarray
-                    The hierarchy graph as an adjacency matrix."""
+        hierarchy : {np.ndarray, sparse matrix, networkx.DiGraph}
+                    The hierarchy graph as an adjacency matrix, an array of
+                    (parent, child) edges or a graph."""
         self.hierarchy = hierarchy
 
     def fit(self, X, y=None, columns=None):
@@ -83,20 +87,25 @@ class HierarchicalPreprocessor(HierarchicalEstimator):
         self.is_fitted_ = True
         return self
 
-    def transform(self, X):
+    def transform(self, X, out=None):
         """Transforms dataset to fulfill conditions for feature selection.
 
         After transformation, if a feature is 1, all of its descendents are 1.
-        Missing columns are added to the dataset.
+        Missing columns are added to the dataset. Sparse input results in
+        sparse output of the same format.
 
         Parameters
         ----------
         X : {array-like, sparse-matrix}, shape (n_samples, n_features)
             The input samples.
+        out : numpy.ndarray or None, shape (n_samples, n_selected_features)
+            An array to write the transformed dataset to, so that no new
+            array has to be allocated. Only supported for dense X. Default
+            is None.
 
         Returns
         -------
-        X_ : array of shape (n_samples, n_selected_features)
+        X_ : {array, sparse-matrix} of shape (n_samples, n_selected_features)
             The transformed dataset.
         """
         # Check is fit had been called
@@ -110,13 +119,23 @@ class HierarchicalPreprocessor(HierarchicalEstimator):
         if X.shape[1] != self.n_features_in_:
             raise ValueError("Shape of input is different from what was seen" "in `fit`")
 
-        X_ = self._add_columns(X)
-        X_ = self._propagate_ones(X_)
-        return X_
+        X_ = self._add_columns(X, out=out)
+        if sparse.issparse(X_):
+            return self._propagate_ones(X_)
+        return self._propagate_ones(X_, out=X_)
 
-    def get_hierarchy(self):
+    def get_hierarchy(self, format="dense"):
         """Get the transformed hierarchy graph.
 
+        Parameters
+        ----------
+        format : str
+            "dense" for a numpy.ndarray adjacency matrix, "sparse" for a
+            scipy.sparse.csr_matrix adjacency matrix, "edges" for an array
+            of (parent, child) edges or "graph" for a networkx.DiGraph.
+            All formats can be passed as hierarchy to the estimators.
+            Default is "dense".
+
         Raises
         ----------
         RuntimeError
@@ -124,9 +143,9 @@ class HierarchicalPreprocessor(HierarchicalEstimator):
             In this case the hierarchy graph has not been updated yet.
         """
         if self.is_fitted_:
-            output_hierarchy = self._hierarchy_graph
+            output_hierarchy = self._hierarchy_graph.copy()
             output_hierarchy.remove_node("ROOT")
-            return nx.to_numpy_array(self._hierarchy_graph)
+            return graph_to_hierarchy(output_hierarchy, format=format)
         else:
             raise RuntimeError("Instance has not been fitted.")
 
@@ -193,64 +212,100 @@ class HierarchicalPreprocessor(HierarchicalEstimator):
         These node names are added to self._columns and the corresponding
         columns will be added in the transform method.
         """
+        mapped_nodes = set(self._columns)
         missing_nodes = [
             node
             for node in self._hierarchy_graph.nodes
-            if node not in self._columns and node != "ROOT"
+            if node not in mapped_nodes and node != "ROOT"
         ]
         self._columns.extend(missing_nodes)
 
-    def _add_columns(self, X):
+    def _add_columns(self, X, out=None):
         """Adds missing columns to the dataset.
 
-        Missing columns are added and all values are set to 0.
+        Missing columns are added and all values are set to 0. Dense
+        input is copied into a single new array, sparse input is extended
+        with an empty sparse block. The dtype and the sparse format of X
+        are preserved.
 
         Parameters
         ----------
         X : {array-like, sparse-matrix}, shape (n_samples, n_features)
             The input samples.
+        out : numpy.ndarray or None, shape (n_samples, n_new_features)
+            An array to copy the dataset to. Only supported for dense X.
+            If None a new array is allocated for dense X.
         Returns
         -------
-        X_ : array of shape [n_samples, n_new_features]
+        X_ : {array, sparse-matrix} of shape [n_samples, n_new_features]
             The dataset with the added columns.
         """
-        X_ = X
         num_rows, num_columns = X.shape
-        if num_columns < len(self._columns):
-            missing_indices = list(range(num_columns, len(self._columns)))
-            for _ in missing_indices:
-                X_ = np.concatenate([X_, np.zeros((num_rows, 1), dtype=int)], axis=1)
-        return X_
-
-    def _propagate_ones(self, X):
+        num_missing = len(self._columns) - num_columns
+
+        if sparse.issparse(X):
+            if out is not None:
+                raise ValueError("out is not supported for sparse input.")
+            if num_missing <= 0:
+                return X
+            missing = sparse.csr_matrix((num_rows, num_missing), dtype=X.dtype)
+            return sparse.hstack([X, missing], format=X.format, dtype=X.dtype)
+
+        if out is None:
+            out = np.empty((num_rows, len(self._columns)), dtype=X.dtype)
+        out[:, :num_columns] = X
+        out[:, num_columns:] = 0
+        return out
+
+    def _propagate_ones(self, X, out=None):
         """Update the dataset to fulfill the 0-1-propagation rule..
 
         If a feature in the dataset in 1 all its descendents in the
         sample are set to 1.
 
+        The ancestors of all features are found with one product of the
+        features that are 1 and the ancestor closure of the hierarchy.
+        Sparse input stays sparse.
+
         Parameters
         ----------
         X : {array-like, sparse-matrix}, shape (n_samples, n_features)
             The input samples.
+        out : numpy.ndarray or None, shape (n_samples, n_features)
+            An array to store the result in. It may be X itself. Only
+            supported for dense X. If None a new array is allocated.
 
         Returns
         -------
-        X : array of shape [n_samples, n_new_features]
+        X : {array, sparse-matrix} of shape [n_samples, n_new_features]
             The dataset with updated feature values.
         """
-        nodes = list(self._hierarchy_graph.nodes)
-        nodes.remove("ROOT")
-
-        for node in nodes:
-            column_index = self._column_index(node)
-            ancestor_nodes = ancestors(self._hierarchy_graph, node)
-            ancestor_nodes.remove("ROOT")
-            for row_index, entry in enumerate(X[:, column_index]):
-                if entry == 1.0:
-                    for ancestor in ancestor_nodes:
-                        index = self._column_index(ancestor)
-                        X[row_index, index] = 1.0
-        return X
+        hierarchy_index = self._get_hierarchy_index()
+        ancestors = column_ancestor_matrix(
+            hierarchy_index, self._node_columns(hierarchy_index), X.shape[1]
+        )
+
+        if sparse.issparse(X):
+            if out is not None:
+                raise ValueError("out is not supported for sparse input.")
+            ones = sparse.csr_matrix(X == 1, dtype=np.int32)
+            propagated = sparse.csr_matrix(ones @ ancestors > 0, dtype=X.dtype)
+            X_ = X - X.multiply(propagated) + propagated
+            X_ = X_.asformat(X.format)
+            X_.eliminate_zeros()
+            return X_
+
+        if out is None:
+            out = X.copy()
+        elif out is not X:
+            out[...] = X
+        # process the rows in blocks to bound the memory of the product
+        block_size = max(1, 2**24 // max(1, X.shape[1]))
+        for start in range(0, X.shape[0], block_size):
+            end = start + block_size
+            ones = (out[start:end] == 1).astype(np.int32)
+            out[start:end][(ones @ ancestors) > 0] = 1
+        return out
 
     def _adjust_node_names(self):
         """Adjust node names in hierarchy and _columns.
@@ -263,6 +318,8 @@ class HierarchicalPreprocessor(HierarchicalEstimator):
         """
         nodes = list(self._hierarchy_graph.nodes())
         nodes.remove("ROOT")
-        self._columns = [nodes.index(node_name) for node_name in self._columns]
-        mapping = {node_name: nodes.index(node_name) for node_name in nodes}
+        mapping = {node_name: index for index, node_name in enumerate(nodes)}
+        self._columns = [mapping[node_name] for node_name in self._columns]
         self._hierarchy_graph = nx.relabel_nodes(self._hierarchy_graph, mapping)
+        self._hierarchy_index = HierarchyIndex(self._hierarchy_graph)
+        self._build_column_mapping()
@@ -2,12 +2,12 @@
 Base class for Sklearn compatible estimators using hierarchical data.
 """
 
-import networkx as nx
 import numpy as np
 from sklearn.base import BaseEstimator, TransformerMixin
 from sklearn.utils.validation import check_array
 
-from hfs.helpers import add_virtual_root_node
+from hfs.helpers import add_virtual_root_node, hierarchy_to_graph
+from hfs.hierarchy import HierarchyIndex
 
 
 class HierarchicalEstimator(TransformerMixin, BaseEstimator):
@@ -16,6 +16,11 @@ class HierarchicalEstimator(TransformerMixin, BaseEstimator):
     The HierarchicalEstimator implements scikit-learn's BaseEstimator and
     TransformerMixin interfaces. It can be used as a base class for feature
     selection classes or data preprocessors that use hierarchical data.
+
+    The input is validated without changing its dtype: bool, integer and
+    float data, for example bool, uint8, int8 or float32 arrays, are used
+    as they are. Only non-numeric data such as object arrays is converted
+    to float64.
     """
 
     def __init__(self, hierarchy: np.ndarray = None):
@@ -23,8 +28,9 @@ class HierarchicalEstimator(TransformerMixin, BaseEstimator):
 
         Parameters
         ----------
-        hierarchy : np.ndarray
-                    The hierarchy graph as an adjacency matrix."""
+        hierarchy : {np.ndarray, sparse matrix, networkx.DiGraph}
+                    The hierarchy graph as an adjacency matrix, an array of
+                    (parent, child) edges or a graph."""
         self.hierarchy = hierarchy
 
     def fit(self, X, y=None, columns=None):
@@ -64,6 +70,7 @@ class HierarchicalEstimator(TransformerMixin, BaseEstimator):
             self._columns = columns
         else:
             self._columns = list(range(self.n_features_in_))
+        self._build_column_mapping()
 
         self._set_hierarchy()
 
@@ -106,11 +113,86 @@ class HierarchicalEstimator(TransformerMixin, BaseEstimator):
         """
         Assign hierarchy graph to self._hierarchy_graph
         after adding ROOT node to connect components.
+
+        The compiled HierarchyIndex of the graph is assigned to
+        self._hierarchy_index.
         """
-        hierarchy_graph = nx.from_numpy_array(self.hierarchy, create_using=nx.DiGraph)
+        hierarchy_graph = hierarchy_to_graph(self.hierarchy)
         # Add "ROOT" node and connect components if there are multiple
         self._hierarchy_graph = add_virtual_root_node(hierarchy_graph)
+        self._hierarchy_index = HierarchyIndex(self._hierarchy_graph)
+
+    def _get_hierarchy_index(self):
+        """Get the HierarchyIndex of the current hierarchy graph.
+
+        The index is rebuilt if self._hierarchy_graph has been replaced
+        since the index was built.
+
+        Returns
+        -------
+        index : HierarchyIndex
+                The compiled index of self._hierarchy_graph.
+        """
+        index = getattr(self, "_hierarchy_index", None)
+        if index is None or index.graph is not self._hierarchy_graph:
+            index = HierarchyIndex(self._hierarchy_graph)
+            self._hierarchy_index = index
+        return index
+
+    def _build_column_mapping(self):
+        """Build the mapping from node names to columns in X.
+
+        self._columns maps each column to a node. The inverse mapping is
+        assigned to self._column_indices, so the column of a node can be
+        looked up in constant time. If a node is mapped to several columns
+        the first one is used. The mapping needs to be rebuilt whenever
+        self._columns changes.
+        """
+        self._column_indices = {}
+        for column_index, node in enumerate(self._columns):
+            self._column_indices.setdefault(node, column_index)
 
     def _column_index(self, node):
         # Get the corresponding column index for a node in the hierarchy.
-        return self._columns.index(node)
+        return self._column_indices[node]
+
+    def _node_columns(self, index):
+        """Get the column of every node in a HierarchyIndex.
+
+        Parameters
+        ----------
+        index : HierarchyIndex
+                The index of the hierarchy graph.
+
+        Returns
+        -------
+        node_columns : numpy.ndarray of shape (index.n_nodes,)
+                The column in X for each node id, -1 for nodes without a
+                column such as "ROOT".
+        """
+        return np.fromiter(
+            (self._column_indices.get(node, -1) for node in index.nodes),
+            dtype=np.intp,
+            count=index.n_nodes,
+        )
+
+    def _metric_data(self, X, statistics=None):
+        """Get the data the metrics are computed from.
+
+        Parameters
+        ----------
+        X : {array-like, sparse matrix}, shape (n_samples, n_features)
+            The training input samples.
+        statistics : SufficientStatistics or None
+            Statistics of X and y computed before, e.g. to share them
+            between several selectors.
+
+        Returns
+        -------
+        data : {array-like, sparse matrix, SufficientStatistics}
+            The statistics if given, otherwise X.
+        """
+        if statistics is None:
+            return X
+        statistics.check_data(X)
+        return statistics
@@ -12,15 +12,21 @@ from hfs.selectors import HierarchicalEstimator
 
 
 class EagerHierarchicalFeatureSelector(SelectorMixin, HierarchicalEstimator):
-    """Base class for eager feature selectors using hierarchical data."""
+    """Base class for eager feature selectors using hierarchical data.
+
+    The selectors do not convert X for fitting, their metrics are computed
+    from counts or in float64 internally. transform returns the selected
+    columns of X in the dtype and sparse format of X.
+    """
 
     def __init__(self, hierarchy: np.ndarray = None):
         """Initializes an EagerHierarchicalFeatureSelector.
 
         Parameters
         ----------
-        hierarchy : np.ndarray
-                    The hierarchy graph as an adjacency matrix."""
+        hierarchy : {np.ndarray, sparse matrix, networkx.DiGraph}
+                    The hierarchy graph as an adjacency matrix, an array of
+                    (parent, child) edges or a graph."""
         super().__init__(hierarchy)
 
     def fit(self, X, y=None, columns=None):
@@ -107,8 +113,8 @@ class EagerHierarchicalFeatureSelector(SelectorMixin, HierarchicalEstimator):
              the columns' index."""
             warnings.warn(warning_missing_nodes)
 
-        nodes = list(self._hierarchy_graph.nodes())
-        nodes.remove("ROOT")
+        index = self._get_hierarchy_index()
+        nodes = [node for node in index.nodes if node != "ROOT"]
         not_in_dataset = [node for node in nodes if node not in self._columns]
         if not_in_dataset:
             warning_missing_columns = """The hierarchy should not include any
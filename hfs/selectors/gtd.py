@@ -3,7 +3,6 @@ Greedy Top Down Feature Selector.
 """
 
 import numpy as np
-from networkx import ancestors, descendants
 from scipy.sparse import issparse
 from sklearn.utils.validation import check_X_y
 
@@ -26,8 +25,9 @@ class GreedyTopDownSelector(EagerHierarchicalFeatureSelector):
 
         Parameters
         ----------
-        hierarchy : np.ndarray
-                    The hierarchy graph as an adjacency matrix.
+        hierarchy : {np.ndarray, sparse matrix, networkx.DiGraph}
+                    The hierarchy graph as an adjacency matrix, an array of
+                    (parent, child) edges or a graph.
         iterate_first_level : bool
                             The feature selection algorithm proposed by Lu et
                             al. assumes that the hierarchy has a tree
@@ -37,7 +37,7 @@ class GreedyTopDownSelector(EagerHierarchicalFeatureSelector):
         super().__init__(hierarchy)
         self.iterate_first_level = iterate_first_level  # TODO: warning for DAG
 
-    def fit(self, X, y, columns=None):
+    def fit(self, X, y, columns=None, statistics=None):
         """Fitting function that sets self.representatives\_.
 
         The number of columns in X and the number of nodes in the hierarchy
@@ -60,6 +60,9 @@ class GreedyTopDownSelector(EagerHierarchicalFeatureSelector):
             A list of ints. If this parameter is None the columns in X and
             the corresponding nodes in the hierarchy are expected to be in the
             same order.
+        statistics : SufficientStatistics or None
+            Statistics of X and y computed before, which are used instead of
+            scanning X for the relevance metric. Default is None.
 
         Returns
         -------
@@ -73,7 +76,7 @@ class GreedyTopDownSelector(EagerHierarchicalFeatureSelector):
         super().fit(X, y, columns)
 
         # Feature Selection Algorithm
-        self.calculate_heuristic_function(X, y)
+        self.calculate_heuristic_function(self._metric_data(X, statistics), y)
         self._fit()
 
         self.is_fitted_ = True
@@ -85,31 +88,35 @@ class GreedyTopDownSelector(EagerHierarchicalFeatureSelector):
 
     def _fit(self):
         self.representatives_ = []
+        index = self._get_hierarchy_index()
+        heuristic_values = np.zeros(index.n_nodes)
+        for node, value in self.heuristic_function_values_.items():
+            if node in index.node_ids:
+                heuristic_values[index.node_ids[node]] = value
 
         # either start from ROOT or the nodes on the first level.
         if self.iterate_first_level:
-            top_level_nodes = self._hierarchy_graph.successors("ROOT")
+            top_level_nodes = index.children(index.root)
         else:
-            top_level_nodes = ["ROOT"]
+            top_level_nodes = [index.root]
 
+        closure = index.closure
         for node in top_level_nodes:
-            branch_nodes = list(descendants(self._hierarchy_graph, node))
-            if node != "ROOT":
-                branch_nodes.append(node)
+            branch_nodes = closure.descendants(node)
+            if node != index.root:
+                branch_nodes = np.append(branch_nodes, node)
 
             # sort nodes in branch accaoring to heuristic function
-            branch_nodes.sort(
-                reverse=True, key=lambda x: self.heuristic_function_values_[x]
-            )
+            branch_nodes = branch_nodes[
+                np.argsort(-heuristic_values[branch_nodes], kind="stable")
+            ]
 
             # select nodes with highest heuristic function value and remove
             # all their descendants and ancestors
-            while branch_nodes:
-                selected = branch_nodes.pop(0)
-                self.representatives_.append(selected)
-                remove_nodes = list(descendants(self._hierarchy_graph, selected))
-                ancestor_nodes = list(ancestors(self._hierarchy_graph, selected))
-                remove_nodes.extend(ancestor_nodes)
-                if "ROOT" in remove_nodes:
-                    remove_nodes.remove("ROOT")
-                branch_nodes = [node for node in branch_nodes if node not in remove_nodes]
+            removed = np.zeros(closure.ancestor_bits.shape[1], dtype=np.uint8)
+            for selected in branch_nodes:
+                if closure.contains(removed, selected):
+                    continue
+                self.representatives_.append(index.nodes[selected])
+                removed |= closure.descendant_bits[selected]
+                removed |= closure.ancestor_bits[selected]
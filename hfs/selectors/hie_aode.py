@@ -1,4 +1,3 @@
-import networkx as nx
 import numpy as np
 from sklearn.naive_bayes import BernoulliNB
 
@@ -15,13 +14,14 @@ class HieAODE(LazyHierarchicalFeatureSelector):
 
         Parameters
         ----------
-        hierarchy : np.ndarray
-            The hierarchy graph as an adjacency matrix.
+        hierarchy : {np.ndarray, sparse matrix, networkx.DiGraph}
+            The hierarchy graph as an adjacency matrix, an array of
+            (parent, child) edges or a graph.
         """
         self.cpts = dict()
         super(HieAODE, self).__init__(hierarchy)
 
-    def fit_selector(self, X_train, y_train, X_test, columns=None):
+    def fit_selector(self, X_train, y_train, X_test, columns=None, statistics=None):
         """
         P (y, x_i )
         class_prior
@@ -33,7 +33,14 @@ class HieAODE(LazyHierarchicalFeatureSelector):
         P (x_j|y, x_i)
         feature_descendants_class_cpt = (self.n_features_in, self._n_descendants, self.n_classes_, n_values)
         """
-        super(HieAODE, self).fit_selector(X_train, y_train, X_test, columns)
+        super(HieAODE, self).fit_selector(X_train, y_train, X_test, columns, statistics)
+        # class-conditional counts of the values 0 and 1 of each feature
+        labels = np.arange(self.n_classes_)
+        self._class_counts = self._statistics.label_counts(labels)
+        self._value_class_counts = np.stack(
+            [self._statistics.value_class_counts(value, labels) for value in range(2)],
+            axis=2,
+        )
         self.cpts = dict(
             prior=np.full((self.n_features_in_, self.n_classes_, 2), -1),
             # (x_j (descendent), x_i (current feature), class, value)  # P(y, x_i )
@@ -64,6 +71,9 @@ class HieAODE(LazyHierarchicalFeatureSelector):
         -------
         predictions for test input samples, if predict = false, returns empty array.
         """
+        index = self._get_hierarchy_index()
+        nodes = self._node_names(index)
+        closure = index.closure
         n_samples = self._xtest.shape[0]
         sample_sum = np.zeros((n_samples, self.n_classes_))
         for sample_idx in range(n_samples):
@@ -76,13 +86,14 @@ class HieAODE(LazyHierarchicalFeatureSelector):
                     sample=sample, feature_idx=feature_idx, value=sample[feature_idx]
                 )
 
-                ancestors = list(nx.ancestors(self._hierarchy_graph, feature_idx))
+                feature_id = index.node_ids[feature_idx]
+                ancestors = list(nodes[closure.ancestor_mask(feature_id)])
                 # question what value is calculated for the ancestors?
                 # P (x_k = 1|y)? P (x_k=0|y)
                 for ancestor_idx in ancestors:
                     self.calculate_prob_given_ascendant_class(ancestor=ancestor_idx)
 
-                descendants = list(nx.descendants(self._hierarchy_graph, feature_idx))
+                descendants = list(nodes[closure.descendant_mask(feature_id)])
                 # question what value is calculated for the descendants?
                 # P (x_j=0|y, x_i=sample[feature_idx])
                 # P (x_j=1|y, x_i=sample[feature_idx])
@@ -124,7 +135,7 @@ class HieAODE(LazyHierarchicalFeatureSelector):
         for c in range(self.n_classes_):
             if self.cpts["prior"][feature_idx][c][value] == -1:
                 self.cpts["prior"][feature_idx][c][value] = (
-                    np.sum((self._ytrain == c) & (self._xtrain[:, feature_idx] == value))
+                    self._value_class_counts[feature_idx, c, value]
                     / self._ytrain.shape[0]
                 )
 
@@ -132,10 +143,8 @@ class HieAODE(LazyHierarchicalFeatureSelector):
         # Calculate P(x_k | y) where x_k=ascendant and y = c
         for c in range(self.n_classes_):
             for value in range(2):
-                p_class_ascendant = np.sum(
-                    (self._ytrain == c) & (self._xtrain[:, ancestor] == value)
-                )
-                p_class = np.sum(self._ytrain == c)
+                p_class_ascendant = self._value_class_counts[ancestor, c, value]
+                p_class = self._class_counts[c]
                 self.cpts["ancestors"][ancestor][c][value] = p_class_ascendant / p_class
 
     def calculate_prob_descendant_given_class_feature(self, descendant_idx, feature_idx):
@@ -145,11 +154,12 @@ class HieAODE(LazyHierarchicalFeatureSelector):
                     descendant = self._xtrain[:, descendant_idx]
 
                     # Calculate P(x_j | y, x_i = value)
-                    mask = (feature_idx == value) & (self._ytrain == c)
-                    total = np.sum(mask)
+                    total = self._class_counts[c] if feature_idx == value else 0
 
                     if total > 0:
-                        prob_descendant_given_c_feature = np.sum(descendant[mask]) / total
+                        prob_descendant_given_c_feature = (
+                            self._value_class_counts[descendant_idx, c, 1] / total
+                        )
                     else:
                         prob_descendant_given_c_feature = 0
 
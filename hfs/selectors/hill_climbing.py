@@ -2,14 +2,13 @@
 Hill Climbing Feature Selectors.
 """
 
-import math
+from collections import OrderedDict
 
 import numpy as np
 from scipy import sparse
 from sklearn.utils.validation import check_X_y
 
 from hfs.helpers import compute_aggregated_values, get_leaves, normalize_score
-from hfs.metrics import cosine_similarity
 from hfs.selectors import EagerHierarchicalFeatureSelector
 
 
@@ -18,8 +17,18 @@ class HillClimbingSelector(EagerHierarchicalFeatureSelector):
 
     The feature selection methods are intended for hierarchical data.
     Therefore, this class inherits from the EagerHierarchicalFeatureSelector.
+    The scores the samples are compared with are floats, see
+    _calculate_scores, transform keeps the dtype of X.
+
+    The selectors update the comparisons of the current feature set when
+    they change it by a few nodes. To keep rounding errors from
+    accumulating, the comparisons are computed from all features again
+    every recompute_interval changes. After fitting, n_evaluations\_ is
+    the number of feature sets whose fitness was calculated.
     """
 
+    recompute_interval = 10
+
     def __init__(
         self,
         hierarchy: np.ndarray = None,
@@ -30,8 +39,9 @@ class HillClimbingSelector(EagerHierarchicalFeatureSelector):
 
         Parameters
         ----------
-        hierarchy : np.ndarray
-                    The hierarchy graph as an adjacency matrix.
+        hierarchy : {np.ndarray, sparse matrix, networkx.DiGraph}
+                    The hierarchy graph as an adjacency matrix, an array of
+                    (parent, child) edges or a graph.
         alpha: float
                 A hyperparameter needed for the hill climbing methods.
                 The default value is 0.99.
@@ -82,6 +92,13 @@ class HillClimbingSelector(EagerHierarchicalFeatureSelector):
         # Feature Selection Algorithm
         self.y_ = y
         self._num_rows = X.shape[0]
+        # the class of each sample and a one-hot matrix of the classes, so
+        # that sums over the samples of a class are matrix products
+        _, self._class_codes = np.unique(y, return_inverse=True)
+        self._class_codes = self._class_codes.ravel()
+        self._class_indicator = np.eye(self._class_codes.max(initial=-1) + 1)[
+            self._class_codes
+        ]
         self.representatives_ = self._hill_climb(X)
 
         return self
@@ -103,7 +120,9 @@ class HillClimbingSelector(EagerHierarchicalFeatureSelector):
 
         To calculate the scores the values X are summed up with
         the feature's children's values. If the dataset is of the
-        type "numerical" the sums are normalized.
+        type "numerical" the sums are normalized. The scores have the
+        float dtype of X, or float64 if X has no float dtype or the
+        dataset is numerical.
 
         Parameters
         ----------
@@ -116,8 +135,11 @@ class HillClimbingSelector(EagerHierarchicalFeatureSelector):
                     The scores calculated for each value in X.
         """
         score_matrix = compute_aggregated_values(
-            X.copy(), self._hierarchy_graph, self._columns
+            X, self._get_hierarchy_index(), self._columns
         )
+        if score_matrix.dtype.kind != "f":
+            # distances and similarities of the scores need floats
+            score_matrix = score_matrix.astype(np.float64)
 
         if self.dataset_type == "numerical":
             normalized_matrix = np.zeros_like(score_matrix, dtype=float)
@@ -130,30 +152,86 @@ class HillClimbingSelector(EagerHierarchicalFeatureSelector):
             score_matrix = normalized_matrix
         return score_matrix
 
-    def _compare(
-        self,
-        sample_i: int,
-        sample_j: int,
-        feature_set: list[int],
-    ):
-        """Compare to samples from the dataset.
+    def _feature_scores(self, feature_set: list[int]) -> np.ndarray:
+        """Get the scores of the features in a feature set.
+
+        Parameters
+        ----------
+        feature_set : list
+                A list of nodes that are in the feature set that is
+                currently being evaluated.
+
+        Returns
+        -------
+        scores : numpy.ndarray, shape (num_rows, len(feature_set))
+                The dense scores of the features.
+        """
+        column_indices = [
+            self._column_index(column) for column in feature_set if column != "ROOT"
+        ]
+        scores = self._score_matrix[:, column_indices]
+        if sparse.issparse(scores):
+            scores = scores.toarray()
+        return np.asarray(scores)
+
+    def _compare_block(
+        self, products: np.ndarray, squared_norms: np.ndarray, rows: slice
+    ) -> np.ndarray:
+        """Compare a block of samples with all samples from the dataset.
 
         This method needs to be implemented by the subclasses.
-        It should return a score that can be used for comparison.
+        It should return scores that can be used for comparison.
 
         Parameters
         ----------
-        sample_i : int
-            A row index for a sample from the dataset.
-        sample_j : int
-            A row index for another sample from the dataset.
-        feature_set: list
-                    A list of nodes that are in the feature set that is
-                    currently being evaluated.
+        products : numpy.ndarray, shape (rows, num_rows)
+                The dot products of the scores of the samples in the
+                block with the scores of all samples.
+        squared_norms : numpy.ndarray, shape (num_rows,)
+                The dot product of the scores of each sample with
+                themselves.
+        rows : slice
+                The samples in the block.
         """
         raise NotImplementedError
 
-    def _comparison_matrix(self, feature_set: list[int]):
+    def _iter_comparison_blocks(self, feature_set: list[int], block_size=None):
+        """Compare the samples from the dataset block by block.
+
+        The dot products of the scores of all pairs of samples, the Gram
+        matrix, are computed with one matrix product per block of rows.
+        The subclasses derive their distances or similarities from these
+        products, so only one block of the comparison matrix is in memory
+        at once. The products are computed in the float dtype of the
+        scores.
+
+        Parameters
+        ----------
+        feature_set : list
+                A list of nodes that are in the feature set that is
+                currently being evaluated.
+        block_size : int or None
+                The number of rows per block. If None it is chosen so that
+                a block has about 2^22 entries.
+
+        Yields
+        ------
+        rows : slice
+                The samples in the block.
+        block : numpy.ndarray, shape (rows, num_rows)
+                The comparisons of the samples in the block with all
+                samples.
+        """
+        scores = self._feature_scores(feature_set)
+        squared_norms = np.einsum("ij,ij->i", scores, scores)
+        if block_size is None:
+            block_size = max(1, 2**22 // max(1, self._num_rows))
+        for start in range(0, self._num_rows, block_size):
+            rows = slice(start, min(start + block_size, self._num_rows))
+            products = scores[rows] @ scores.T
+            yield rows, self._compare_block(products, squared_norms, rows)
+
+    def _comparison_matrix(self, feature_set: list[int], block_size=None):
         """Creates matrix to compare the individual samples from the dataset.
 
         Parameters
@@ -161,6 +239,9 @@ class HillClimbingSelector(EagerHierarchicalFeatureSelector):
         feature_set : list
                 A list of nodes that are in the feature set that is
                 currently being evaluated.
+        block_size : int or None
+                The number of rows computed at once, see
+                _iter_comparison_blocks.
 
         Returns
         -------
@@ -168,13 +249,11 @@ class HillClimbingSelector(EagerHierarchicalFeatureSelector):
                     An matrix with distances or similarities to compare all
                     rows from the dataset with eachother.
         """
-        distances = np.zeros((self._num_rows, self._num_rows), dtype=float)
-        for row_i in range(self._num_rows):
-            for row_j in range(self._num_rows):
-                if distances[row_i, row_j] == 0:
-                    distance = self._compare(row_i, row_j, feature_set)
-                    distances[row_i, row_j] = distance
-                    distances[row_j, row_i] = distance
+        distances = np.empty(
+            (self._num_rows, self._num_rows), dtype=self._score_matrix.dtype
+        )
+        for rows, block in self._iter_comparison_blocks(feature_set, block_size):
+            distances[rows] = block
         return distances
 
     def _fitness_function(self, comparison_matrix: np.ndarray) -> float:
@@ -190,6 +269,18 @@ class TopDownSelector(HillClimbingSelector):
     evaluating the resulting feature set with a fitness function.
     The method is intended for hierarchical data. Therefore, it inherits
     from the EagerHierarchicalFeatureSelector.
+
+    The squared distances of the samples are a sum over the features. The
+    selector keeps the squared distances of the current feature set and
+    evaluates a candidate by subtracting the contribution of the replaced
+    node and adding the contributions of its children. To keep rounding
+    errors from accumulating, the squared distances are computed from all
+    features again every recompute_interval rounds.
+
+    The fitness of the candidates is cached, so feature sets that are
+    reached again, e.g. by expanding the same nodes in another order, are
+    not evaluated twice. The cache is keyed by the frozenset of the
+    features and drops the least recently used fitness if it is full.
     """
 
     def __init__(
@@ -197,21 +288,50 @@ class TopDownSelector(HillClimbingSelector):
         hierarchy: np.ndarray = None,
         alpha: float = 0.99,
         dataset_type: str = "binary",
+        search: str = "steepest",
+        beam_width: int = 3,
+        max_evaluations: int = None,
+        cache_size: int = 1024,
     ):
         """Initializes a TopDownSelector.
 
         Parameters
         ----------
-        hierarchy : np.ndarray
-                    The hierarchy graph as an adjacency matrix.
+        hierarchy : {np.ndarray, sparse matrix, networkx.DiGraph}
+                    The hierarchy graph as an adjacency matrix, an array of
+                    (parent, child) edges or a graph.
         alpha: float
                 A hyperparameter needed for the hill climbing methods.
                 The default value is 0.99.
         dataset_type: string, either "binary" or "numerical"
                 A value indicating if the input dataset contains binary or
                 numerical data. Default is "binary".
+        search: string, either "steepest", "first" or "beam"
+                How the next feature set is chosen in each round. "steepest"
+                evaluates all candidates and moves to the best one, "first"
+                moves to the first candidate that improves the fitness and
+                "beam" keeps the beam_width best improving candidates and
+                expands all of them in the next round. Default is
+                "steepest".
+        beam_width: int
+                The number of feature sets kept in each round of the beam
+                search. Only used if search is "beam". Each of them keeps
+                its own squared distances, which need memory quadratic in
+                the number of samples. Default is 3.
+        max_evaluations: int or None
+                The maximum number of fitness evaluations. If the budget is
+                used up the best feature set found so far is selected. If
+                None the search runs until no candidate improves the
+                fitness. Default is None.
+        cache_size: int
+                The number of fitness values cached. 0 disables the cache.
+                Default is 1024.
         """
         super().__init__(hierarchy, alpha=alpha, dataset_type=dataset_type)
+        self.search = search
+        self.beam_width = beam_width
+        self.max_evaluations = max_evaluations
+        self.cache_size = cache_size
 
     def fit(self, X, y, columns=None):
         """Fitting function that sets self.representatives\_.
@@ -264,76 +384,277 @@ class TopDownSelector(HillClimbingSelector):
                     optimal features set.
         """
         self._score_matrix = self._calculate_scores(X)
+        index = self._get_hierarchy_index()
+
+        if self.search not in ("steepest", "first", "beam"):
+            raise ValueError(
+                f"Unknown search {self.search!r}, use 'steepest', 'first' or 'beam'."
+            )
+        beam_width = self.beam_width if self.search == "beam" else 1
+        if beam_width < 1:
+            raise ValueError("The beam width must be at least 1.")
+        self.n_evaluations_ = 0
+        self._fitness_cache = OrderedDict()
 
         # Start with nodes on first level after virtual root node
-        optimal_feature_set = set(self._hierarchy_graph.successors("ROOT"))
+        optimal_feature_set = set(index.names(index.children(index.root)))
         fitness = 0
-        best_fitness = 0
-        best_feature_set = None
-
-        while True:
-            for node in optimal_feature_set:
-                children = list(self._hierarchy_graph.successors(node))
-                if children:
-                    # Replace the current node with its children and
-                    # evaluate the resulting feature set using the
-                    # fitness function.
-                    temporary_feature_set = optimal_feature_set.copy()
-                    temporary_feature_set.remove(node)
-                    temporary_feature_set.update(children)
-                    distances = self._comparison_matrix(temporary_feature_set)
-                    temporary_fitness = self._fitness_function(distances)
-                    if (temporary_fitness) > best_fitness:
-                        best_fitness = temporary_fitness
-                        best_feature_set = temporary_feature_set
-
-            if best_fitness > fitness:
-                optimal_feature_set = best_feature_set
-                fitness = best_fitness
-            else:
+        # every feature set in the beam with its squared distances, its
+        # fitness and the number of rounds since its squared distances
+        # were computed from all features
+        beam = [(optimal_feature_set, self._squared_distances(optimal_feature_set), 0, 0)]
+
+        while beam:
+            improvements = []
+            improved_feature_sets = set()
+            for state in beam:
+                for (
+                    temporary_feature_set,
+                    move,
+                    temporary_fitness,
+                ) in self._iter_candidates(state, index):
+                    key = frozenset(temporary_feature_set)
+                    if temporary_fitness > state[2] and key not in improved_feature_sets:
+                        improved_feature_sets.add(key)
+                        improvements.append(
+                            (temporary_fitness, temporary_feature_set, move, state)
+                        )
+                        if self.search == "first":
+                            break
+            # the sort is stable, so the first of equally fit candidates wins
+            improvements.sort(key=lambda improvement: -improvement[0])
+            if improvements and improvements[0][0] > fitness:
+                fitness, optimal_feature_set = improvements[0][:2]
+            if not self._within_budget():
                 break
+            beam = [
+                self._move(state, temporary_feature_set, move, temporary_fitness)
+                for temporary_fitness, temporary_feature_set, move, state in (
+                    improvements[:beam_width]
+                )
+            ]
         return list(optimal_feature_set)
 
-    def _compare(
-        self,
-        sample_i: int,
-        sample_j: int,
-        feature_set: list[int],
-    ):
-        return self._calculate_distance(sample_i, sample_j, feature_set)
+    def _iter_candidates(self, state, index):
+        """Evaluate the candidates of a feature set.
 
-    def _calculate_distance(
-        self,
-        sample_i: int,
-        sample_j: int,
-        feature_set: list[int],
-    ):
-        distance = 0
-        for column in feature_set:
-            column_index = self._column_index(column)
-            difference = (
-                self._score_matrix[sample_i, column_index]
-                - self._score_matrix[sample_j, column_index]
+        Each candidate replaces one node of the feature set with its
+        children. Cached fitness values are reused, new ones are only
+        calculated while the budget of evaluations lasts.
+
+        Parameters
+        ----------
+        state : tuple
+                The feature set, its squared distances, its fitness and the
+                rounds since its squared distances were computed.
+        index : HierarchyIndex
+                The index of the hierarchy.
+
+        Yields
+        ------
+        temporary_feature_set : set
+                The candidate feature set.
+        move : tuple
+                The list of the removed node and the list of the added
+                children.
+        temporary_fitness : float
+                The fitness of the candidate.
+        """
+        optimal_feature_set, squared_distances = state[:2]
+        for node in optimal_feature_set:
+            children = index.names(index.children(index.node_ids[node]))
+            if children:
+                # Replace the current node with its children and
+                # evaluate the resulting feature set using the
+                # fitness function.
+                temporary_feature_set = optimal_feature_set.copy()
+                temporary_feature_set.remove(node)
+                temporary_feature_set.update(children)
+                move = (
+                    [node],
+                    [child for child in children if child not in optimal_feature_set],
+                )
+                key = frozenset(temporary_feature_set)
+                if key in self._fitness_cache:
+                    self._fitness_cache.move_to_end(key)
+                    temporary_fitness = self._fitness_cache[key]
+                elif self._within_budget():
+                    temporary_fitness = sum(
+                        self._fitness_block(_euclidean_distances(block, rows), rows)
+                        for rows, block in self._iter_updated_distances(
+                            squared_distances, *move
+                        )
+                    )
+                    self.n_evaluations_ += 1
+                    self._cache_fitness(key, temporary_fitness)
+                else:
+                    return
+                yield temporary_feature_set, move, temporary_fitness
+
+    def _move(self, state, temporary_feature_set, move, temporary_fitness):
+        """Move from a feature set to one of its candidates.
+
+        Returns the state of the candidate, see _iter_candidates.
+        """
+        squared_distances, _, rounds = state[1:]
+        rounds += 1
+        if rounds % self.recompute_interval == 0:
+            return (
+                temporary_feature_set,
+                self._squared_distances(temporary_feature_set),
+                temporary_fitness,
+                0,
             )
-            distance += math.pow(difference, 2)
-        return math.sqrt(distance)
+        temporary_squared_distances = np.empty_like(squared_distances)
+        for rows, block in self._iter_updated_distances(squared_distances, *move):
+            temporary_squared_distances[rows] = block
+        return (
+            temporary_feature_set,
+            temporary_squared_distances,
+            temporary_fitness,
+            rounds,
+        )
 
-    def _fitness_function(self, comparison_matrix: np.ndarray) -> float:
-        result = 0
-        row_indices = range(self._num_rows)
-        for row_index in row_indices:
-            same_class = [
-                sample for sample in row_indices if self.y_[sample] == self.y_[row_index]
-            ]
-            other_class = [x for x in row_indices if x not in same_class]
+    def _within_budget(self) -> bool:
+        """Whether more fitness evaluations are allowed."""
+        return self.max_evaluations is None or self.n_evaluations_ < self.max_evaluations
+
+    def _cache_fitness(self, key: frozenset, fitness: float):
+        """Cache a fitness and drop the least recently used if full."""
+        if self.cache_size <= 0:
+            return
+        self._fitness_cache[key] = fitness
+        if len(self._fitness_cache) > self.cache_size:
+            self._fitness_cache.popitem(last=False)
+
+    def _compare_block(
+        self, products: np.ndarray, squared_norms: np.ndarray, rows: slice
+    ) -> np.ndarray:
+        """Calculate the Euclidean distances of a block of samples.
+
+        The squared distance of two samples is the sum of their squared
+        norms minus twice their dot product. It is exact for integer
+        scores.
+        """
+        squared_distances = squared_norms[rows, np.newaxis] + squared_norms - 2 * products
+        return _euclidean_distances(squared_distances, rows)
+
+    def _squared_distances(self, feature_set, rows=None) -> np.ndarray:
+        """Calculate the squared distances of samples for some features.
+
+        The squared distances are not clipped at 0, so that the squared
+        distances of disjoint feature sets can be added up.
+
+        Parameters
+        ----------
+        feature_set : iterable
+                The nodes whose contribution to the squared distances is
+                calculated.
+        rows : slice or None
+                The samples to compare with all samples. If None all
+                samples are compared.
 
-            nominator = sum([comparison_matrix[x, row_index] for x in other_class])
-            denominator = 1 + self.alpha * sum(
-                [comparison_matrix[sample, row_index] for sample in same_class]
+        Returns
+        -------
+        squared_distances : numpy.ndarray, shape (rows, num_rows)
+                The squared Euclidean distances of the scores of the
+                features.
+        """
+        if rows is None:
+            rows = slice(0, self._num_rows)
+        scores = self._feature_scores(list(feature_set))
+        squared_norms = np.einsum("ij,ij->i", scores, scores)
+        return (
+            squared_norms[rows, np.newaxis]
+            + squared_norms
+            - 2 * (scores[rows] @ scores.T)
+        )
+
+    def _iter_updated_distances(self, squared_distances, removed, added):
+        """Update the squared distances block by block.
+
+        Parameters
+        ----------
+        squared_distances : numpy.ndarray, shape (num_rows, num_rows)
+                The squared distances of the current feature set.
+        removed : list
+                The nodes removed from the feature set.
+        added : list
+                The nodes added to the feature set.
+
+        Yields
+        ------
+        rows : slice
+                The samples in the block.
+        block : numpy.ndarray, shape (rows, num_rows)
+                The squared distances of the samples in the block to all
+                samples for the updated feature set.
+        """
+        block_size = max(1, 2**22 // max(1, self._num_rows))
+        for start in range(0, self._num_rows, block_size):
+            rows = slice(start, min(start + block_size, self._num_rows))
+            yield rows, (
+                squared_distances[rows]
+                - self._squared_distances(removed, rows)
+                + self._squared_distances(added, rows)
             )
-            result += nominator / denominator
 
-        return result
+    def _fitness_function(self, comparison_matrix: np.ndarray) -> float:
+        """Calculate the fitness of a feature set.
+
+        For each sample the distances to the samples of other classes are
+        summed up and divided by one plus alpha times the sum of the
+        distances to the samples of its own class.
+
+        Parameters
+        ----------
+        comparison_matrix : numpy.ndarray, shape (num_rows, num_rows)
+                The distances of all pairs of samples.
+
+        Returns
+        -------
+        fitness : float
+                The fitness of the feature set.
+        """
+        return self._fitness_block(
+            np.asarray(comparison_matrix).T, slice(0, self._num_rows)
+        )
+
+    def _fitness_block(self, distances: np.ndarray, rows: slice) -> float:
+        """Calculate the share of a block of samples in the fitness.
+
+        The distances of a sample to all samples of each class are summed
+        up with one matrix product, see _fitness_function.
+
+        Parameters
+        ----------
+        distances : numpy.ndarray, shape (rows, num_rows)
+                The distances of the samples in the block to all samples.
+        rows : slice
+                The samples in the block.
+
+        Returns
+        -------
+        fitness : float
+                The summands of the fitness of the samples in the block.
+        """
+        class_sums = distances @ self._class_indicator
+        same_class = class_sums[np.arange(class_sums.shape[0]), self._class_codes[rows]]
+        other_class = class_sums.sum(axis=1) - same_class
+        return float(np.sum(other_class / (1 + self.alpha * same_class)))
+
+
+def _euclidean_distances(squared_distances, rows=None):
+    """Calculate distances from squared distances.
+
+    Rounding errors must not make the distances negative or nonzero on the
+    diagonal, which starts at the first of the rows.
+    """
+    if rows is None:
+        rows = slice(0, squared_distances.shape[0])
+    distances = np.maximum(squared_distances, 0)
+    distances[np.arange(distances.shape[0]), np.arange(rows.start, rows.stop)] = 0
+    return np.sqrt(distances, out=distances)
 
 
 class BottomUpSelector(HillClimbingSelector):
@@ -358,8 +679,9 @@ class BottomUpSelector(HillClimbingSelector):
 
         Parameters
         ----------
-        hierarchy : np.ndarray
-                    The hierarchy graph as an adjacency matrix. For this
+        hierarchy : {np.ndarray, sparse matrix, networkx.DiGraph}
+                    The hierarchy graph as an adjacency matrix, an array of
+                    (parent, child) edges or a graph. For this
                     feature selection method to work as intended the graph
                     needs to be a tree.
         alpha: float
@@ -428,82 +750,183 @@ class BottomUpSelector(HillClimbingSelector):
                     optimal features set.
         """
         self._score_matrix = self._calculate_scores(X)
+        index = self._get_hierarchy_index()
 
         # Start with the leaves.
-        current_feature_set = get_leaves(self._hierarchy_graph)
+        self.n_evaluations_ = 0
+        current_feature_set = get_leaves(index)
+        # number_of_leaf_nodes is the alpha value from paper.
+        self._num_leaves = max(1, len(current_feature_set))
         if current_feature_set == ["ROOT"] or current_feature_set == []:
             return []
-        current_fitness = self._fitness_function(
-            self._comparison_matrix(current_feature_set)
+        products = self._dot_products(current_feature_set)
+        squared_norms = products.diagonal().copy()
+        current_fitness = self._fitness(
+            sum(
+                self._count_same_class_neighbors(
+                    self._compare_block(products[rows], squared_norms, rows), rows
+                )
+                for rows in self._iter_row_blocks()
+            )
         )
 
+        self.n_evaluations_ = 1
+
+        # The worklist of nodes to visit. All siblings lead to the same
+        # candidate, so a parent whose candidate was rejected is not
+        # evaluated again until the current feature set changes.
         unvisited = set(current_feature_set)
+        rejected_parents = set()
+        changes = 0
 
         while unvisited:
             temporary_feature_set = current_feature_set.copy()
             node = unvisited.pop()
-            parent = list(self._hierarchy_graph.predecessors(node))[
-                0
-            ]  # This does not work with a DAG.
-            if parent != "ROOT":
+            # This does not work with a DAG.
+            parent = index.nodes[index.parents(index.node_ids[node])[0]]
+            if parent != "ROOT" and parent not in rejected_parents:
                 # Replace the current node and its siblings with their
                 # parent node.
                 temporary_feature_set.append(parent)
-                children = list(self._hierarchy_graph.successors(parent))
-                updated_feature_set = [
-                    node for node in temporary_feature_set if node not in children
+                children = index.names(index.children(index.node_ids[parent]))
+                # The dot products of the scores are a sum over the
+                # features, so the products of the updated feature set
+                # are those of the current one minus the products of the
+                # children plus the products of the parent.
+                removed = [
+                    feature for feature in temporary_feature_set if feature in children
                 ]
-                temporary_fitness = self._fitness_function(
-                    self._comparison_matrix(updated_feature_set)
+                temporary_norms = (
+                    squared_norms
+                    - self._squared_norms(removed)
+                    + self._squared_norms([parent])
                 )
-                if temporary_fitness < current_fitness:
+                count = 0
+                for rows in self._iter_row_blocks():
+                    temporary_products = (
+                        products[rows]
+                        - self._dot_products(removed, rows)
+                        + self._dot_products([parent], rows)
+                    )
+                    count += self._count_same_class_neighbors(
+                        self._compare_block(temporary_products, temporary_norms, rows),
+                        rows,
+                    )
+                temporary_fitness = self._fitness(count)
+                self.n_evaluations_ += 1
+                if temporary_fitness >= current_fitness:
+                    rejected_parents.add(parent)
+                else:
                     current_feature_set = temporary_feature_set
                     current_fitness = temporary_fitness
                     unvisited = set(current_feature_set)
+                    rejected_parents = set()
+                    changes += 1
+                    if changes % self.recompute_interval == 0:
+                        products = self._dot_products(current_feature_set)
+                        squared_norms = products.diagonal().copy()
+                    else:
+                        for rows in self._iter_row_blocks():
+                            products[rows] += self._dot_products([parent], rows)
+                        squared_norms += self._squared_norms([parent])
 
         return current_feature_set
 
-    def _compare(
-        self,
-        sample_i: int,
-        sample_j: int,
-        feature_set: list[int],
-    ):
-        return self._calculate_similarity(sample_i, sample_j, feature_set)
+    def _compare_block(
+        self, products: np.ndarray, squared_norms: np.ndarray, rows: slice
+    ) -> np.ndarray:
+        """Calculate the cosine similarities of a block of samples.
 
-    def _calculate_similarity(self, sample_i: int, sample_j: int, feature_set: list[int]):
-        if "ROOT" in feature_set:
-            feature_set = feature_set.remove("ROOT")
-        row_i = self._score_matrix[sample_i, feature_set]
-        row_j = self._score_matrix[sample_j, feature_set]
-        return cosine_similarity(row_i.flatten(), row_j.flatten())
+        Samples whose scores are all 0 have a similarity of NaN.
+        """
+        norms = np.sqrt(squared_norms)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return products / (norms[rows, np.newaxis] * norms)
+
+    def _dot_products(self, feature_set: list, rows: slice = None) -> np.ndarray:
+        """Calculate the dot products of the scores of samples.
+
+        Parameters
+        ----------
+        feature_set : list
+                The nodes whose scores are multiplied. A node that is in
+                the list more than once is counted that often.
+        rows : slice or None
+                The samples to multiply with all samples. If None all
+                samples are multiplied.
+
+        Returns
+        -------
+        products : numpy.ndarray, shape (rows, num_rows)
+                The dot products of the scores.
+        """
+        if rows is None:
+            rows = slice(0, self._num_rows)
+        scores = self._feature_scores(feature_set)
+        return scores[rows] @ scores.T
+
+    def _squared_norms(self, feature_set: list) -> np.ndarray:
+        """Calculate the dot product of the scores of each sample with
+        themselves, see _dot_products."""
+        scores = self._feature_scores(feature_set)
+        return np.einsum("ij,ij->i", scores, scores)
+
+    def _iter_row_blocks(self):
+        """Split the samples into blocks of about 2^22 comparisons."""
+        block_size = max(1, 2**22 // max(1, self._num_rows))
+        for start in range(0, self._num_rows, block_size):
+            yield slice(start, min(start + block_size, self._num_rows))
 
     def _fitness_function(self, comparison_matrix: np.ndarray) -> float:
-        # number_of_leaf_nodes is the alpha value from paper.
-        number_of_leaf_nodes = len(get_leaves(self._hierarchy_graph))
-        if number_of_leaf_nodes == 0:
-            number_of_leaf_nodes = 1
+        """Calculate the fitness of a feature set.
+
+        The fitness counts the k nearest neighbors of each sample that
+        have the class of the sample.
+
+        Parameters
+        ----------
+        comparison_matrix : numpy.ndarray, shape (num_rows, num_rows)
+                The similarities of all pairs of samples.
 
+        Returns
+        -------
+        fitness : float
+                The fitness of the feature set.
+        """
+        return self._fitness(
+            self._count_same_class_neighbors(comparison_matrix, slice(0, self._num_rows))
+        )
+
+    def _count_same_class_neighbors(self, similarities: np.ndarray, rows: slice) -> int:
+        """Count the nearest neighbors of samples that have their class.
+
+        Parameters
+        ----------
+        similarities : numpy.ndarray, shape (rows, num_rows)
+                The similarities of the samples in the block to all
+                samples.
+        rows : slice
+                The samples in the block.
+
+        Returns
+        -------
+        count : int
+                The number of the k nearest neighbors of the samples in
+                the block, other than the samples themselves, that have
+                the same class.
+        """
         threshold_index = self._num_rows - self.k - 1
-        k_nearest_neigbors = [
-            list(
-                np.argpartition(comparison_matrix[row, :], threshold_index)[
-                    threshold_index:
-                ]
-            )
-            for row in range(self._num_rows)
+        k_nearest_neighbors = np.argpartition(similarities, threshold_index, axis=1)[
+            :, threshold_index:
         ]
-
-        count = 0
-        for row in range(self._num_rows):
-            for neighbor in k_nearest_neigbors[row]:
-                if self.y_[neighbor] == self.y_[row] and neighbor != row:
-                    count += 1
-
-        result = count * (
-            1
-            + self.alpha
-            * (number_of_leaf_nodes - self.n_features_in_)
-            / number_of_leaf_nodes
+        samples = np.arange(rows.start, rows.stop)[:, np.newaxis]
+        same_class = (
+            self._class_codes[k_nearest_neighbors] == self._class_codes[samples]
+        ) & (k_nearest_neighbors != samples)
+        return int(np.count_nonzero(same_class))
+
+    def _fitness(self, count: int) -> float:
+        """Weight the count of same class neighbors with the leaf count."""
+        return count * (
+            1 + self.alpha * (self._num_leaves - self.n_features_in_) / self._num_leaves
         )
-        return result
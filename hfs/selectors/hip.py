@@ -14,8 +14,9 @@ class HIP(LazyHierarchicalFeatureSelector):
 
         Parameters
         ----------
-        hierarchy : np.ndarray
-                    The hierarchy graph as an adjacency matrix.
+        hierarchy : {np.ndarray, sparse matrix, networkx.DiGraph}
+                    The hierarchy graph as an adjacency matrix, an array of
+                    (parent, child) edges or a graph.
         """
         super(HIP, self).__init__(hierarchy)
 
@@ -47,10 +48,7 @@ class HIP(LazyHierarchicalFeatureSelector):
             if predict:
                 predictions = np.append(predictions, self._predict(idx, estimator)[0])
             if saveFeatures:
-                self._features[idx] = np.array(list(self._instance_status.values()))
-            self._feature_length[idx] = len(
-                [nodes for nodes, status in self._instance_status.items() if status]
-            )
-            for node in self._hierarchy_graph:
-                self._instance_status[node] = 1
+                self._features[idx] = self._instance_status
+            self._feature_length[idx] = np.count_nonzero(self._instance_status)
+            self._instance_status[:] = 1
         return predictions
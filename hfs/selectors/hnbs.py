@@ -16,8 +16,9 @@ class HNBs(LazyHierarchicalFeatureSelector):
 
         Parameters
         ----------
-        hierarchy: np.ndarray
-            The hierarchy graph as an adjacency matrix.
+        hierarchy: {np.ndarray, sparse matrix, networkx.DiGraph}
+            The hierarchy graph as an adjacency matrix, an array of
+            (parent, child) edges or a graph.
         """
         super(HNBs, self).__init__(hierarchy)
 
@@ -47,8 +48,6 @@ class HNBs(LazyHierarchicalFeatureSelector):
             if predict:
                 predictions = np.append(predictions, self._predict(idx, estimator)[0])
             if saveFeatures:
-                self._features[idx] = np.array(list(self._instance_status.values()))
-            self._feature_length[idx] = len(
-                [nodes for nodes, status in self._instance_status.items() if status]
-            )
+                self._features[idx] = self._instance_status
+            self._feature_length[idx] = np.count_nonzero(self._instance_status)
         return predictions
@@ -5,9 +5,10 @@ import numpy as np
 from sklearn.metrics import classification_report
 from sklearn.naive_bayes import BernoulliNB
 
-from hfs.helpers import check_data, get_relevance
-from hfs.metrics import conditional_mutual_information
+from hfs.helpers import check_data, get_relevances
+from hfs.metrics import conditional_mutual_information_edges
 from hfs.selectors import HierarchicalEstimator
+from hfs.sufficient_statistics import SufficientStatistics
 
 
 class LazyHierarchicalFeatureSelector(ABC, HierarchicalEstimator):
@@ -15,6 +16,8 @@ class LazyHierarchicalFeatureSelector(ABC, HierarchicalEstimator):
     Abstract class used for all lazy hierarchical feature selection methods.
 
     Every method should implement the method select_and_predict.
+    The training and test samples are kept in their dtype, no float copy
+    of them is made. Probabilities are computed in float64.
     """
 
     def __init__(self, hierarchy: np.ndarray = None):  # todo G = None
@@ -23,8 +26,9 @@ class LazyHierarchicalFeatureSelector(ABC, HierarchicalEstimator):
 
         Parameters
         ----------
-        hierarchy : np.ndarray
-            The hierarchy graph as an adjacency matrix.
+        hierarchy : {np.ndarray, sparse matrix, networkx.DiGraph}
+            The hierarchy graph as an adjacency matrix, an array of
+            (parent, child) edges or a graph.
         """
         self.hierarchy = hierarchy
 
@@ -57,7 +61,7 @@ class LazyHierarchicalFeatureSelector(ABC, HierarchicalEstimator):
 
         return self
 
-    def fit_selector(self, X_train, y_train, X_test, columns=None):
+    def fit_selector(self, X_train, y_train, X_test, columns=None, statistics=None):
         """
         Fit LazyHierarchicalFeatureSelector class.
 
@@ -73,6 +77,9 @@ class LazyHierarchicalFeatureSelector(ABC, HierarchicalEstimator):
             converted into a sparse ``csc_matrix``.
         y_train : array-like of shape (n_samples, n_levels)
             The target values, i.e., hierarchical class labels for classification.
+        statistics : SufficientStatistics or None
+            Statistics of X_train and y_train computed before. If None they
+            are computed from X_train and y_train.
         """
         # Create DAG
         self.n_features_in_ = X_train.shape[1]
@@ -84,6 +91,7 @@ class LazyHierarchicalFeatureSelector(ABC, HierarchicalEstimator):
             self._columns = columns
         else:
             self._columns = list(range(self.n_features_in_))
+        self._build_column_mapping()
 
         mapping = {value: index for index, value in enumerate(self._columns)}
         self._hierarchy_graph = nx.relabel_nodes(self._hierarchy_graph, mapping)
@@ -98,15 +106,19 @@ class LazyHierarchicalFeatureSelector(ABC, HierarchicalEstimator):
         # Validate data
         check_data(self._hierarchy_graph, self._xtrain, self._ytrain)
 
+        if statistics is None:
+            statistics = SufficientStatistics(self._xtrain, self._ytrain)
+        statistics.check_data(self._xtrain)
+        self._statistics = statistics
+
         # Get relevance of each node
-        self._relevance = {}
-        for node in self._hierarchy_graph:
-            self._relevance[node] = get_relevance(self._xtrain, self._ytrain, node)
+        relevances = get_relevances(self._statistics)
+        self._relevance = {node: relevances[node] for node in self._hierarchy_graph}
         self._sorted_relevance = sorted(self._relevance, key=self._relevance.get)
 
-        self._instance_status = {}
-        for node in self._hierarchy_graph:
-            self._instance_status[node] = 1
+        # The status of a node is stored at the index of its name, which is
+        # the column of the node in X after relabeling the hierarchy.
+        self._instance_status = np.ones(self.n_features_in_, dtype=int)
 
     @abstractmethod
     def select_and_predict(
@@ -144,15 +156,15 @@ class LazyHierarchicalFeatureSelector(ABC, HierarchicalEstimator):
         idx : int
             Index of test instance for which the features shall be selected.
         """
-        for node in self._hierarchy_graph:
-            self._instance_status[node] = 1
-        for node in self._hierarchy_graph:
-            if self._xtest[idx][node] == 1:
-                for anc in self._hierarchy_graph.predecessors(node):
-                    self._instance_status[anc] = 0
-            else:
-                for desc in self._hierarchy_graph.successors(node):
-                    self._instance_status[desc] = 0
+        index = self._get_hierarchy_index()
+        nodes = self._node_names(index)
+        values = self._xtest[idx][nodes]
+        self._instance_status[:] = 1
+        # parents of positive nodes and children of negative nodes are redundant
+        positive_child = values[index.edge_children] == 1
+        self._instance_status[nodes[index.edge_parents[positive_child]]] = 0
+        negative_parent = values[index.edge_parents] != 1
+        self._instance_status[nodes[index.edge_children[negative_parent]]] = 0
 
     def _get_nonredundant_features_relevance(self, idx):
         """
@@ -165,19 +177,18 @@ class LazyHierarchicalFeatureSelector(ABC, HierarchicalEstimator):
         idx :
             Index of test instance for which the features shall be selected.
         """
-        for node in self._hierarchy_graph:
-            self._instance_status[node] = 1
-        for node in self._hierarchy_graph:
-            if node == "ROOT":
-                continue
-            if self._xtest[idx][node] == 1:
-                for anc in nx.ancestors(self._hierarchy_graph, node):
-                    if self._relevance[anc] <= self._relevance[node]:
-                        self._instance_status[anc] = 0
-            else:
-                for desc in nx.descendants(self._hierarchy_graph, node):
-                    if self._relevance[desc] <= self._relevance[node]:
-                        self._instance_status[desc] = 0
+        index = self._get_hierarchy_index()
+        nodes = self._node_names(index)
+        values = self._xtest[idx][nodes]
+        relevance = self._node_relevance(index)
+        positive = values == 1
+        # A node is redundant if a descendant with value 1 or an ancestor
+        # with value 0 is at least as relevant.
+        redundant = (
+            index.descendant_maximum(np.where(positive, relevance, -np.inf)) >= relevance
+        ) | (index.ancestor_maximum(np.where(positive, -np.inf, relevance)) >= relevance)
+        self._instance_status[:] = 1
+        self._instance_status[nodes[redundant]] = 0
 
     def _get_nonredundant_features_mr(self, idx):
         """
@@ -191,8 +202,12 @@ class LazyHierarchicalFeatureSelector(ABC, HierarchicalEstimator):
             Index of test instance for which the features shall be selected.
         """
 
-        top_sort = list(nx.topological_sort(self._hierarchy_graph))
-        reverse_top_sort = reversed(top_sort)
+        index = self._get_hierarchy_index()
+        nodes = self._node_names(index)
+        values = self._xtest[idx][nodes]
+        relevance = self._node_relevance(index)
+        top_sort = index.topological_order
+        reverse_top_sort = top_sort[::-1]
         mr = {}
 
         for node in top_sort:
@@ -217,37 +232,36 @@ class LazyHierarchicalFeatureSelector(ABC, HierarchicalEstimator):
             #
             mr[node] = []
             more_rel_nodes = [node]
-            if self._xtest[idx][node]:
+            if values[node]:
                 # preds are 1 because of 0-1-propagation
-                for pred in self._hierarchy_graph.predecessors(node):
+                for pred in index.parents(node):
                     # get most relevant nodes seen on the paths until current node
                     for _mr in mr[pred]:
                         # if their is a node on the path more important then current node
-                        if self._relevance[_mr] > self._relevance[node]:
-                            self._instance_status[node] = 0
+                        if relevance[_mr] > relevance[node]:
+                            self._instance_status[nodes[node]] = 0
                             # save this node for next iterations (steps on path)
                             more_rel_nodes.append(_mr)
                         else:
                             # save current node as most important.
                             # there can be several paths, in this case, several nodes are saved
-                            self._instance_status[_mr] = 0
+                            self._instance_status[nodes[_mr]] = 0
                             more_rel_nodes.append(node)
             mr[node] = more_rel_nodes
 
         for node in reverse_top_sort:
             mr[node] = []
             more_rel_nodes = [node]
-            if not self._xtest[idx][node]:
-                mr[node] = node
-                for suc in self._hierarchy_graph.successors(node):
+            if not values[node]:
+                for suc in index.children(node):
                     # get most relevant nodes seen on paths until current node
                     for _mr in mr[suc]:
-                        if self._relevance[_mr] > self._relevance[node]:
+                        if relevance[_mr] > relevance[node]:
                             # each node not selected will removed
-                            self._instance_status[node] = 0
+                            self._instance_status[nodes[node]] = 0
                             more_rel_nodes.append(_mr)
                         else:
-                            self._instance_status[_mr] = 0
+                            self._instance_status[nodes[_mr]] = 0
                             more_rel_nodes.append(node)
             mr[node] = more_rel_nodes
 
@@ -255,36 +269,37 @@ class LazyHierarchicalFeatureSelector(ABC, HierarchicalEstimator):
         """
         Get k highest-ranked features by relevance.
         """
-        counter = 0
-        for node in reversed(self._sorted_relevance):
-            if node == "ROOT":
-                continue
-            if (counter < self.k or not self.k) and self._instance_status[node]:
-                counter += 1
-            else:
-                self._instance_status[node] = 0
-
-    def _build_mst(self):
+        ranking = np.asarray(self._sorted_relevance[::-1], dtype=int)
+        selected = self._instance_status[ranking] != 0
+        if self.k:
+            selected &= np.cumsum(selected) <= self.k
+        self._instance_status[ranking] = selected
+
+    def _build_mst(self, max_partners=None):
         """
         Build minium spanning tree for each possible edge in the feature tree.
-        """
-        self._edge_status = np.zeros((self.n_features_in_, self.n_features_in_))
-        self._cmi = np.zeros((self.n_features_in_, self.n_features_in_))
-        self._sorted_edges = []
-        for node1 in self._hierarchy_graph.nodes:
-            for node2 in self._hierarchy_graph.nodes:
-                if node1 == node2:
-                    continue
-                self._cmi[node1][node2] = conditional_mutual_information(
-                    self._xtrain[:, node1], self._xtrain[:, node2], self._ytrain
-                )
-                self._edge_status[node1][node2] = 1
-        sorted_indices = np.argsort(self._cmi, axis=None)
-        for index in sorted_indices:
-            coordinates = divmod(index, self.n_features_in_)
 
-            if coordinates[0] < coordinates[1]:
-                self._sorted_edges.append(coordinates)
+        The candidate edges are kept as an array of node pairs sorted by
+        their conditional mutual information.
+
+        Parameters
+        ----------
+        max_partners : int or None
+            The number of candidate edges kept per node. If None all pairs
+            of nodes are candidates.
+        """
+        nodes = np.sort(np.asarray(list(self._hierarchy_graph.nodes), dtype=int))
+        if (
+            self._statistics.co_occurrences is not None
+            and nodes.shape[0] == self.n_features_in_
+        ):
+            data = self._statistics
+        else:
+            data = self._xtrain[:, nodes]
+        edges, _ = conditional_mutual_information_edges(
+            data, self._ytrain, max_partners=max_partners
+        )
+        self._sorted_edges = nodes[edges]
 
     def _get_nonredundant_features_from_mst(self, idx):
         """
@@ -298,33 +313,28 @@ class LazyHierarchicalFeatureSelector(ABC, HierarchicalEstimator):
             Index of test instance for which the features shall be selected.
         """
         UDAG = nx.Graph()
+        index = self._get_hierarchy_index()
 
-        for node1 in self._hierarchy_graph:
-            self._instance_status[node1] = 0
-            for node2 in self._hierarchy_graph:
-                self._edge_status[node1][node2] = 1
+        self._instance_status[:] = 0
+        # an edge is removed as soon as one of its nodes is removed
+        removed = np.zeros(self.n_features_in_, dtype=bool)
 
         representants = [i for i in range(self.n_features_in_)]
         members = {}
         for i in range(self.n_features_in_):
             members[i] = [i]
 
-        # get paths
-        reachable_nodes = {}
-        for node in self._hierarchy_graph:
-            reachable_nodes[node] = []
-            for des in nx.descendants(self._hierarchy_graph, node):
-                reachable_nodes[node].append(des)
+        closure = index.closure
+        nodes = self._node_names(index)
         # select edges
-        for edge in self._sorted_edges:
+        for edge in self._sorted_edges.tolist():
             if (
-                self._edge_status[edge[0]][edge[1]]
+                not (removed[edge[0]] or removed[edge[1]])
                 # check redundancy: same path and same value
                 and (
                     self._xtest[idx][edge[0]] != self._xtest[idx][edge[1]]
-                    or (
-                        edge[0] not in reachable_nodes[edge[1]]
-                        and edge[1] not in reachable_nodes[edge[1]]
+                    or not closure.is_descendant(
+                        index.node_ids[edge[0]], index.node_ids[edge[1]]
                     )
                 )
                 # check if circle in UDAG using the property, that edge (a,b) infers circle iff a und b
@@ -332,7 +342,6 @@ class LazyHierarchicalFeatureSelector(ABC, HierarchicalEstimator):
                 and representants[edge[0]] != representants[edge[1]]
             ):
                 UDAG.add_edge(edge[0], edge[1])
-                self._edge_status[edge[0]][edge[1]] = 0
 
                 # merge: change the representatives of the smaller component
                 if len(members[representants[edge[0]]]) <= len(
@@ -348,25 +357,16 @@ class LazyHierarchicalFeatureSelector(ABC, HierarchicalEstimator):
 
                 # remove all edges with redundant ancestors or descendants of e0 and e1
                 for selected_node in [edge[0], edge[1]]:
-                    for neighbor_node in nx.ancestors(
-                        self._hierarchy_graph, selected_node
-                    ):
-                        if (
-                            self._xtest[idx][selected_node]
-                            == self._xtest[idx][neighbor_node]
-                        ):
-                            # alternative: collect all and then delete in sorted_edges
-                            self._edge_status[:, neighbor_node] = 0
-                            self._edge_status[neighbor_node][:] = 0
-                    for neighbor_node in nx.descendants(
-                        self._hierarchy_graph, selected_node
-                    ):
-                        if (
-                            self._xtest[idx][selected_node]
-                            == self._xtest[idx][neighbor_node]
-                        ):
-                            self._edge_status[:, neighbor_node] = 0
-                            self._edge_status[neighbor_node][:] = 0
+                    selected_id = index.node_ids[selected_node]
+                    neighbor_nodes = nodes[
+                        closure.ancestor_mask(selected_id)
+                        | closure.descendant_mask(selected_id)
+                    ]
+                    neighbor_nodes = neighbor_nodes[
+                        self._xtest[idx][neighbor_nodes]
+                        == self._xtest[idx][selected_node]
+                    ]
+                    removed[neighbor_nodes] = True
 
                 self._instance_status[edge[0]] = 1
                 self._instance_status[edge[1]] = 1
@@ -387,14 +387,24 @@ class LazyHierarchicalFeatureSelector(ABC, HierarchicalEstimator):
         prediction : bool
             prediction of test instance's target value.
         """
-        features = [nodes for nodes, status in self._instance_status.items() if status]
-        features_in_dataset = []
-        for feature in features:
-            features_in_dataset.append(self._columns.index(feature))
+        features = np.flatnonzero(self._instance_status)
+        features_in_dataset = [self._column_index(feature) for feature in features]
         clf = estimator
         clf.fit(self._xtrain[:, features_in_dataset], self._ytrain)
         return clf.predict(self._xtest[idx][features_in_dataset].reshape(1, -1))
 
+    def _node_names(self, index):
+        """Get the names of the nodes in the index as an integer array.
+
+        The lazy selectors name each node after its column in X, so the
+        array maps node ids to columns.
+        """
+        return np.asarray(index.nodes, dtype=int)
+
+    def _node_relevance(self, index):
+        """Get the relevance of the nodes in the index as a float array."""
+        return np.array([self._relevance[node] for node in index.nodes], dtype=float)
+
     def get_score(self, ytest, predictions):
         """
         Returns score of the predictions.
@@ -17,8 +17,9 @@ class RNB(LazyHierarchicalFeatureSelector):
 
         Parameters
         ----------
-        hierarchy : np.ndarray
-            The hierarchy graph as an adjacency matrix.
+        hierarchy : {np.ndarray, sparse matrix, networkx.DiGraph}
+            The hierarchy graph as an adjacency matrix, an array of
+            (parent, child) edges or a graph.
         k : int
             The numbers of features to select.
         """
@@ -51,8 +52,6 @@ class RNB(LazyHierarchicalFeatureSelector):
             if predict:
                 predictions = np.append(predictions, self._predict(idx, estimator)[0])
             if saveFeatures:
-                self._features[idx] = np.array(list(self._instance_status.values()))
-            self._feature_length[idx] = len(
-                [nodes for nodes, status in self._instance_status.items() if status]
-            )
+                self._features[idx] = self._instance_status
+            self._feature_length[idx] = np.count_nonzero(self._instance_status)
         return predictions
@@ -8,8 +8,8 @@ import numpy as np
 from scipy import sparse
 from sklearn.utils.validation import check_X_y
 
-from hfs.helpers import compute_aggregated_values, get_leaves, get_paths
-from hfs.metrics import information_gain, pearson_correlation
+from hfs.helpers import compute_aggregated_values
+from hfs.metrics import information_gain, pearson_correlations
 from hfs.selectors import EagerHierarchicalFeatureSelector
 
 
@@ -23,7 +23,8 @@ class SHSELSelector(EagerHierarchicalFeatureSelector):
     root.
     This Selector also implements the hierarchical feature
     engineering (HFE) extension proposed by Oudah and Henschel in
-    2018.
+    2018. Its aggregated values of bool and integer data are summed in
+    an integer dtype wide enough not to overflow.
     """
 
     def __init__(
@@ -38,8 +39,9 @@ class SHSELSelector(EagerHierarchicalFeatureSelector):
 
         Parameters
         ----------
-        hierarchy : np.ndarray
-                    The hierarchy graph as an adjacency matrix.
+        hierarchy : {np.ndarray, sparse matrix, networkx.DiGraph}
+                    The hierarchy graph as an adjacency matrix, an array of
+                    (parent, child) edges or a graph.
         relevance_metric : str
                     The relevance metric to use in the initial selection
                     stage of the algorithm. The options ore "IG" for
@@ -65,7 +67,7 @@ class SHSELSelector(EagerHierarchicalFeatureSelector):
         self.use_hfe_extension = use_hfe_extension
         self.preprocess_numerical_data = preprocess_numerical_data
 
-    def fit(self, X, y, columns=None):
+    def fit(self, X, y, columns=None, statistics=None):
         """Fitting function that sets self.representatives\_.
 
         The number of columns in X and the number of nodes in the hierarchy
@@ -89,6 +91,9 @@ class SHSELSelector(EagerHierarchicalFeatureSelector):
             A list of ints. If this parameter is None the columns in X and
             the corresponding nodes in the hierarchy are expected to be in the
             same order.
+        statistics : SufficientStatistics or None
+            Statistics of X and y computed before, which are used instead of
+            scanning X for the relevance metric. Default is None.
 
         Returns
         -------
@@ -102,85 +107,138 @@ class SHSELSelector(EagerHierarchicalFeatureSelector):
         super().fit(X, y, columns)
 
         # Feature Selection Algorithm
-        self._calculate_relevance(X, y)
+        self._calculate_relevance(self._metric_data(X, statistics), y)
         self._fit(X)
 
         self.is_fitted_ = True
         return self
 
     def _fit(self, X):
-        """The feature selection algorithm."""
+        """The feature selection algorithm.
+
+        The path based stages are computed on the edges of the hierarchy
+        instead of on all paths from the root to the leaves, whose number
+        can grow exponentially.
+        """
         if self.preprocess_numerical_data:
             X = self._preprocess(X)
-        paths = get_paths(self._hierarchy_graph, reverse=True)
-        self._inital_selection(paths, X)
-        self._pruning(paths)
+        self._inital_selection(X)
+        self._pruning()
         if self.use_hfe_extension:
             self._leaf_filtering()
 
-    def _inital_selection(self, paths, X):
-        """First part of the feature selection algorithm."""
-        remove_nodes = set()
-
-        for path in paths:
-            # If the relevance is to similar to the parents relevance
-            # the child is removed
-            for index, node in enumerate(path):
-                parent_node = path[index + 1]
-                if parent_node == "ROOT":
-                    break
-                if self.relevance_metric == "IG":
-                    similarity = 1 - abs(
-                        self._relevance_values[parent_node] - self._relevance_values[node]
-                    )
-                else:
-                    similarity = pearson_correlation(
-                        X[:, self._columns.index(parent_node)],
-                        X[:, self._columns.index(node)],
-                    )
-                if similarity >= self.similarity_threshold:
-                    remove_nodes.add(node)
+    def _inital_selection(self, X):
+        """First part of the feature selection algorithm.
+
+        Every edge lies on a path from a leaf to the root, so comparing
+        each node to all of its parents except "ROOT" covers all paths.
+        """
+        index = self._get_hierarchy_index()
+        edges = np.flatnonzero(index.edge_parents != index.root)
+        parents, children = index.edge_parents[edges], index.edge_children[edges]
+
+        # If the relevance is to similar to the parents relevance
+        # the child is removed
+        if self.relevance_metric == "IG":
+            relevance = np.array(
+                [self._relevance_values.get(node, np.nan) for node in index.nodes]
+            )
+            similarity = 1 - np.abs(relevance[parents] - relevance[children])
+        else:
+            # the correlation of each edge is computed once, however many
+            # paths the edge lies on
+            node_columns = self._node_columns(index)
+            similarity = pearson_correlations(
+                X, node_columns[parents], node_columns[children]
+            )
+        remove_nodes = set(
+            index.names(np.unique(children[similarity >= self.similarity_threshold]))
+        )
 
         self.representatives_ = [
             feature for feature in self._columns if feature not in remove_nodes
         ]
 
     def _select_leaves(self):
-        """Select leaves of incomplete paths (part of HFE extension)"""
-        leaves = [
-            leaf
-            for leaf in get_leaves(self._hierarchy_graph)
-            if leaf in self.representatives_
+        """Select leaves of incomplete paths (part of HFE extension)
+
+        A leaf is on an incomplete path if its shortest path from the root
+        is shorter than the longest path in the hierarchy.
+        """
+        index = self._get_hierarchy_index()
+        representatives = set(self.representatives_)
+        leaves = index.leaves()
+        max_path_len = index.depth[leaves].max(initial=0)
+        return [
+            index.nodes[leaf]
+            for leaf in leaves
+            if index.nodes[leaf] in representatives
+            and index.min_depth[leaf] < max_path_len
         ]
 
-        paths = get_paths(self._hierarchy_graph)
-        max_path_len = max([len(path) for path in paths])
-        selected_leaves = []
-        for leaf in leaves:
-            for path in paths:
-                if leaf in path and len(path) != max_path_len:
-                    selected_leaves.append(leaf)
-        return selected_leaves
-
-    def _pruning(self, paths):
-        """Second part of the feature selection algorithm"""
-        paths = get_paths(self._hierarchy_graph, reverse=True)
-        updated_representatives = []
+    def _pruning(self):
+        """Second part of the feature selection algorithm
+
+        A representative is kept if its relevance is at least the average
+        relevance of the representatives on one of its paths. The lowest
+        average of the paths through a node is found by combining the
+        minimal relevance sums above and below the node for each number
+        of representatives on the path.
+        """
+        index = self._get_hierarchy_index()
+        representatives = set(self.representatives_)
+        is_representative = np.array(
+            [node in representatives for node in index.nodes], dtype=bool
+        )
+        is_representative[index.root] = False
+        relevance = np.array(
+            [
+                self._relevance_values[node] if is_representative[node_id] else 0.0
+                for node_id, node in enumerate(index.nodes)
+            ]
+        )
 
-        for path in paths:
-            path.remove("ROOT")
-            average_relevance = statistics.mean(
-                [
-                    self._relevance_values[node]
-                    for node in path
-                    if node in self.representatives_
-                ]
+        # above[i, c]: minimal relevance sum of c representatives on a path
+        # from the root to node i, including node i.
+        # below[i, c]: the same for the paths from node i to a leaf,
+        # excluding node i.
+        max_count = index.depth.max(initial=0) + 1
+        above = np.full((index.n_nodes, max_count + 1), np.inf)
+        below = np.full((index.n_nodes, max_count + 1), np.inf)
+        above[index.root, 0] = 0
+        below[index.leaves(), 0] = 0
+        parents, children = index.edge_parents, index.edge_children
+        for edges in index.edge_levels(downwards=True):
+            np.minimum.at(above, children[edges], above[parents[edges]])
+            targets = np.unique(children[edges])
+            above[targets] = _add_to_sums(
+                above[targets], is_representative[targets], relevance[targets]
+            )
+        for edges in index.edge_levels(downwards=False):
+            edge_children = children[edges]
+            np.minimum.at(
+                below,
+                parents[edges],
+                _add_to_sums(
+                    below[edge_children],
+                    is_representative[edge_children],
+                    relevance[edge_children],
+                ),
             )
-            for node in path:
-                if node in self.representatives_ and round(
-                    self._relevance_values[node], 6
-                ) >= round(average_relevance, 6):
-                    updated_representatives.append(node)
+
+        updated_representatives = []
+        num_representatives = np.arange(1, 2 * max_count + 2)
+        for node_id in np.flatnonzero(is_representative):
+            # minimal sum for each total number of representatives
+            sums = np.full(2 * max_count + 2, np.inf)
+            for count in np.flatnonzero(np.isfinite(above[node_id])):
+                start, end = count, count + max_count + 1
+                sums[start:end] = np.minimum(
+                    sums[start:end], above[node_id, count] + below[node_id]
+                )
+            average_relevance = np.min(sums[1:] / num_representatives)
+            if round(relevance[node_id], 6) >= round(average_relevance, 6):
+                updated_representatives.append(index.nodes[node_id])
 
         self.representatives_ = updated_representatives
 
@@ -194,7 +252,7 @@ class SHSELSelector(EagerHierarchicalFeatureSelector):
         This is part of the HFE extension and only makes sense for
         numerial data and not for binary data.
         """
-        return compute_aggregated_values("ROOT", X, self._hierarchy_graph, self._columns)
+        return compute_aggregated_values(X, self._get_hierarchy_index(), self._columns)
 
     def _leaf_filtering(self):
         """Filtering representatives by removing leaves with low relevance.
@@ -217,3 +275,17 @@ class SHSELSelector(EagerHierarchicalFeatureSelector):
             node for node in self.representatives_ if node not in remove_nodes
         ]
         self.representatives_ = updated_representatives
+
+
+def _add_to_sums(sums, is_representative, relevance):
+    """Add nodes to their rows of minimal relevance sums by count.
+
+    For representatives the sum for c + 1 representatives is the sum for c
+    representatives plus the node's relevance. Other rows are unchanged.
+    """
+    sums = sums.copy()
+    shifted = sums[is_representative]
+    shifted[:, 1:] = shifted[:, :-1] + relevance[is_representative, np.newaxis]
+    shifted[:, 0] = np.inf
+    sums[is_representative] = shifted
+    return sums
@@ -11,15 +11,22 @@ class TAN(LazyHierarchicalFeatureSelector):
     Select non-redundant features following the algorithm proposed by Wan and Freitas.
     """
 
-    def __init__(self, hierarchy=None):
+    def __init__(self, hierarchy=None, max_partners=None):
         """Initializes a HNBs-Selector.
 
         Parameters
         ----------
-        hierarchy : np.ndarray
-            The hierarchy graph as an adjacency matrix.
+        hierarchy : {np.ndarray, sparse matrix, networkx.DiGraph}
+            The hierarchy graph as an adjacency matrix, an array of
+            (parent, child) edges or a graph.
+        max_partners : int or None
+            The number of candidate edges kept per feature, the ones with
+            the lowest conditional mutual information. This bounds the
+            memory for many features. If None all pairs of features are
+            candidates.
         """
         super(TAN, self).__init__(hierarchy)
+        self.max_partners = max_partners
 
     def select_and_predict(
         self, predict=True, saveFeatures=False, estimator=BernoulliNB()
@@ -45,14 +52,12 @@ class TAN(LazyHierarchicalFeatureSelector):
         predictions for test input samples, if predict = false, returns empty array.
         """
         predictions = np.array([])
-        self._build_mst()
+        self._build_mst(self.max_partners)
         for idx in range(len(self._xtest)):
             self._get_nonredundant_features_from_mst(idx)
             if predict:
                 predictions = np.append(predictions, self._predict(idx, estimator)[0])
             if saveFeatures:
-                self._features[idx] = np.array(list(self._instance_status.values()))
-            self._feature_length[idx] = len(
-                [nodes for nodes, status in self._instance_status.items() if status]
-            )
+                self._features[idx] = self._instance_status
+            self._feature_length[idx] = np.count_nonzero(self._instance_status)
         return predictions
@@ -3,10 +3,8 @@ TSEL Feature Selector.
 """
 
 import numpy as np
-from networkx.algorithms.dag import descendants
 from sklearn.utils.validation import check_X_y
 
-from hfs.helpers import get_paths
 from hfs.metrics import lift
 from hfs.selectors.eagerHierarchicalFeatureSelector import (
     EagerHierarchicalFeatureSelector,
@@ -29,10 +27,11 @@ class TSELSelector(EagerHierarchicalFeatureSelector):
 
         Parameters
         ----------
-        hierarchy : np.ndarray
-                    The hierarchy graph as an adjacency matrix. The
-                    feature selection method is intended for a hierarchy
-                    graph that has a tree structure.
+        hierarchy : {np.ndarray, sparse matrix, networkx.DiGraph}
+                    The hierarchy graph as an adjacency matrix, an array of
+                    (parent, child) edges or a graph. The feature
+                    selection method is intended for a hierarchy graph
+                    that has a tree structure.
         use_original_implementation: bool
                     Should the original implementation from the
                     paper be used. If False, a slightly different
@@ -42,7 +41,7 @@ class TSELSelector(EagerHierarchicalFeatureSelector):
         super().__init__(hierarchy)
         self.use_original_implementation = use_original_implementation
 
-    def fit(self, X, y, columns=None):
+    def fit(self, X, y, columns=None, statistics=None):
         """Fitting function that sets self.representatives\_.
 
         The number of columns in X and the number of nodes in the hierarchy
@@ -65,6 +64,9 @@ class TSELSelector(EagerHierarchicalFeatureSelector):
             A list of ints. If this parameter is None the columns in X and
             the corresponding nodes in the hierarchy are expected to be in the
             same order.
+        statistics : SufficientStatistics or None
+            Statistics of X and y computed before, which are used instead of
+            scanning X for the relevance metric. Default is None.
 
         Returns
         -------
@@ -76,18 +78,17 @@ class TSELSelector(EagerHierarchicalFeatureSelector):
         super().fit(X, y, columns)
 
         # Feature Selection Algorithm
-        paths = get_paths(self._hierarchy_graph)
-        lift_values = lift(X, y)
+        lift_values = lift(self._metric_data(X, statistics), y)
         self._node_to_lift = {
             column_name: lift_values[index]
             for index, column_name in enumerate(self._columns)
         }
-        self.representatives_ = self._find_representatives(paths)
+        self.representatives_ = self._find_representatives()
 
         self.is_fitted_ = True
         return self
 
-    def _find_representatives(self, paths):
+    def _find_representatives(self):
         """ "Finds a representative node for each path.
 
         This is the first stage of the feature selection algorithm.
@@ -95,72 +96,94 @@ class TSELSelector(EagerHierarchicalFeatureSelector):
         This is determined by the self.use_original_implementation
         parameter.
 
-        Parameters
-        ----------
-        paths : list
-                The paths for which the representative nodes should
-                be found. This is a list of lists of node names.
+        The representatives are found with dynamic programming over the
+        edges of the hierarchy instead of enumerating all paths from the
+        root to the leaves, whose number can grow exponentially.
 
         Returns
         -------
         list : A list of node names. This are the features chosen
             by the feature selection algorithm.
         """
-        representatives = set()
-        for path in paths:
-            path.remove("ROOT")
-            max_node = (
-                self._select_from_path1(path)
-                if self.use_original_implementation
-                else self._select_from_path2(path)
-            )
-            representatives.add(max_node)
-        return self._filter_representatives(representatives)
-
-    def _select_from_path1(self, path: list[str]):
-        """Finds the prepresentative node for a path.
+        index = self._get_hierarchy_index()
+        lift_values = np.array(
+            [self._node_to_lift.get(node, np.nan) for node in index.nodes]
+        )
+        lift_values[index.root] = -np.inf
+        if self.use_original_implementation:
+            is_representative = self._select_from_paths1(index, lift_values)
+        else:
+            is_representative = self._select_from_paths2(index, lift_values)
+        is_representative[index.root] = False
+        return self._filter_representatives(
+            index.names(np.flatnonzero(is_representative))
+        )
+
+    def _select_from_paths1(self, index, lift_values):
+        """Finds the representative nodes of all paths.
 
         This is the implementation used in paper by Jeong and Myaeng.
+        The representative of a path is the first node whose lift is not
+        lower than the lift of the next node, or the last node of the path.
+        A node is the representative of some path if the lift strictly
+        increases on a path from the root to the node and the node is a
+        leaf or has a child with a lower or equal lift.
 
         Parameters
         ----------
-        paths : list
-                The paths for which the representative nodes should
-                be found. This is a list of lists of node names.
+        index : HierarchyIndex
+                The index of the hierarchy graph.
+        lift_values : numpy.ndarray
+                The lift of each node id.
 
         Returns
         -------
-        node : int
-                The node selected as the representative for the given
-                path.
+        is_representative : numpy.ndarray of bool
+                True for the nodes selected as the representative of a path.
         """
-        for index, node in enumerate(path):
-            if index == len(path) - 1:
-                return node
-            elif self._node_to_lift[node] >= self._node_to_lift[path[index + 1]]:
-                return node
+        parents, children = index.edge_parents, index.edge_children
+        increasing = lift_values[parents] < lift_values[children]
+
+        increasing_from_root = np.zeros(index.n_nodes, dtype=bool)
+        increasing_from_root[index.children(index.root)] = True
+        for edges in index.edge_levels():
+            edges = edges[increasing[edges]]
+            np.logical_or.at(
+                increasing_from_root,
+                children[edges],
+                increasing_from_root[parents[edges]],
+            )
+
+        drops = index.out_degree == 0
+        np.logical_or.at(drops, parents, ~increasing)
+        return increasing_from_root & drops
 
-    def _select_from_path2(self, path: list[str]):
-        """Finds the prepresentative node for a path.
+    def _select_from_paths2(self, index, lift_values):
+        """Finds the representative nodes of all paths.
 
         This is a different interpretation of the algorithm form the
-        paper by Jeong and Myaeng. If multiple nodes are the maximum
-        the node closest to the root is returned
+        paper by Jeong and Myaeng. The representative of a path is the
+        node with the maximum lift. If multiple nodes are the maximum
+        the node closest to the root is used. A node is the
+        representative of some path if there is a path from the root
+        with lower lift values and a path to a leaf without higher lift
+        values.
 
         Parameters
         ----------
-        paths : list
-                The paths for which the representative nodes should
-                be found. This is a list of lists of node names.
+        index : HierarchyIndex
+                The index of the hierarchy graph.
+        lift_values : numpy.ndarray
+                The lift of each node id.
 
         Returns
         -------
-        node : int
-                The node selected as the representative for the given
-                path.
+        is_representative : numpy.ndarray of bool
+                True for the nodes selected as the representative of a path.
         """
-        max_node = max(path, key=lambda x: self._node_to_lift[x])
-        return max_node
+        return (index.path_ancestor_minimax(lift_values) < lift_values) & (
+            index.path_descendant_minimax(lift_values) <= lift_values
+        )
 
     def _filter_representatives(self, representatives: list[str]):
         """Filters the representative nodes selected in the previous stage.
@@ -175,13 +198,14 @@ class TSELSelector(EagerHierarchicalFeatureSelector):
         representatives : list
                 The list of filtered representatives.
         """
-        updated_representatives = []
-        for node in representatives:
-            selected_decendents = [
-                descendent
-                for descendent in descendants(self._hierarchy_graph, node)
-                if descendent in representatives
-            ]
-            if not selected_decendents:
-                updated_representatives.append(node)
-        return updated_representatives
+        index = self._get_hierarchy_index()
+        representative_ids = index.ids(representatives)
+        closure = index.closure
+        has_representative_descendant = closure.has_descendant_in(
+            representative_ids, closure.pack(representative_ids)
+        )
+        return [
+            node
+            for node, remove in zip(representatives, has_representative_descendant)
+            if not remove
+        ]
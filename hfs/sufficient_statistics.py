@@ -0,0 +1,334 @@
+"""
+Sufficient statistics of a dataset for the relevance metrics.
+"""
+
+import numpy as np
+from scipy import sparse
+
+from hfs.packed import PackedBinaryMatrix, is_binary
+
+
+class SufficientStatistics:
+    """Counts of a dataset that the metrics are computed from.
+
+    The samples of each value of each feature are counted per class in one
+    pass over the data. The information gain, the gain ratio, the lift and
+    the relevance of the lazy selectors only need these counts, so metrics
+    and selectors that are given the same statistics don't scan the data
+    again.
+
+    Parameters
+    ----------
+    X : {array-like, sparse matrix, PackedBinaryMatrix}
+        The training input samples, shape (n_samples, n_features).
+    y : array-like, shape (n_samples,)
+        The target values.
+    pairwise : bool
+        If True the samples in which two features are both 1 are counted
+        for all pairs of features and each class, too. This needs binary
+        data and memory quadratic in the number of features. Default is
+        False.
+    block_size : int or None
+        The number of features counted at once. If None it is chosen so
+        that a block has about 2^22 entries.
+    packed : bool
+        If True and X is binary, X is packed into bits and the samples are
+        counted with popcounts, see PackedBinaryMatrix. Packed data is
+        always counted this way. Default is False.
+
+    Attributes
+    ----------
+    num_samples : int
+        The number of samples.
+    num_features : int
+        The number of features.
+    classes : numpy.ndarray, shape (n_classes,)
+        The sorted class labels.
+    class_counts : numpy.ndarray, shape (n_classes,)
+        The number of samples of each class.
+    counts : numpy.ndarray, shape (n_rows, n_classes)
+        The number of samples of each class for every pair of a feature
+        and one of its values. The rows are sorted by feature and value.
+        Values that do not occur for a feature may have a row of zeros.
+    row_features : numpy.ndarray, shape (n_rows,)
+        The feature of each row.
+    row_values : numpy.ndarray, shape (n_rows,)
+        The value of each row.
+    starts : numpy.ndarray, shape (n_features,)
+        The first row of each feature.
+    set_order : numpy.ndarray, shape (n_classes,)
+        The positions of the classes in the order in which a set of the
+        labels iterates them.
+    co_occurrences : numpy.ndarray or None, shape (n_classes, n_features, n_features)
+        The number of samples of each class in which both features are 1.
+        None if pairwise is False.
+    """
+
+    def __init__(self, X, y, pairwise=False, block_size=None, packed=False):
+        labels = np.asarray(y).ravel()
+        self.num_samples, self.num_features = X.shape
+        self.classes, class_codes = np.unique(labels, return_inverse=True)
+        class_codes = class_codes.ravel()
+        self.class_counts = np.bincount(class_codes, minlength=len(self.classes))
+        # the info_gain library sums up the classes in this order
+        self.set_order = np.searchsorted(self.classes, list(set(labels)))
+
+        if packed and not isinstance(X, PackedBinaryMatrix) and is_binary(X):
+            X = PackedBinaryMatrix(X)
+        if isinstance(X, PackedBinaryMatrix):
+            self._count_packed(X, class_codes)
+        else:
+            self._count(X, class_codes, block_size)
+        self.row_features = np.repeat(
+            np.arange(self.num_features),
+            np.diff(np.append(self.starts, self.counts.shape[0])),
+        )
+
+        self.co_occurrences = None
+        if pairwise:
+            if not self.is_binary():
+                raise ValueError("Pairwise co-occurrences need binary features.")
+            positions = range(len(self.classes))
+            if isinstance(X, PackedBinaryMatrix):
+                self.co_occurrences = np.stack(
+                    [
+                        X.co_occurrences(X.pack_samples(class_codes == position))
+                        for position in positions
+                    ]
+                )
+            else:
+                if sparse.issparse(X):
+                    X = sparse.csr_matrix(X)
+                else:
+                    X = np.asarray(X)
+                self.co_occurrences = np.stack(
+                    [
+                        _class_co_occurrences(X[class_codes == position])
+                        for position in positions
+                    ]
+                )
+
+    def _count(self, X, class_codes, block_size):
+        """Count the samples of each value with contingency tables."""
+        if sparse.issparse(X):
+            X = sparse.csc_matrix(X)
+        else:
+            X = np.asarray(X)
+        if block_size is None:
+            block_size = max(1, 2**22 // max(1, self.num_samples))
+
+        counts, row_values, starts = [], [], []
+        num_rows = 0
+        for start in range(0, self.num_features, block_size):
+            end = min(start + block_size, self.num_features)
+            block_counts, block_values, block_starts = _contingency_table(
+                X[:, start:end], class_codes, len(self.classes)
+            )
+            counts.append(block_counts.astype(np.int64))
+            row_values.append(block_values)
+            starts.append(block_starts + num_rows)
+            num_rows += block_counts.shape[0]
+        if not counts:
+            counts = [np.zeros((0, len(self.classes)), dtype=np.int64)]
+        self.counts = np.concatenate(counts)
+        self.row_values = np.concatenate(row_values) if row_values else np.zeros(0)
+        self.starts = np.concatenate(starts) if starts else np.zeros(0, np.intp)
+
+    def _count_packed(self, X, class_codes):
+        """Count the samples of the values 0 and 1 with popcounts."""
+        ones = X.class_counts(class_codes, len(self.classes))
+        self.counts = np.stack([self.class_counts - ones, ones], axis=1).reshape(
+            -1, len(self.classes)
+        )
+        self.row_values = np.tile([0, 1], self.num_features)
+        self.starts = np.arange(self.num_features) * 2
+
+    @property
+    def shape(self):
+        """The shape of the data the statistics were computed for."""
+        return (self.num_samples, self.num_features)
+
+    @property
+    def class_priors(self):
+        """The share of the samples of each class."""
+        return self.class_counts / self.num_samples
+
+    def is_binary(self):
+        """Whether all values of the data are 0 or 1."""
+        observed = self.counts.sum(axis=1) > 0
+        return bool(np.all(np.isin(self.row_values[observed], [0, 1])))
+
+    def value_class_counts(self, value, labels=None):
+        """Count the samples with a value for each feature and class.
+
+        Parameters
+        ----------
+        value : scalar
+            The value of the features.
+        labels : array-like or None
+            The class labels to count for. Labels that do not occur are
+            counted as 0. If None all classes are counted.
+
+        Returns
+        ----------
+        counts : numpy.ndarray, shape (n_features, n_labels)
+            The number of samples of each class in which each feature has
+            the value.
+        """
+        value_counts = np.zeros((self.num_features, len(self.classes)), dtype=np.int64)
+        rows = self.row_values == value
+        value_counts[self.row_features[rows]] = self.counts[rows]
+        if labels is None:
+            return value_counts
+        return value_counts[:, self._class_positions(labels)] * self._has_class(labels)
+
+    def label_counts(self, labels):
+        """Count the samples of each of the given class labels.
+
+        Parameters
+        ----------
+        labels : array-like
+            The class labels. Labels that do not occur are counted as 0.
+
+        Returns
+        ----------
+        counts : numpy.ndarray, shape (n_labels,)
+            The number of samples of each class.
+        """
+        return self.class_counts[self._class_positions(labels)] * self._has_class(labels)
+
+    def check_data(self, X):
+        """Raise a ValueError if the statistics are not of the shape of X."""
+        if tuple(X.shape) != self.shape:
+            raise ValueError(
+                f"The statistics were computed for data of shape {self.shape}, "
+                f"but the data has shape {tuple(X.shape)}."
+            )
+
+    def _class_positions(self, labels):
+        positions = np.searchsorted(self.classes, labels)
+        return np.minimum(positions, len(self.classes) - 1)
+
+    def _has_class(self, labels):
+        return self.classes[self._class_positions(labels)] == np.asarray(labels)
+
+
+def get_statistics(X, y=None, pairwise=False):
+    """Get sufficient statistics for the given data.
+
+    Parameters
+    ----------
+    X : {array-like, sparse matrix, PackedBinaryMatrix, SufficientStatistics}
+        The training input samples or statistics computed before, which
+        are returned as they are.
+    y : array-like or None, shape (n_samples,)
+        The target values. Only used if X are samples.
+    pairwise : bool
+        Whether pairwise co-occurrences are needed.
+
+    Returns
+    ----------
+    statistics : SufficientStatistics
+        The statistics of X and y.
+    """
+    if isinstance(X, SufficientStatistics):
+        if pairwise and X.co_occurrences is None:
+            raise ValueError(
+                "The statistics need pairwise co-occurrences, "
+                "compute them with pairwise=True."
+            )
+        return X
+    if y is None:
+        raise ValueError("The target values are needed to compute statistics.")
+    return SufficientStatistics(X, y, pairwise=pairwise)
+
+
+def _class_co_occurrences(samples):
+    """Count the samples in which both features of a pair are 1."""
+    if sparse.issparse(samples):
+        samples = sparse.csc_matrix(samples, dtype=np.float64)
+        return (samples.T @ samples).toarray().astype(np.int64)
+    samples = np.asarray(samples, dtype=np.float64)
+    return (samples.T @ samples).astype(np.int64)
+
+
+def _contingency_table(data, class_codes, num_classes):
+    """Counts the samples of each value of each feature per class.
+
+    Every pair of a feature and one of its values is a row of the table.
+    The rows are sorted by feature and value. Rows of values that do not
+    occur for a feature may be part of the table and count nothing. For
+    sparse data the implicit zeros are counted from the number of stored
+    values.
+
+    Parameters
+    ----------
+    data : {numpy.ndarray, sparse matrix}, shape (n_samples, n_features)
+            The input samples.
+    class_codes : numpy.ndarray, shape (n_samples,)
+            The class of each sample as an int in ``range(num_classes)``.
+    num_classes : int
+            The number of classes.
+
+    Returns
+    ----------
+    counts : numpy.ndarray, shape (n_rows, num_classes)
+            The number of samples per feature value and class.
+    row_values : numpy.ndarray, shape (n_rows,)
+            The value of each row.
+    starts : numpy.ndarray, shape (n_features,)
+            The first row of each feature.
+    """
+    num_features = data.shape[1]
+    if sparse.issparse(data):
+        data = data.copy()
+        data.eliminate_zeros()
+        features = np.repeat(np.arange(num_features), np.diff(data.indptr))
+        sample_classes = class_codes[data.indices]
+        stored = np.bincount(
+            features * num_classes + sample_classes,
+            minlength=num_features * num_classes,
+        )
+        zeros = np.tile(np.bincount(class_codes, minlength=num_classes), num_features)
+        features = np.concatenate(
+            [features, np.repeat(np.arange(num_features), num_classes)]
+        )
+        values = np.concatenate([data.data, np.zeros(zeros.shape[0], dtype=data.dtype)])
+        sample_classes = np.concatenate(
+            [sample_classes, np.tile(np.arange(num_classes), num_features)]
+        )
+        weights = np.concatenate([np.ones(data.nnz, dtype=np.intp), zeros - stored])
+    else:
+        features = np.tile(np.arange(num_features), data.shape[0])
+        values = data.ravel()
+        sample_classes = np.repeat(class_codes, num_features)
+        weights = None
+
+    minimum = maximum = 0
+    if values.dtype.kind in "biu" and values.shape[0] > 0:
+        minimum, maximum = int(values.min()), int(values.max())
+    if values.dtype.kind in "biu" and maximum - minimum < values.shape[0]:
+        # small integers are their own codes after removing the offset
+        unique_values = np.arange(minimum, maximum + 1)
+        value_codes = values.astype(np.int64) - minimum
+    else:
+        unique_values, value_codes = np.unique(values, return_inverse=True)
+    num_values = max(1, unique_values.shape[0])
+    keys = features.astype(np.int64) * num_values + value_codes.ravel()
+    if num_features * num_values <= keys.shape[0]:
+        # few distinct values, each feature gets a row for every value
+        num_rows = num_features * num_values
+        starts = np.arange(num_features) * num_values
+        row_values = np.tile(unique_values, num_features)
+    else:
+        keys, keys_inverse = np.unique(keys, return_inverse=True)
+        num_rows = keys.shape[0]
+        starts = np.searchsorted(keys // num_values, np.arange(num_features))
+        row_values = unique_values[keys % num_values]
+        keys = keys_inverse.ravel()
+    counts = np.bincount(
+        keys * num_classes + sample_classes,
+        weights=weights,
+        minlength=num_rows * num_classes,
+    ).reshape(-1, num_classes)
+    return counts, row_values, starts
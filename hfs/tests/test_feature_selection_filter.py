@@ -170,3 +170,16 @@ def test_TAN(lazy_data3):
     assert selector.get_score(y_test, pred)["1"]["recall"] == 1.0  # sensitivity
     assert selector.get_score(y_test, pred)["0"]["recall"] == 0.0  # specivity
     assert selector.get_score(y_test, pred)["sensitivityxspecificity"] == 0.0
+
+
+def test_TAN_max_partners(lazy_data3):
+    hierarchy, X_train_ones, _, y_train, X_test, _, _ = lazy_data3
+    features = []
+    for max_partners in [None, X_train_ones.shape[1] - 1, 1]:
+        selector = TAN(nx.to_numpy_array(hierarchy), max_partners=max_partners)
+        selector.fit_selector(X_train=X_train_ones, y_train=y_train, X_test=X_test)
+        selector.select_and_predict(predict=False, saveFeatures=True)
+        features.append(selector.get_features())
+        if max_partners is not None:
+            assert len(selector._sorted_edges) <= max_partners * X_train_ones.shape[1]
+    assert np.array_equal(features[0], features[1])
@@ -3,15 +3,34 @@ from fractions import Fraction
 import networkx as nx
 import numpy as np
 import pytest
+from info_gain.info_gain import info_gain, info_gain_ratio
+from scipy.sparse import csr_matrix
 
 from hfs.helpers import (
     add_virtual_root_node,
+    check_data,
     compute_aggregated_values,
     connect_dag,
+    count_paths,
+    find_violations,
+    get_paths,
     get_relevance,
+    get_relevances,
+    graph_to_hierarchy,
+    hierarchy_to_graph,
+    iter_paths,
     shrink_dag,
 )
-from hfs.metrics import gain_ratio, information_gain
+from hfs.lib.pyitlib import entropy_joint, information_mutual_conditional
+from hfs.metrics import (
+    conditional_mutual_information,
+    conditional_mutual_information_edges,
+    conditional_mutual_information_matrix,
+    gain_ratio,
+    information_gain,
+    lift,
+    pearson_correlations,
+)
 
 
 def test_shrink_dag():
@@ -43,6 +62,21 @@ def test_relevance(lazy_data2):
         assert value == results[node_idx]
 
 
+@pytest.mark.parametrize("to_sparse", [False, True])
+def test_relevances(lazy_data2, lazy_data3, to_sparse):
+    for train_x_data, train_y_data in [lazy_data2[1:3], lazy_data3[2:4]]:
+        expected = [
+            get_relevance(train_x_data, train_y_data, node)
+            for node in range(train_x_data.shape[1])
+        ]
+        if to_sparse:
+            train_x_data = csr_matrix(train_x_data)
+        assert list(get_relevances(train_x_data, train_y_data, exact=True)) == expected
+        values = get_relevances(train_x_data, train_y_data)
+        assert values.dtype == np.float64
+        assert np.allclose(values, np.array(expected, dtype=float))
+
+
 def test_information_gain(data2, result_ig_values2):
     X, y, _, _ = data2
     ig = information_gain(X, y)
@@ -55,6 +89,98 @@ def test_gain_ratio(data2, result_gr_values2):
     assert gr == result_gr_values2
 
 
+def test_information_gain_sparse(data2, result_ig_values2, result_gr_values2):
+    X, y, _, _ = data2
+    assert information_gain(csr_matrix(X), y) == result_ig_values2
+    assert gain_ratio(csr_matrix(X), y) == result_gr_values2
+
+
+@pytest.mark.parametrize("sparse_input", [False, True])
+def test_conditional_mutual_information_matrix(sparse_input):
+    rng = np.random.default_rng(0)
+    X = (rng.random((40, 7)) < 0.4).astype(int)
+    y = rng.integers(0, 3, size=40)
+    data = csr_matrix(X) if sparse_input else X
+
+    cmi = conditional_mutual_information_matrix(data, y, block_size=3)
+    for node1 in range(7):
+        for node2 in range(node1, 7):
+            expected = conditional_mutual_information(X[:, node1], X[:, node2], y)
+            assert cmi[node1, node2] == expected
+            assert cmi[node2, node1] == expected
+
+
+def test_pyitlib_small_alphabet():
+    rng = np.random.default_rng(0)
+    X = rng.integers(-1, 2, size=(3, 50))
+    Y = rng.integers(0, 3, size=(3, 50))
+    Z = rng.integers(2, 5, size=(3, 50))
+    alphabets = [np.arange(-1, 2), np.arange(3), np.arange(2, 5)]
+
+    # passing the alphabets uses the general implementation
+    general = information_mutual_conditional(
+        X,
+        Y,
+        Z,
+        Alphabet_X=np.tile(alphabets[0], (3, 1)),
+        Alphabet_Y=np.tile(alphabets[1], (3, 1)),
+        Alphabet_Z=np.tile(alphabets[2], (3, 1)),
+    )
+    assert np.array_equal(information_mutual_conditional(X, Y, Z), general)
+    assert information_mutual_conditional(
+        X[0].astype(np.int32), Y[0], Z[0].astype(np.uint8)
+    ) == information_mutual_conditional(X[0], Y[0], Z[0], Alphabet_X=alphabets[0])
+    assert entropy_joint(X) == entropy_joint(X, Alphabet_X=np.tile(alphabets[0], (3, 1)))
+    assert np.isnan(entropy_joint(np.full(5, -1)))
+
+
+def test_conditional_mutual_information_edges():
+    rng = np.random.default_rng(0)
+    X = (rng.random((40, 7)) < 0.4).astype(int)
+    y = rng.integers(0, 3, size=40)
+    cmi = conditional_mutual_information_matrix(X, y)
+
+    edges, values = conditional_mutual_information_edges(X, y, block_size=3)
+    assert len(edges) == 7 * 6 // 2
+    assert np.all(edges[:, 0] < edges[:, 1])
+    assert np.array_equal(values, cmi[edges[:, 0], edges[:, 1]])
+    assert np.all(np.diff(values) >= 0)
+
+    capped, capped_values = conditional_mutual_information_edges(
+        X, y, max_partners=2, block_size=3
+    )
+    assert len(capped) <= 7 * 2
+    assert np.array_equal(capped_values, cmi[capped[:, 0], capped[:, 1]])
+    for node in range(7):
+        partners = edges[(edges == node).any(axis=1)][:2]
+        assert all((capped == partner).all(axis=1).any() for partner in partners)
+
+
+@pytest.mark.parametrize("sparse_input", [False, True])
+def test_pearson_correlations(sparse_input):
+    X = np.random.default_rng(0).integers(0, 3, size=(30, 5))
+    X[:, 4] = 1
+    data = csr_matrix(X) if sparse_input else X
+    first, second = np.triu_indices(5, 1)
+
+    correlations = pearson_correlations(data, first, second, block_size=3)
+    for pair, (column1, column2) in enumerate(zip(first, second)):
+        if column2 == 4:
+            assert np.isnan(correlations[pair])
+        else:
+            expected = np.corrcoef(X[:, column1], X[:, column2])[0, 1]
+            assert correlations[pair] == pytest.approx(expected)
+
+
+def test_information_gain_multi_valued():
+    X = np.random.default_rng(0).integers(0, 4, size=(30, 5))
+    y = np.random.default_rng(1).integers(0, 3, size=30)
+    expected_ig = [info_gain(X[:, column], y) for column in range(5)]
+    expected_gr = [info_gain_ratio(X[:, column], y) for column in range(5)]
+    assert information_gain(X, y) == pytest.approx(expected_ig)
+    assert gain_ratio(csr_matrix(X), y) == pytest.approx(expected_gr)
+
+
 @pytest.mark.parametrize(
     "data, result",
     [
@@ -69,3 +195,101 @@ def test_compute_aggregated_values(data, result, request):
     hierarchy = add_virtual_root_node(nx.DiGraph(hierarchy))
     X_transformed = compute_aggregated_values(X, hierarchy, columns)
     assert np.array_equal(X_transformed, result)
+
+
+@pytest.mark.parametrize("to_sparse", [False, True])
+def test_compute_aggregated_values_dag(to_sparse):
+    # node 3 can be reached from 0 via 1 and via 2 but is counted once
+    hierarchy = add_virtual_root_node(
+        nx.DiGraph([(0, 1), (0, 2), (1, 3), (2, 3), (4, 2)])
+    )
+    X = np.array([[0, 1, 0, 1, 1], [1, 0, 2, 0, 0]])
+    expected = np.array([[2, 2, 1, 1, 2], [3, 0, 2, 0, 2]])
+    if to_sparse:
+        X = csr_matrix(X)
+    X_transformed = compute_aggregated_values(X, hierarchy, [0, 1, 2, 3, 4])
+    if to_sparse:
+        assert X_transformed.format == "csr"
+        X_transformed = X_transformed.toarray()
+    assert np.array_equal(X_transformed, expected)
+
+    X_transformed = compute_aggregated_values(X, hierarchy, [0, 1, 2, 3, 4], node=2)
+    if to_sparse:
+        X_transformed = X_transformed.toarray()
+    assert np.array_equal(X_transformed, [[0, 1, 1, 1, 1], [1, 0, 2, 0, 0]])
+
+
+@pytest.mark.parametrize("to_sparse", [False, True])
+def test_compute_aggregated_values_dtype(to_sparse):
+    hierarchy = add_virtual_root_node(nx.DiGraph([(0, i) for i in range(1, 4)]))
+    X = np.array([[1, 1, 1, 1], [0, 1, 0, 1]])
+    expected = np.array([[4, 1, 1, 1], [2, 1, 0, 1]])
+    for dtype, aggregated_dtype, scale in [
+        (bool, np.int8, 1),
+        (np.int8, np.int16, 100),
+        (np.uint8, np.int16, 100),
+        (np.float32, np.float32, 1),
+    ]:
+        data = (X * scale).astype(dtype)
+        if to_sparse:
+            data = csr_matrix(data)
+        aggregated = compute_aggregated_values(data, hierarchy, [0, 1, 2, 3])
+        assert aggregated.dtype == aggregated_dtype
+        if to_sparse:
+            aggregated = aggregated.toarray()
+        assert np.array_equal(aggregated, expected * scale)
+
+
+@pytest.mark.parametrize("to_sparse", [False, True])
+def test_lift(to_sparse):
+    X = np.array([[1, 0, 0], [1, 2, 0], [0, 1, 0], [1, 0, 0]])
+    y = np.array([0, 1, 2, 1])
+    if to_sparse:
+        X = csr_matrix(X)
+    assert np.allclose(lift(X, y), [2 / 3 / (3 / 4), 1 / 1 / (2 / 4), 0])
+    assert np.allclose(lift(X, y, pos_label=2), [0, 1 / 2 / (2 / 4), 0])
+    assert np.allclose(lift(X, y, pos_label=[1, 2]), lift(X, y))
+
+
+def test_paths(lazy_data4):
+    _, big_DAG = lazy_data4
+    graph = add_virtual_root_node(nx.from_numpy_array(big_DAG, create_using=nx.DiGraph))
+    expected = list(nx.all_simple_paths(graph, "ROOT", [2, 6, 7, 8]))
+
+    assert get_paths(graph) == expected
+    assert count_paths(graph) == len(expected)
+    assert list(iter_paths(graph, max_paths=2)) == expected[:2]
+    assert next(iter_paths(graph, reverse=True)) == expected[0][::-1]
+
+
+@pytest.mark.parametrize("to_sparse", [False, True])
+def test_find_violations(to_sparse):
+    graph = nx.DiGraph([(0, 1), (0, 2), (1, 3), (4, 3)])
+    X = np.array([[1, 1, 0, 1, 1], [0, 1, 0, 0, 0], [1, 0, 1, 1, 0], [1, 1, 1, 1, 0]])
+    if to_sparse:
+        X = csr_matrix(X)
+
+    violations = find_violations(graph, X, block_size=2)
+    assert violations.tolist() == [(1, 0, 1), (2, 1, 3), (2, 4, 3), (3, 4, 3)]
+    assert find_violations(graph, X, count=True) == 4
+    assert find_violations(graph, X, fail_fast=True, block_size=1).tolist() == [(1, 0, 1)]
+    with pytest.raises(ValueError):
+        check_data(graph, X, np.zeros(4))
+    assert find_violations(graph, X[:1], count=True) == 0
+    check_data(graph, X[:1], np.zeros(1))
+
+
+def test_hierarchy_formats(lazy_data4):
+    _, big_DAG = lazy_data4
+    expected = nx.from_numpy_array(big_DAG, create_using=nx.DiGraph)
+    for format in ["dense", "sparse", "edges", "graph"]:
+        hierarchy = graph_to_hierarchy(expected, format=format)
+        graph = hierarchy_to_graph(hierarchy)
+        assert list(graph.nodes) == list(expected.nodes)
+        assert list(graph.edges) == list(expected.edges)
+
+    graph = nx.DiGraph([("b", "c"), ("a", "b")])
+    assert list(hierarchy_to_graph(graph).edges) == [(0, 1), (2, 0)]
+    assert list(graph.nodes) == ["b", "c", "a"]
+    with pytest.raises(ValueError):
+        hierarchy_to_graph(np.zeros((2, 3)))
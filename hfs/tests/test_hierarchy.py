@@ -0,0 +1,88 @@
+import networkx as nx
+import numpy as np
+
+from hfs.helpers import add_virtual_root_node
+from hfs.hierarchy import HierarchyIndex
+
+
+def test_hierarchy_index_matches_networkx(lazy_data4):
+    _, big_DAG = lazy_data4
+    graph = add_virtual_root_node(nx.from_numpy_array(big_DAG, create_using=nx.DiGraph))
+    index = HierarchyIndex(graph)
+
+    assert index.nodes == list(graph.nodes)
+    assert index.nodes[index.root] == "ROOT"
+    for node_id, node in enumerate(index.nodes):
+        assert index.names(index.children(node_id)) == list(graph.successors(node))
+        assert index.names(index.parents(node_id)) == list(graph.predecessors(node))
+        assert set(index.names(index.ancestors(node_id))) == nx.ancestors(graph, node)
+        assert set(index.names(index.descendants(node_id))) == nx.descendants(graph, node)
+    assert index.names(index.topological_order) == list(nx.topological_sort(graph))
+
+
+def test_hierarchy_index_depth(lazy_data4):
+    _, big_DAG = lazy_data4
+    graph = add_virtual_root_node(nx.from_numpy_array(big_DAG, create_using=nx.DiGraph))
+    index = HierarchyIndex(graph)
+
+    # node 7 can be reached via 0 -> 3 -> 7 and via 0 -> 1 -> 4 -> 7
+    assert index.depth[index.node_ids[7]] == 4
+    assert index.min_depth[index.node_ids[7]] == 3
+    assert index.depth[index.root] == 0
+    assert np.array_equal(index.names(index.leaves()), [2, 6, 7, 8])
+
+
+def test_hierarchy_closure_matches_networkx(lazy_data4):
+    _, big_DAG = lazy_data4
+    graph = add_virtual_root_node(nx.from_numpy_array(big_DAG, create_using=nx.DiGraph))
+    index = HierarchyIndex(graph)
+    closure = index.closure
+
+    assert closure is index.closure
+    assert closure.nbytes == 2 * index.n_nodes * ((index.n_nodes + 7) // 8)
+    for node_id, node in enumerate(index.nodes):
+        assert set(index.names(closure.ancestors(node_id))) == nx.ancestors(graph, node)
+        assert set(index.names(closure.descendants(node_id))) == nx.descendants(
+            graph, node
+        )
+    assert closure.is_ancestor(index.node_ids[0], index.node_ids[7])
+    assert closure.is_descendant(index.node_ids[7], index.node_ids[0])
+    assert not closure.is_descendant(index.node_ids[0], index.node_ids[7])
+    assert np.array_equal(
+        closure.is_ancestor(index.ids([0, 2]), index.ids([7, 7])), [True, False]
+    )
+
+
+def test_hierarchy_index_maximum(lazy_data4):
+    _, big_DAG = lazy_data4
+    graph = add_virtual_root_node(nx.from_numpy_array(big_DAG, create_using=nx.DiGraph))
+    index = HierarchyIndex(graph)
+    values = np.random.default_rng(0).random(index.n_nodes)
+
+    ancestor_maximum = index.ancestor_maximum(values)
+    descendant_maximum = index.descendant_maximum(values)
+    for node_id in range(index.n_nodes):
+        ancestors = index.ancestors(node_id)
+        descendants = index.descendants(node_id)
+        assert ancestor_maximum[node_id] == max(values[ancestors], default=-np.inf)
+        assert descendant_maximum[node_id] == max(values[descendants], default=-np.inf)
+
+
+def test_hierarchy_index_path_minimax(lazy_data4):
+    _, big_DAG = lazy_data4
+    graph = add_virtual_root_node(nx.from_numpy_array(big_DAG, create_using=nx.DiGraph))
+    index = HierarchyIndex(graph)
+    values = np.random.default_rng(0).random(index.n_nodes)
+    paths = [index.ids(path) for path in nx.all_simple_paths(graph, "ROOT", [2, 6, 7, 8])]
+
+    above = index.path_ancestor_minimax(values)
+    below = index.path_descendant_minimax(values)
+    for node_id in range(index.n_nodes):
+        positions = [
+            (path, list(path).index(node_id)) for path in paths if node_id in path
+        ]
+        prefixes = [path[:position] for path, position in positions]
+        suffixes = [path[position:][1:] for path, position in positions]
+        assert above[node_id] == min(max(values[p], default=-np.inf) for p in prefixes)
+        assert below[node_id] == min(max(values[p], default=-np.inf) for p in suffixes)
+    assert index.count_paths(index.root) == len(paths)
@@ -1,5 +1,7 @@
+import networkx as nx
 import numpy as np
 import pytest
+from scipy.sparse import csr_matrix
 
 from hfs.selectors.hill_climbing import BottomUpSelector, TopDownSelector
 
@@ -125,3 +127,137 @@ def test_calculate_fitness_function_td(
     fitness = selector._fitness_function(result_comparison_matrix_td1)
 
     assert np.array_equal(fitness, fitness_expected)
+
+
+@pytest.mark.parametrize("dtype", [np.float32, np.float64])
+@pytest.mark.parametrize("to_sparse", [False, True])
+def test_comparison_matrix_blocks(data2, dtype, to_sparse):
+    X, y, hierarchy, columns = data2
+    X = X.astype(dtype)
+    if to_sparse:
+        X = csr_matrix(X)
+
+    top_down = TopDownSelector(hierarchy).fit(X, y, columns)
+    scores = top_down._feature_scores(columns)
+    distances = top_down._comparison_matrix(columns, block_size=2)
+    assert distances.dtype == dtype
+    expected = np.sqrt(((scores[:, np.newaxis] - scores[np.newaxis]) ** 2).sum(axis=2))
+    assert np.allclose(distances, expected)
+    assert np.array_equal(np.diag(distances), np.zeros(X.shape[0]))
+
+    bottom_up = BottomUpSelector(hierarchy).fit(X, y, columns)
+    scores = bottom_up._feature_scores(columns)
+    similarities = bottom_up._comparison_matrix(columns, block_size=2)
+    norms = np.linalg.norm(scores, axis=1)
+    expected = scores @ scores.T / np.outer(norms, norms)
+    assert np.allclose(similarities, expected, equal_nan=True)
+
+
+@pytest.mark.parametrize("recompute_interval", [1, 2, 100])
+def test_top_down_incremental_distances(recompute_interval):
+    hierarchy = nx.to_numpy_array(nx.bfs_tree(nx.balanced_tree(2, 3), 0))
+    rng = np.random.default_rng(0)
+    X = rng.random((20, hierarchy.shape[0]))
+    y = rng.integers(0, 2, 20)
+
+    selector = TopDownSelector(hierarchy, dataset_type="numerical")
+    selector.recompute_interval = recompute_interval
+    selector.fit(X, y)
+    expected = TopDownSelector(hierarchy, dataset_type="numerical").fit(X, y)
+    assert sorted(selector.representatives_) == sorted(expected.representatives_)
+
+    # replace node 1 with its children 3 and 4
+    squared_distances = (
+        selector._squared_distances([1, 2])
+        - selector._squared_distances([1])
+        + selector._squared_distances([3, 4])
+    )
+    distances = selector._comparison_matrix([2, 3, 4])
+    assert np.allclose(np.sqrt(np.maximum(squared_distances, 0)), distances)
+
+
+def test_fitness_function_td_blocks(data2):
+    X, y, hierarchy, columns = data2
+    selector = TopDownSelector(hierarchy).fit(X, y, columns)
+    distances = np.random.default_rng(0).random((X.shape[0], X.shape[0]))
+    distances = distances + distances.T
+
+    expected = 0
+    for row in range(X.shape[0]):
+        same_class = y == y[row]
+        expected += distances[~same_class, row].sum() / (
+            1 + selector.alpha * distances[same_class, row].sum()
+        )
+    blocks = [slice(0, 2), slice(2, X.shape[0])]
+    fitness = sum(selector._fitness_block(distances[rows], rows) for rows in blocks)
+    assert np.isclose(selector._fitness_function(distances), expected)
+    assert np.isclose(fitness, expected)
+
+
+@pytest.mark.parametrize("recompute_interval", [1, 100])
+def test_bottom_up_incremental_products(recompute_interval):
+    hierarchy = nx.to_numpy_array(nx.bfs_tree(nx.balanced_tree(2, 3), 0))
+    rng = np.random.default_rng(0)
+    X = (rng.random((30, hierarchy.shape[0])) < 0.5).astype(float)
+    y = rng.integers(0, 2, 30)
+
+    selector = BottomUpSelector(hierarchy, k=3)
+    selector.recompute_interval = recompute_interval
+    selector.fit(X, y)
+    expected = BottomUpSelector(hierarchy, k=3).fit(X, y)
+    assert sorted(selector.representatives_) == sorted(expected.representatives_)
+
+    similarities = selector._comparison_matrix([7, 8, 4, 2])
+    count = 0
+    for row in range(X.shape[0]):
+        neighbors = np.argpartition(similarities[row], X.shape[0] - 4)[-4:]
+        count += sum(y[neighbors] == y[row]) - (row in neighbors)
+    assert selector._count_same_class_neighbors(similarities, slice(0, 30)) == count
+
+
+def test_bottom_up_evaluations():
+    hierarchy = nx.to_numpy_array(nx.bfs_tree(nx.balanced_tree(2, 2), 0))
+    X = np.random.default_rng(0).random((10, hierarchy.shape[0]))
+    # with one class no merge lowers the fitness
+    y = np.zeros(10, dtype=int)
+
+    selector = BottomUpSelector(hierarchy, k=3).fit(X, y)
+    assert sorted(selector.representatives_) == [3, 4, 5, 6]
+    # the leaves and one candidate for each of the parents 1 and 2
+    assert selector.n_evaluations_ == 3
+
+
+def test_top_down_search_strategies():
+    hierarchy = nx.to_numpy_array(nx.bfs_tree(nx.balanced_tree(2, 3), 0))
+    hierarchy[0, 1] = hierarchy[0, 2] = 0
+    rng = np.random.default_rng(0)
+    X = rng.random((20, hierarchy.shape[0]))
+    y = rng.integers(0, 2, 20)
+
+    steepest = TopDownSelector(hierarchy, dataset_type="numerical").fit(X, y)
+    beam = TopDownSelector(
+        hierarchy, dataset_type="numerical", search="beam", beam_width=1
+    ).fit(X, y)
+    assert sorted(beam.representatives_) == sorted(steepest.representatives_)
+    assert beam.n_evaluations_ == steepest.n_evaluations_
+
+    # different orders of expansions lead to the same feature sets
+    beam = TopDownSelector(hierarchy, dataset_type="numerical", search="beam")
+    uncached = TopDownSelector(
+        hierarchy, dataset_type="numerical", search="beam", cache_size=0
+    )
+    beam.fit(X, y)
+    uncached.fit(X, y)
+    assert sorted(beam.representatives_) == sorted(uncached.representatives_)
+    assert beam.n_evaluations_ < uncached.n_evaluations_
+
+    first = TopDownSelector(hierarchy, dataset_type="numerical", search="first")
+    first.fit(X, y)
+    assert first.n_evaluations_ <= steepest.n_evaluations_
+
+    budget = TopDownSelector(hierarchy, dataset_type="numerical", max_evaluations=3)
+    budget.fit(X, y)
+    assert budget.n_evaluations_ == 3
+
+    with pytest.raises(ValueError):
+        TopDownSelector(hierarchy, search="random").fit(X, y)
@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+from scipy.sparse import csr_matrix
+
+from hfs.helpers import get_relevances
+from hfs.metrics import conditional_mutual_information_matrix, information_gain, lift
+from hfs.packed import PackedBinaryMatrix, binary_columns, count_bits
+from hfs.sufficient_statistics import SufficientStatistics
+
+
+@pytest.mark.parametrize("sparse_input", [False, True])
+def test_packed_binary_matrix(sparse_input):
+    rng = np.random.default_rng(0)
+    X = (rng.random((130, 7)) < 0.4).astype(float)
+    y = rng.integers(0, 3, size=130)
+    packed = PackedBinaryMatrix(csr_matrix(X) if sparse_input else X)
+
+    assert packed.shape == (130, 7)
+    assert packed.nbytes == 7 * 3 * 8
+    assert np.array_equal(packed.toarray(), X)
+    assert np.array_equal(packed.count_ones(), X.sum(axis=0))
+    assert np.array_equal(packed.co_occurrences(block_size=3), X.T @ X)
+    samples = packed.pack_samples(y == 1)
+    assert np.array_equal(packed.co_occurrences(samples), X[y == 1].T @ X[y == 1])
+    assert np.array_equal(packed.class_counts(y, 3)[:, 2], X[y == 2].sum(axis=0))
+    distances = (X[:, :, np.newaxis] != X[:, np.newaxis, :]).sum(axis=0)
+    assert np.array_equal(packed.hamming_distances(), distances)
+
+
+def test_packed_helpers():
+    words = np.random.default_rng(0).integers(0, 2**63, size=(3, 4), dtype=np.uint64)
+    expected = [sum(bin(int(word)).count("1") for word in row) for row in words]
+    assert np.array_equal(count_bits(words), expected)
+
+    X = np.array([[0, 1, 2], [1, 1, 0]])
+    assert np.array_equal(binary_columns(X), [True, True, False])
+    assert np.array_equal(binary_columns(csr_matrix(X)), [True, True, False])
+    with pytest.raises(ValueError):
+        PackedBinaryMatrix(X)
+
+
+def test_metrics_from_packed_data():
+    rng = np.random.default_rng(0)
+    X = (rng.random((40, 6)) < 0.4).astype(float)
+    X[:, 5] = 1
+    y = rng.integers(0, 3, size=40)
+    packed = PackedBinaryMatrix(X)
+    statistics = SufficientStatistics(X, y, pairwise=True, packed=True)
+
+    assert information_gain(statistics) == information_gain(X, y)
+    assert information_gain(packed, y) == information_gain(X, y)
+    assert np.array_equal(lift(packed, y), lift(X, y))
+    assert np.array_equal(get_relevances(packed, y), get_relevances(X, y))
+    assert np.array_equal(
+        conditional_mutual_information_matrix(packed, y),
+        conditional_mutual_information_matrix(X, y),
+    )
+    assert np.array_equal(
+        conditional_mutual_information_matrix(statistics),
+        conditional_mutual_information_matrix(X, y),
+    )
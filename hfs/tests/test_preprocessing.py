@@ -1,10 +1,13 @@
 import networkx as nx
 import numpy as np
 import pytest
+from scipy import sparse
 
 from hfs.data_utils import create_mapping_columns_to_nodes, load_data
 from hfs.helpers import get_columns_for_numpy_hierarchy
 from hfs.preprocessing import HierarchicalPreprocessor
+from hfs.selectors import GreedyTopDownSelector, SHSELSelector, TSELSelector
+from hfs.selectors.hill_climbing import TopDownSelector
 
 
 @pytest.mark.parametrize(
@@ -23,6 +26,76 @@ def test_hierarchical_preprocessor(data, request):
     assert np.array_equal(X, X_transformed)
     hierarchy_transformed = preprocessor.get_hierarchy()
     assert np.array_equal(hierarchy_transformed, hierarchy_expected)
+    hierarchy_sparse = preprocessor.get_hierarchy(format="sparse")
+    assert np.array_equal(hierarchy_sparse.toarray(), hierarchy_expected)
+    hierarchy_edges = preprocessor.get_hierarchy(format="edges")
+    assert np.array_equal(hierarchy_edges, np.argwhere(hierarchy_expected))
+
+
+def test_transform_out(data1_preprocessing):
+    X, X_transformed, hierarchy, columns, _ = data1_preprocessing
+    preprocessor = HierarchicalPreprocessor(hierarchy)
+    preprocessor.fit(X, columns=columns)
+    out = np.empty(X_transformed.shape, dtype=X.dtype)
+    assert preprocessor.transform(X, out=out) is out
+    assert np.array_equal(out, X_transformed)
+
+
+@pytest.mark.parametrize("sparse_format", ["csr", "csc"])
+def test_transform_sparse(sparse_format):
+    hierarchy = nx.to_numpy_array(nx.DiGraph([(0, 1), (1, 2), (0, 3)]))
+    X = np.array([[0, 0, 1, 0], [0, 1, 0, 0], [0, 0, 0, 1], [2, 0, 1, 0]])
+    X_transformed = np.array([[1, 1, 1, 0], [1, 1, 0, 0], [1, 0, 0, 1], [1, 1, 1, 0]])
+    preprocessor = HierarchicalPreprocessor(hierarchy)
+    preprocessor.fit(X, columns=[0, 1, 2, 3])
+    X_sparse = preprocessor.transform(sparse.csr_matrix(X).asformat(sparse_format))
+    assert X_sparse.format == sparse_format
+    assert np.array_equal(X_sparse.toarray(), X_transformed)
+
+
+@pytest.mark.parametrize("to_sparse", [False, True])
+def test_add_columns_keeps_format(data1_preprocessing, to_sparse):
+    X, X_transformed, hierarchy, columns, _ = data1_preprocessing
+    X = X.astype(np.int8)
+    preprocessor = HierarchicalPreprocessor(hierarchy)
+    preprocessor.fit(X, columns=columns)
+    if to_sparse:
+        X = sparse.csc_matrix(X)
+    X_ = preprocessor.transform(X)
+    assert X_.dtype == np.int8
+    assert sparse.issparse(X_) == to_sparse
+    if to_sparse:
+        assert X_.format == "csc"
+        X_ = X_.toarray()
+    assert np.array_equal(X_, X_transformed)
+
+
+@pytest.mark.parametrize("dtype", [bool, np.uint8, np.int8, np.float32])
+@pytest.mark.parametrize("to_sparse", [False, True])
+def test_pipeline_keeps_dtype(data1_preprocessing, dtype, to_sparse):
+    X, X_transformed, hierarchy, columns, _ = data1_preprocessing
+    X = X.astype(dtype)
+    y = np.arange(X.shape[0]) % 2
+    if to_sparse:
+        X = sparse.csr_matrix(X)
+    preprocessor = HierarchicalPreprocessor(hierarchy)
+    X_ = preprocessor.fit(X, columns=columns).transform(X)
+    assert X_.dtype == dtype
+    if to_sparse:
+        assert np.array_equal(X_.toarray(), X_transformed)
+    else:
+        assert np.array_equal(X_, X_transformed)
+
+    hierarchy = preprocessor.get_hierarchy()
+    for selector in [
+        TSELSelector(hierarchy),
+        SHSELSelector(hierarchy),
+        GreedyTopDownSelector(hierarchy),
+        TopDownSelector(hierarchy),
+    ]:
+        X_selected = selector.fit(X_, y).transform(X_)
+        assert X_selected.dtype == dtype
+        assert sparse.issparse(X_selected) == to_sparse
 
 
 # TODO rename to test_fit and update to check all submethods included in fit?
@@ -76,6 +149,8 @@ def test_adjust_node_names():
     preprocessor.transform(X)
     updated_columns = preprocessor.get_columns()
     assert updated_columns == [0, 1, 3, 2]
+    for node in updated_columns:
+        assert preprocessor._column_index(node) == updated_columns.index(node)
 
 
 def test_columns_not_in_hierarchy_raises_warning():
@@ -1,5 +1,6 @@
 import numpy as np
 import pytest
+from scipy.sparse import csr_matrix
 
 from hfs.selectors import SHSELSelector
 
@@ -69,3 +70,16 @@ def test_leaf_filtering(data, result, request):
 
     support_mask = selector.get_support()
     assert np.array_equal(support_mask, support)
+
+
+@pytest.mark.parametrize("data", ["data1", "data2", "data3"])
+def test_SHSEL_correlation_sparse(data, request):
+    X, y, hierarchy, columns = request.getfixturevalue(data)
+    selected = []
+    for X_input in [X, csr_matrix(X)]:
+        selector = SHSELSelector(
+            hierarchy, relevance_metric="Correlation", similarity_threshold=0.8
+        )
+        selector.fit(X_input, y, columns)
+        selected.append(selector.get_support())
+    assert np.array_equal(selected[0], selected[1])
@@ -0,0 +1,91 @@
+import numpy as np
+import pytest
+from scipy.sparse import csr_matrix
+
+from hfs.helpers import get_relevances
+from hfs.metrics import (
+    conditional_mutual_information_matrix,
+    gain_ratio,
+    information_gain,
+    lift,
+)
+from hfs.selectors import TAN, SHSELSelector
+from hfs.sufficient_statistics import SufficientStatistics, get_statistics
+
+
+@pytest.mark.parametrize("sparse_input", [False, True])
+def test_statistics_counts(sparse_input):
+    rng = np.random.default_rng(0)
+    X = rng.integers(0, 3, size=(30, 4))
+    y = rng.integers(1, 4, size=30)
+    statistics = SufficientStatistics(csr_matrix(X) if sparse_input else X, y)
+
+    assert statistics.shape == (30, 4)
+    assert np.array_equal(statistics.classes, [1, 2, 3])
+    assert not statistics.is_binary()
+    for value in range(3):
+        counts = statistics.value_class_counts(value, labels=[0, 1, 2, 3])
+        for feature in range(4):
+            for position, label in enumerate([0, 1, 2, 3]):
+                expected = np.sum((X[:, feature] == value) & (y == label))
+                assert counts[feature, position] == expected
+    assert np.array_equal(statistics.label_counts([3, 5]), [np.sum(y == 3), 0])
+
+
+@pytest.mark.parametrize("sparse_input", [False, True])
+def test_metrics_from_statistics(sparse_input):
+    rng = np.random.default_rng(0)
+    X = (rng.random((40, 6)) < 0.4).astype(int)
+    y = rng.integers(0, 3, size=40)
+    data = csr_matrix(X) if sparse_input else X
+    statistics = SufficientStatistics(data, y, pairwise=True)
+
+    assert information_gain(statistics) == information_gain(X, y)
+    assert gain_ratio(statistics) == gain_ratio(X, y)
+    assert np.array_equal(lift(statistics, y), lift(X, y))
+    assert np.array_equal(lift(statistics, y, pos_label=2), lift(X, y, pos_label=2))
+    assert np.array_equal(get_relevances(statistics), get_relevances(X, y))
+    assert np.array_equal(
+        conditional_mutual_information_matrix(statistics),
+        conditional_mutual_information_matrix(X, y),
+    )
+
+
+def test_statistics_errors():
+    X = np.array([[0, 1], [1, 2], [1, 0]])
+    y = np.array([0, 1, 1])
+    statistics = SufficientStatistics(X, y)
+
+    assert get_statistics(statistics) is statistics
+    with pytest.raises(ValueError):
+        get_statistics(statistics, pairwise=True)
+    with pytest.raises(ValueError):
+        SufficientStatistics(X, y, pairwise=True)
+    with pytest.raises(ValueError):
+        statistics.check_data(X[:, :1])
+
+
+def test_selectors_with_statistics(lazy_data2):
+    small_DAG, train_x_data, train_y_data, test_x_data, _ = lazy_data2
+    statistics = SufficientStatistics(train_x_data, train_y_data, pairwise=True)
+
+    expected = TAN(small_DAG)
+    expected.fit_selector(train_x_data, train_y_data, test_x_data)
+    selector = TAN(small_DAG)
+    selector.fit_selector(train_x_data, train_y_data, test_x_data, statistics=statistics)
+    assert np.array_equal(selector.select_and_predict(), expected.select_and_predict())
+
+    with pytest.raises(ValueError):
+        selector.fit_selector(
+            train_x_data,
+            train_y_data,
+            test_x_data,
+            statistics=SufficientStatistics(train_x_data[:-1], train_y_data[:-1]),
+        )
+
+    X = np.random.default_rng(0).integers(0, 2, size=(20, 4))
+    y = np.random.default_rng(1).integers(0, 2, size=20)
+    hierarchy = np.array([[0, 1, 1, 0], [0, 0, 0, 1], [0, 0, 0, 0], [0, 0, 0, 0]])
+    expected = SHSELSelector(hierarchy).fit(X, y)
+    selector = SHSELSelector(hierarchy).fit(X, y, statistics=SufficientStatistics(X, y))
+    assert np.array_equal(selector.transform(X), expected.transform(X))
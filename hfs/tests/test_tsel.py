@@ -1,6 +1,8 @@
+import networkx as nx
 import numpy as np
 import pytest
 
+from hfs.helpers import graph_to_hierarchy
 from hfs.selectors import TSELSelector
 
 
@@ -25,3 +27,14 @@ def test_TSEL_selection(data, result, request):
 
     support_mask = selector.get_support()
     assert np.array_equal(support_mask, support)
+
+
+@pytest.mark.parametrize("format", ["sparse", "edges", "graph"])
+def test_TSEL_hierarchy_formats(data2, result_tsel2, format):
+    X, y, hierarchy, columns = data2
+    expected, support = result_tsel2
+    graph = nx.from_numpy_array(hierarchy, create_using=nx.DiGraph)
+    selector = TSELSelector(graph_to_hierarchy(graph, format=format))
+    selector.fit(X, y, columns)
+    assert np.array_equal(selector.transform(X), expected)
+    assert np.array_equal(selector.get_support(), support)